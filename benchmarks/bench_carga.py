@@ -0,0 +1,206 @@
+"""
+Prueba de carga de la descarga contra el servidor local de respuestas grabadas (ver servidor_local.py).
+
+Escenarios:
+    actividades  `obtener_html_de_urls` con `--paginas` páginas de actividades, guardadas en un archivo de páginas temporal.
+    booking      cargas de la página de resultados de Booking y su extracción con `soup_to_df`, como hace `scrap_url`
+                 pero con requests en lugar de un navegador, con tantos hilos como la concurrencia.
+    vuelos       `buscar_vuelos` de Madrid a París y Barcelona, con `--dias` fechas de salida por ruta.
+
+Cada escenario se ejecuta con cada concurrencia de `--concurrencias` y se mide el rendimiento (respuestas válidas por
+segundo), los percentiles 50, 95 y 99 del tiempo de cada petición (estimados con las cubetas de `support_metricas`),
+las respuestas 429 y 5xx que dio el servidor y los reintentos. El pico de memoria de Python (tracemalloc) se mide
+en una ejecución más, porque tracemalloc ralentiza mucho el parseo y falsearía los tiempos. Al final se indica, por escenario, la menor concurrencia que alcanza el 95 % del mejor rendimiento sin 429.
+
+El servidor se lanza en un proceso aparte para que no compita con la descarga, con la latencia, los errores y la
+limitación de velocidad indicados. Con --url se usa en cambio un servidor ya arrancado.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_carga.py
+    python benchmarks/bench_carga.py --escenarios actividades --concurrencias 1 4 8 16 32 --tasa-maxima 40 --errores 0.02
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.request import urlopen
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_actividades as sup_act
+from src import support_alojamiento as sup_aloja
+from src import support_archivo as sup_archivo
+from src import support_busqueda_vuelos as sup_busq
+from src import support_fetch as sup_fetch
+from src import support_metricas as sup_met
+from src import support_parser as sup_parser
+
+
+def escenario_actividades(url, concurrencia, args):
+    urls = [f'{url}/actividades/{ciudad}-oa{30 * i}.html' for i in range(args.paginas // 2) for ciudad in ('Barcelona', 'Paris')]
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = sup_archivo.ArchivoPaginas(directorio)
+        df = sup_act.obtener_html_de_urls(urls, concurrencia=concurrencia, tasa_por_host=args.tasa, reintentos=args.reintentos, archivo=archivo)
+    return len(df), len(urls)
+
+
+def escenario_booking(url, concurrencia, args):
+    # París y Barcelona alternas, con ventanas de tres noches en febrero
+    busquedas = [sup_aloja.url_busqueda_booking(('-1456928', '-372490')[i % 2], f'2025-02-{1 + i % 20:02d}', f'2025-02-{4 + i % 20:02d}')
+                 .replace('https://www.booking.com', url) for i in range(args.paginas)]
+
+    def cargar(busqueda):
+        # Cada carga con su propia conexión, como un navegador que abre la búsqueda
+        with sup_fetch._crear_sesion(1, sup_fetch.CABECERAS) as sesion, sup_met.medir('fetch', modulo='alojamientos'):
+            respuesta = sesion.get(busqueda, timeout=30)
+        sup_met.contar('peticiones', host='booking', status=respuesta.status_code)
+        if respuesta.status_code != 200:
+            return 0
+        soup, _ = sup_parser.parsear(respuesta.text, args.parser)
+        return int(len(sup_aloja.soup_to_df(soup, args.parser)) > 0)
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        return sum(ejecutor.map(cargar, busquedas)), len(busquedas)
+
+
+def escenario_vuelos(url, concurrencia, args):
+    rutas = [('madrid', 'paris'), ('madrid', 'barcelona')]
+    fin = f'2025-03-{args.dias:02d}'
+    df = sup_busq.buscar_vuelos(rutas, '2025-03-01', fin, noches=3, api_key='local', url=f'{url}/api/v2/flights/searchFlights',
+                                concurrencia=concurrencia, tasa=args.tasa, reintentos=args.reintentos)
+    return (df['busqueda'].nunique() if len(df) else 0), len(rutas) * args.dias
+
+
+ESCENARIOS = {'actividades': escenario_actividades, 'booking': escenario_booking, 'vuelos': escenario_vuelos}
+
+
+def estadisticas_servidor(url):
+    with urlopen(f'{url}/__estadisticas') as respuesta:
+        return json.loads(respuesta.read())
+
+
+def medir(escenario, url, concurrencia, args):
+    """
+    Ejecuta un escenario con una concurrencia y devuelve sus medidas.
+    """
+
+    sup_met.reiniciar()
+    sup_met.activar()
+    antes = estadisticas_servidor(url)
+
+    inicio = time.perf_counter()
+    validas, total = ESCENARIOS[escenario](url, concurrencia, args)
+    segundos = time.perf_counter() - inicio
+
+    sup_met.desactivar()
+    despues = estadisticas_servidor(url)
+    servidas = {status: despues.get(status, 0) - antes.get(status, 0) for status in despues}
+
+    pico = float('nan')
+    if args.memoria:
+        tracemalloc.start()
+        ESCENARIOS[escenario](url, concurrencia, args)
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    # Todas las peticiones de la etapa fetch, de cualquier host
+    datos = sup_met.instantanea()
+    peticiones = [medida for medida in datos['etapas'] if medida['etapa'] == 'fetch']
+    fetch = {'llamadas': sum(medida['llamadas'] for medida in peticiones),
+             'maximo': max((medida['maximo'] for medida in peticiones), default=0.0),
+             'cubetas': [sum(cubetas) for cubetas in zip(*(medida['cubetas'] for medida in peticiones))] or [0]}
+
+    return {
+        'validas': validas,
+        'total': total,
+        'segundos': segundos,
+        'por_segundo': validas / segundos,
+        'p50': sup_met.percentil(fetch, 50),
+        'p95': sup_met.percentil(fetch, 95),
+        'p99': sup_met.percentil(fetch, 99),
+        '429': servidas.get('429', 0),
+        '5xx': sum(n for status, n in servidas.items() if status.startswith('5')),
+        'reintentos': sum(contador['valor'] for contador in datos['contadores'] if contador['nombre'] == 'reintentos'),
+        'memoria_mb': pico / 2**20,
+    }
+
+
+def arrancar_servidor(args):
+    """
+    Lanza servidor_local.py en otro proceso y devuelve el proceso y su URL.
+    """
+
+    orden = [sys.executable, str(Path(__file__).resolve().parent / 'servidor_local.py'), '--puerto', '0',
+             '--latencia', str(args.latencia), '--variacion', str(args.variacion), '--errores', str(args.errores), '--rafaga', str(args.rafaga)]
+    if args.tasa_maxima is not None:
+        orden += ['--tasa-maxima', str(args.tasa_maxima)]
+    if args.semilla is not None:
+        orden += ['--semilla', str(args.semilla)]
+
+    proceso = subprocess.Popen(orden, stdout=subprocess.PIPE, text=True)
+    linea = proceso.stdout.readline()
+    if not linea.startswith('Sirviendo en '):
+        proceso.kill()
+        raise RuntimeError(f'El servidor local no arrancó: {linea!r}')
+    return proceso, linea.split()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escenarios', nargs='+', choices=list(ESCENARIOS), default=list(ESCENARIOS), help='Escenarios a medir')
+    parser.add_argument('--concurrencias', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Concurrencias a probar')
+    parser.add_argument('--paginas', type=int, default=40, help='Páginas de actividades y de Booking por ejecución')
+    parser.add_argument('--dias', type=int, default=10, help='Fechas de salida por ruta en el escenario de vuelos')
+    parser.add_argument('--tasa', type=float, default=1000.0, help='Peticiones por segundo a cada servidor del lado del cliente')
+    parser.add_argument('--reintentos', type=int, default=3, help='Reintentos por petición')
+    parser.add_argument('--parser', default=None, help="Backend de parseo del escenario booking: 'lxml' o 'html.parser'")
+    parser.add_argument('--sin-memoria', dest='memoria', action='store_false', help='No medir el pico de memoria (ahorra una ejecución por caso)')
+    parser.add_argument('--url', help='URL de un servidor local ya arrancado (por defecto se lanza uno)')
+    parser.add_argument('--latencia', type=float, default=0.1, help='Segundos mínimos de cada respuesta del servidor')
+    parser.add_argument('--variacion', type=float, default=0.05, help='Media en segundos de la parte aleatoria de la latencia')
+    parser.add_argument('--errores', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--tasa-maxima', type=float, default=None, help='Peticiones por segundo que admite el servidor antes de contestar 429')
+    parser.add_argument('--rafaga', type=int, default=10, help='Ráfaga que admite el servidor antes de aplicar la tasa máxima')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla de la latencia y los errores del servidor')
+    args = parser.parse_args()
+
+    proceso = None
+    url = args.url
+    if url is None:
+        proceso, url = arrancar_servidor(args)
+
+    resultados = {}
+    try:
+        for escenario in args.escenarios:
+            for concurrencia in args.concurrencias:
+                resultados[escenario, concurrencia] = medir(escenario, url, concurrencia, args)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    print(f"\n{'escenario':<13}{'conc.':>6}{'válidas':>10}{'resp./s':>9}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'429':>6}{'5xx':>6}{'reint.':>8}{'memoria (MB)':>14}")
+    for (escenario, concurrencia), r in resultados.items():
+        print(f"{escenario:<13}{concurrencia:>6}{r['validas']:>5}/{r['total']:<4}{r['por_segundo']:>9.1f}{r['p50']:>9.3f}{r['p95']:>9.3f}{r['p99']:>9.3f}"
+              f"{r['429']:>6}{r['5xx']:>6}{r['reintentos']:>8}{r['memoria_mb']:>14.1f}")
+
+    print()
+    for escenario in args.escenarios:
+        medidas = {concurrencia: resultados[escenario, concurrencia] for concurrencia in args.concurrencias}
+        mejor = max(r['por_segundo'] for r in medidas.values())
+        seguras = [concurrencia for concurrencia, r in medidas.items() if not r['429'] and r['por_segundo'] >= 0.95 * mejor]
+        if seguras:
+            print(f'{escenario}: concurrencia {min(seguras)} ({medidas[min(seguras)]["por_segundo"]:.1f} resp./s, mejor {mejor:.1f})')
+        else:
+            print(f'{escenario}: ninguna concurrencia alcanza el 95 % del mejor rendimiento sin 429; bajar --tasa')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark de `support_catalogo.CatalogoActividades`.
+
+Simula el scraping de actividades de muchas ciudades a partir de `datos/df_actividades_ciudades_2024-10-21_full.csv`:
+cada ciudad tiene un conjunto de actividades propias (las del CSV con otro identificador de producto y otro nombre) y
+en cada scraping cada una de las seis categorías muestra cuatro de ellas al azar, de modo que una misma actividad sale
+en varias categorías y en todos los scrapings, con algún cambio de precio. Compara guardar todas las filas con el
+catálogo: memoria y número de páginas de detalle que habría que descargar.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_catalogo.py --ciudades 300 --scrapings 5 --por-ciudad 12
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_actividades as sup_act
+from src import support_catalogo as sup_cat
+
+
+def simular(ciudades, scrapings, por_ciudad, semilla=0):
+    """
+    Devuelve una lista de scrapings, cada uno un DataFrame con el formato de `obtener_actividades` para todas las ciudades.
+    """
+
+    rng = np.random.default_rng(semilla)
+    base = pd.read_csv(RAIZ / 'datos' / 'df_actividades_ciudades_2024-10-21_full.csv', index_col=0).astype({'precio': str})
+    base['url_detalles'] = base['url_detalles'].str.replace('https://www.tripadvisor.es', '', regex=False)
+
+    partes = []
+    for numero in range(ciudades):
+        ciudad = f'Ciudad {numero}'
+        propias = base.sample(por_ciudad, replace=por_ciudad > len(base), random_state=numero).reset_index(drop=True)
+        # Otro número de producto y otro nombre por ciudad y actividad
+        producto = (numero * 1000 + propias.index + 1).astype(str)
+        propias['url_detalles'] = [url.replace('-d', f'-d{p}0', 1) for url, p in zip(propias['url_detalles'], producto)]
+        propias['nombre'] = propias['nombre'] + ' - ' + ciudad
+        partes.append(propias.assign(ciudad=ciudad))
+    actividades = pd.concat(partes, ignore_index=True)
+
+    resultado = []
+    for _ in range(scrapings):
+        cambia = rng.random(len(actividades)) < 0.1
+        actividades.loc[cambia, 'precio'] = rng.integers(10, 300, cambia.sum()).astype(str)
+
+        # Cada categoría de cada ciudad elige 4 de sus actividades, sin repetir dentro de la categoría
+        elegidas = np.argsort(rng.random((ciudades, len(sup_act.CATEGORIAS), por_ciudad)), axis=2)[:, :, :4]
+        filas = (elegidas + np.arange(ciudades)[:, None, None] * por_ciudad).ravel()
+        categorias = np.repeat(np.tile(sup_act.CATEGORIAS, ciudades), 4)
+        scraping = actividades.iloc[filas].assign(categoria=categorias).reset_index(drop=True)
+        resultado.append(scraping[['ciudad', 'categoria'] + sup_cat.CAMPOS])
+
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ciudades', type=int, default=300, help='Ciudades simuladas')
+    parser.add_argument('--scrapings', type=int, default=5, help='Scrapings de todas las ciudades')
+    parser.add_argument('--por-ciudad', type=int, default=12, help='Actividades distintas de cada ciudad entre las que eligen las categorías')
+    args = parser.parse_args()
+
+    scrapings = simular(args.ciudades, args.scrapings, args.por_ciudad)
+    todas = pd.concat(scrapings, ignore_index=True)
+
+    catalogo = sup_cat.CatalogoActividades()
+    inicio = time.perf_counter()
+    for scraping in scrapings:
+        catalogo.agregar(scraping)
+    segundos = time.perf_counter() - inicio
+
+    # Comprobación: las apariciones coinciden con las filas y los valores son los del último scraping
+    esperadas = todas.assign(id=sup_cat.id_actividad(todas['url_detalles'])).groupby(['id', 'ciudad'])['categoria'].agg(set)
+    for (id_, ciudad), categorias in esperadas.sample(min(200, len(esperadas)), random_state=0).items():
+        assert set(catalogo.nombres_categorias(catalogo.apariciones.loc[(id_, ciudad), 'categorias'])) == categorias
+    ultimas = scrapings[-1].assign(id=sup_cat.id_actividad(scrapings[-1]['url_detalles'])).drop_duplicates('id').set_index('id')
+    assert (catalogo.entidades.loc[ultimas.index.astype('int64'), 'precio'].to_numpy() == ultimas['precio'].to_numpy()).all()
+
+    estadisticas = catalogo.estadisticas()
+    bytes_filas = todas.memory_usage(deep=True).sum()
+    print(f"{args.ciudades} ciudades x {args.scrapings} scrapings: {len(todas)} filas, {estadisticas['actividades']} actividades distintas "
+          f"({segundos:.2f} s para añadirlas al catálogo)")
+    print(f"{'':<28}{'filas':>14}{'catálogo':>14}")
+    print(f"{'memoria (MB)':<28}{bytes_filas / 2**20:>14.2f}{estadisticas['bytes_catalogo'] / 2**20:>14.2f}")
+    print(f"{'páginas de detalle':<28}{len(todas):>14}{len(catalogo.urls_detalles()):>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark de `support_alojamiento.clean_df`.
+
+Reconstruye el texto original de Booking ('A 2,7 km del centro', 'Puntuación 8,3 ', 'Ubicación 9,4', '€ 1.234')
+a partir de los CSV limpios `datos/df_alojamientos_*.csv`, con algunas distancias en una unidad desconocida ('mi'),
+los replica hasta el número de filas indicado y compara el tiempo de la implementación original (fila a fila con
+`apply`) con la vectorizada, comprobando que el resultado es el mismo. Los valores que la original no admite
+(distancias vacías o sin número) se comprueban aparte contra el resultado documentado de `clean_df`: NaN.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_clean_df.py --filas 1000000
+"""
+
+import argparse
+import glob
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_alojamiento as sup_aloja
+
+
+def distance_conversion_original(x):
+    """
+    `distance_conversion` anterior a la vectorización: falla con los valores que no son texto.
+    """
+
+    x = x.replace(',', '.')
+
+    if x.split()[1] == 'km':
+        return float(x.split()[0])
+
+    elif x.split()[1] == 'm':
+        return float(x.split()[0]) / 1000
+
+    else:
+        return None
+
+
+def clean_df_original(df):
+    """
+    Implementación de `clean_df` anterior a la vectorización, como referencia de resultado y de tiempo.
+    """
+
+    df['Distance to center'] = df['Distance to center'].str.extract(r'(\d+\,?\d*\s\w{1,2})')
+    df['Distance to center'] = df['Distance to center'].apply(distance_conversion_original)
+    df['Score'] = df['Score'].str.replace(',', '.').astype(float)
+    df['Price (€)'] = df['Price (€)'].str.replace('€','').str.replace(' ','').str.replace('.','').astype(float)
+    df['Location score'] = df['Location score'].str.replace(r'\w+\s','', regex=True).str.replace(',','.').astype(float)
+    return df
+
+
+def _coma(valor):
+    return f'{valor:g}'.replace('.', ',')
+
+
+def desformatear(df):
+    """
+    Convierte un DataFrame ya limpio en el texto que devuelve `extraer_propiedades` antes de limpiarlo.
+    """
+
+    crudo = df.copy()
+    distancia = df['Distance to center']
+    crudo['Distance to center'] = np.where(distancia >= 1,
+                                           'A ' + distancia.map(_coma) + ' km del centro',
+                                           'A ' + (distancia * 1000).round().astype(int).astype(str) + ' m del centro')
+    crudo['Score'] = df['Score'].map(_coma, na_action='ignore')
+    crudo['Location score'] = ('Ubicación ' + df['Location score'].map(_coma, na_action='ignore'))
+    crudo['Price (€)'] = '€ ' + df['Price (€)'].astype(int).map('{:,}'.format).str.replace(',', '.')
+    return crudo
+
+
+def generar_datos(filas):
+    """
+    Devuelve un DataFrame sin limpiar de `filas` filas replicando los CSV de alojamientos del repositorio.
+    """
+
+    rutas = sorted(glob.glob(str(RAIZ / 'datos' / 'df_alojamientos_*.csv')))
+    base = desformatear(pd.concat([pd.read_csv(ruta, index_col=0) for ruta in rutas], ignore_index=True))
+    # Una de cada 50 distancias en una unidad que ninguna de las dos versiones reconoce
+    base.loc[::50, 'Distance to center'] = 'A ' + base.loc[::50].index.astype(str) + ' mi del centro'
+    repeticiones = -(-filas // len(base))
+    return pd.concat([base] * repeticiones, ignore_index=True).iloc[:filas]
+
+
+# Valores que la implementación original no admite, con el resultado documentado de `clean_df`
+ESPECIALES = pd.DataFrame({
+    'Distance to center': [None, 'En pleno centro', 'A 3 mi del centro', 'A 2,7 km del centro', 'A 450 m del centro'],
+    'Score': [None, '8,3', None, '9', '7,5'],
+    'Price (€)': [None, '€ 1.234', '€ 95', None, '€ 80'],
+    'Location score': [None, 'Ubicación 9,4', None, 'Ubicación 8', None],
+})
+ESPERADOS = pd.DataFrame({
+    'Distance to center': [np.nan, np.nan, np.nan, 2.7, 0.45],
+    'Score': [np.nan, 8.3, np.nan, 9.0, 7.5],
+    'Price (€)': [np.nan, 1234.0, 95.0, np.nan, 80.0],
+    'Location score': [np.nan, 9.4, np.nan, 8.0, np.nan],
+})
+
+
+def medir(funcion, df):
+    inicio = time.perf_counter()
+    resultado = funcion(df.copy())
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Número de filas del DataFrame de prueba')
+    args = parser.parse_args()
+
+    df = generar_datos(args.filas)
+    print(f'Filas: {len(df):,}')
+
+    tiempo_original, original = medir(clean_df_original, df)
+    tiempo_nuevo, nuevo = medir(sup_aloja.clean_df, df)
+
+    pd.testing.assert_frame_equal(original, nuevo)
+    pd.testing.assert_frame_equal(sup_aloja.clean_df(ESPECIALES.copy()), ESPERADOS)
+    print(f'clean_df original:    {tiempo_original:8.3f} s')
+    print(f'clean_df vectorizado: {tiempo_nuevo:8.3f} s  (x{tiempo_original / tiempo_nuevo:.1f})')
+    print('Resultados idénticos; valores vacíos y unidades desconocidas como NaN')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de `support_historico.HistoricoAlojamientos`.
+
+Simula varios días de scraping de una búsqueda a partir de `datos/df_alojamientos_2025_02_13-16.csv` (cada día
+cambia el precio de una parte de los alojamientos y algunos aparecen o desaparecen) y compara guardar un CSV completo
+por día con guardar solo los cambios: espacio en disco, tiempo de reconstruir un día y de sacar la curva de precios
+de unos alojamientos. Comprueba además que cada día reconstruido coincide con el original.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_historico.py --dias 90 --cambios 0.05
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_historico as sup_hist
+
+
+def simular(dias, cambios, rotacion, semilla=0):
+    """
+    Devuelve una lista de (fecha, DataFrame) con el scraping de cada día.
+    """
+
+    rng = np.random.default_rng(semilla)
+    base = pd.read_csv(RAIZ / 'datos' / 'df_alojamientos_2025_02_13-16.csv', index_col=0)
+    activos = base.sample(frac=0.9, random_state=semilla)
+    reserva = base.drop(activos.index)
+
+    scrapings = []
+    for dia in range(dias):
+        activos = activos.copy()
+        cambia = rng.random(len(activos)) < cambios
+        activos.loc[cambia, 'Price (€)'] = (activos.loc[cambia, 'Price (€)'] * rng.uniform(0.8, 1.2, cambia.sum())).round()
+
+        # Algunos alojamientos dejan de aparecer y otros vuelven
+        salen = activos.sample(max(1, int(len(activos) * rotacion)), random_state=dia)
+        entran = reserva.sample(min(len(reserva), len(salen)), random_state=dia)
+        activos, reserva = pd.concat([activos.drop(salen.index), entran]), pd.concat([reserva.drop(entran.index), salen])
+
+        # Booking cambia los parámetros de seguimiento de los enlaces en cada búsqueda
+        scraping = activos.sample(frac=1, random_state=dia)
+        scraping['Link'] = scraping['Link'].str.replace(r'srpvid=\w+', f'srpvid={rng.integers(1 << 62):x}', regex=True)
+        scrapings.append((pd.Timestamp('2025-01-01') + pd.Timedelta(days=dia), scraping))
+
+    return scrapings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, default=90, help='Días de scraping simulados')
+    parser.add_argument('--cambios', type=float, default=0.05, help='Fracción de alojamientos que cambian de precio cada día')
+    parser.add_argument('--rotacion', type=float, default=0.01, help='Fracción de alojamientos que aparecen y desaparecen cada día')
+    parser.add_argument('--cada-completa', type=int, default=30, help='Cada cuántos scrapings se guarda una instantánea completa')
+    args = parser.parse_args()
+
+    scrapings = simular(args.dias, args.cambios, args.rotacion)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+
+        inicio = time.perf_counter()
+        for fecha, df in scrapings:
+            df.to_csv(directorio / f'completo_{fecha:%Y%m%d}.csv')
+        tiempo_csv = time.perf_counter() - inicio
+        bytes_csv = sum(ruta.stat().st_size for ruta in directorio.glob('completo_*.csv'))
+
+        historico = sup_hist.HistoricoAlojamientos(directorio / 'historico', cada_completa=args.cada_completa)
+        inicio = time.perf_counter()
+        for fecha, df in scrapings:
+            historico.registrar(df, fecha)
+        tiempo_historico = time.perf_counter() - inicio
+        estadisticas = historico.estadisticas()
+        bytes_historico = estadisticas['bytes_cambios'] + estadisticas['bytes_completas']
+
+        print(f"Días: {args.dias}, alojamientos por día: {len(scrapings[0][1])}")
+        print(f"CSV completos:  {bytes_csv / 2**20:8.2f} MB, escritura {tiempo_csv:.2f} s")
+        print(f"Histórico:      {bytes_historico / 2**20:8.2f} MB, registro {tiempo_historico:.2f} s (x{bytes_csv / bytes_historico:.0f} menos espacio)")
+
+        # Cada día reconstruido debe ser igual que el scraping de ese día
+        for fecha, df in scrapings:
+            esperado = sup_hist._preparar(df).sort_index()
+            pd.testing.assert_frame_equal(historico.instantanea(fecha).sort_index(), esperado, check_dtype=False)
+        print('Instantáneas reconstruidas idénticas a los scrapings')
+
+        fecha = scrapings[-1][0]
+        inicio = time.perf_counter()
+        pd.read_csv(directorio / f'completo_{fecha:%Y%m%d}.csv', index_col=0)
+        tiempo_csv = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        historico.instantanea(fecha)
+        print(f"Último día:     CSV {tiempo_csv * 1000:.1f} ms, histórico {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        ids = sup_hist.id_propiedad(scrapings[-1][1]['Link']).iloc[:10].tolist()
+        inicio = time.perf_counter()
+        for ruta in sorted(directorio.glob('completo_*.csv')):
+            completo = pd.read_csv(ruta, index_col=0)
+            completo[sup_hist.id_propiedad(completo['Link']).isin(ids)]
+        tiempo_csv = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        historico.curva_precios(ids)
+        print(f"Curva de 10 alojamientos: CSV {tiempo_csv * 1000:.0f} ms, histórico {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
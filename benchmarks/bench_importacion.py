@@ -0,0 +1,70 @@
+"""
+Presupuesto de tiempo de importación de la ruta de solo parseo ('python -m src parse').
+
+Ejecuta el subcomando 'parse' sobre `datos/html` en un proceso nuevo con `python -X importtime`, suma el tiempo de
+todas las importaciones y comprueba que no supera el presupuesto y que no se ha cargado ninguna de las dependencias
+de navegador, HTTP o gráficas. Como referencia mide también lo que costaba importar todas esas dependencias.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_importacion.py --presupuesto 700 --repeticiones 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Paquetes que la ruta de parseo no debe importar
+PROHIBIDOS = ['selenium', 'webdriver_manager', 'requests', 'matplotlib', 'bs4', 'tqdm']
+
+REFERENCIA = 'import pandas, lxml.html, bs4, requests, selenium.webdriver, webdriver_manager.chrome, matplotlib.pyplot, tqdm'
+
+
+def importaciones(comando):
+    """
+    Ejecuta un comando de Python con `-X importtime` y devuelve el tiempo total de importación (ms) y los paquetes importados.
+    """
+
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', *comando], cwd=RAIZ, capture_output=True, text=True, check=True)
+
+    total, paquetes = 0, set()
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, _, nombre = linea[len('import time:'):].split('|')
+        total += int(propio)
+        paquetes.add(nombre.strip().split('.')[0])
+
+    return total / 1000, paquetes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--presupuesto', type=float, default=700, help='Tiempo máximo de importación de la ruta de parseo, en ms')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones de cada medida (se usa la mediana)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as salida:
+        parseo = ['-m', 'src', 'parse', 'datos/html', '--salida', salida, '--procesos', '1']
+        medidas = [importaciones(parseo) for _ in range(args.repeticiones)]
+
+    tiempo = statistics.median(total for total, _ in medidas)
+    cargados = sorted(set(PROHIBIDOS) & medidas[0][1])
+    referencia = statistics.median(importaciones(['-c', REFERENCIA])[0] for _ in range(args.repeticiones))
+
+    print(f'Importaciones de parse:            {tiempo:8.1f} ms  (presupuesto {args.presupuesto:.0f} ms)')
+    print(f'Importar todas las dependencias:   {referencia:8.1f} ms')
+    print(f'Dependencias prohibidas cargadas:  {cargados or "ninguna"}')
+
+    if tiempo > args.presupuesto or cargados:
+        print('PRESUPUESTO SUPERADO')
+        sys.exit(1)
+    print('Dentro del presupuesto')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark de `support_indice.IndiceAlojamientos`.
+
+Genera alojamientos sintéticos ya limpios y compara cada consulta (rangos de varias columnas, ordenación y
+paginación) con la misma consulta hecha con una máscara de pandas, comprobando que las páginas coinciden.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_indice.py --filas 500000 --repeticiones 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_indice as sup_indice
+
+
+CONSULTAS = {
+    'puntuación >= 8, precio <= 400, distancia <= 2': ({'Score': (8, None), 'Price (€)': (None, 400), 'Distance to center': (None, 2)}, None, True),
+    '... ordenado por precio': ({'Score': (8, None), 'Price (€)': (None, 400), 'Distance to center': (None, 2)}, 'Price (€)', True),
+    '... ordenado por puntuación descendente': ({'Score': (8, None), 'Price (€)': (None, 400), 'Distance to center': (None, 2)}, 'Score', False),
+    'precio entre 100 y 105, por ubicación': ({'Price (€)': (100, 105)}, 'Location score', False),
+}
+
+
+def generar_alojamientos(filas, semilla=0, inicio=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'Name': [f'alojamiento_{i}' for i in range(inicio, inicio + filas)],
+        'Score': np.where(rng.random(filas) < 0.1, np.nan, rng.integers(50, 100, filas) / 10),
+        'Location score': np.where(rng.random(filas) < 0.1, np.nan, rng.integers(60, 100, filas) / 10),
+        'Price (€)': rng.integers(40, 1500, filas).astype(float),
+        'Distance to center': rng.integers(0, 120, filas) / 10,
+    }, index=range(inicio, inicio + filas))
+
+
+def con_mascara(df, filtros, ordenar_por, ascendente, pagina, por_pagina):
+    mascara = np.ones(len(df), dtype=bool)
+    for columna, (minimo, maximo) in filtros.items():
+        if minimo is not None:
+            mascara &= (df[columna] >= minimo).to_numpy()
+        if maximo is not None:
+            mascara &= (df[columna] <= maximo).to_numpy()
+    resultado = df[mascara]
+    if ordenar_por is not None:
+        resultado = resultado.sort_values(ordenar_por, ascending=ascendente, kind='stable')
+    return resultado.iloc[pagina * por_pagina:(pagina + 1) * por_pagina]
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=500000, help='Alojamientos del conjunto de prueba')
+    parser.add_argument('--repeticiones', type=int, default=50, help='Repeticiones de cada consulta')
+    parser.add_argument('--pagina', type=int, default=3, help='Página que se pide (de 20 filas)')
+    args = parser.parse_args()
+
+    df = generar_alojamientos(args.filas)
+    inicio = time.perf_counter()
+    indice = sup_indice.IndiceAlojamientos(df)
+    print(f'Índice de {args.filas} filas: {time.perf_counter() - inicio:.2f} s')
+
+    for nombre, (filtros, ordenar_por, ascendente) in CONSULTAS.items():
+        pagina, t_indice = medir(lambda: indice.buscar(filtros, ordenar_por, ascendente, args.pagina), args.repeticiones)
+        esperada, t_mascara = medir(lambda: con_mascara(df, filtros, ordenar_por, ascendente, args.pagina, 20), args.repeticiones)
+        pd.testing.assert_frame_equal(esperada, pagina)
+        print(f'{nombre}: índice {t_indice:.2f} ms, máscara {t_mascara:.2f} ms')
+
+    nuevas = generar_alojamientos(1000, semilla=1, inicio=args.filas)
+    inicio = time.perf_counter()
+    indice.agregar(nuevas)
+    print(f'Añadir 1000 filas: {(time.perf_counter() - inicio) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark de `support_planificador.PlanificadorViajes`.
+
+Genera vuelos, alojamientos y actividades sintéticos de dos ciudades, comprueba en un caso pequeño que los viajes
+elegidos coinciden con los de recorrer todas las combinaciones, y mide el tiempo de indexar y de cada consulta.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_planificador.py --opciones 20000 --consultas 200
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_planificador as sup_plan
+
+
+def generar_datos(opciones, semilla=0):
+    """
+    Devuelve DataFrames de vuelos, alojamientos y actividades con `opciones` filas cada uno, repartidas entre París y Barcelona.
+    """
+
+    rng = np.random.default_rng(semilla)
+    vuelos = pd.DataFrame({
+        'id': [f'vuelo_{i}' for i in range(opciones)],
+        'price': rng.integers(30, 500, opciones).astype(float),
+        'total_duration': rng.integers(60, 900, opciones),
+        'destination_1': rng.choice(['Barcelona', 'Paris Orly', 'Paris Beauvais', 'Paris Charles de Gaulle'], opciones),
+    })
+    alojamientos = pd.DataFrame({
+        'Name': [f'alojamiento_{i}' for i in range(opciones)],
+        'Price (€)': rng.integers(40, 1500, opciones).astype(float),
+        'Score': np.where(rng.random(opciones) < 0.1, np.nan, rng.uniform(5, 10, opciones).round(1)),
+        'Distance to center': rng.uniform(0, 12, opciones).round(1),
+        'ciudad': rng.choice(['Barcelona', 'París'], opciones),
+    })
+    actividades = pd.DataFrame({
+        'nombre': [f'actividad_{i}' for i in range(opciones)],
+        'precio': rng.choice(['5', '12', '25', '40', '60', '1.200', 'Desconocido'], opciones),
+        'puntuacion': rng.uniform(0, 5, opciones).round(1),
+        'ciudad': rng.choice(['Barcelona', 'Paris'], opciones),
+    })
+    return vuelos, alojamientos, actividades
+
+
+def fuerza_bruta(planificador, presupuesto, pesos, k):
+    """
+    Devuelve, por ciudad, los k menores costes recorriendo todas las combinaciones sin podar de un planificador con k_max enorme.
+    """
+
+    pesos = {**sup_plan.PESOS_POR_DEFECTO, **pesos}
+    resultado = {}
+    for ciudad, fuentes in planificador.ciudades.items():
+        v, h, a = (fuentes[fuente]['datos'] for fuente in ('vuelo', 'alojamiento', 'actividad'))
+        duracion, distancia = fuentes['vuelo']['normalizador'], fuentes['alojamiento']['normalizador']
+        costes = []
+        for x, y, z in itertools.product(v.itertuples(), h.itertuples(), a.itertuples()):
+            precio = x.precio + y.precio + z.precio
+            if precio <= presupuesto:
+                costes.append(pesos['precio'] * precio / presupuesto + pesos['duracion'] * x.duracion / duracion
+                              + pesos['puntuacion'] * ((1 - y.puntuacion / 10) + (1 - z.puntuacion / 5)) / 2
+                              + pesos['distancia'] * y.distancia / distancia)
+        resultado[ciudad] = sorted(costes)[:k]
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--opciones', type=int, default=20000, help='Filas de cada fuente')
+    parser.add_argument('--consultas', type=int, default=200, help='Consultas con presupuestos y pesos aleatorios')
+    parser.add_argument('--k', type=int, default=10, help='Viajes por ciudad')
+    args = parser.parse_args()
+
+    # Comprobación: con pocas opciones se compara con todas las combinaciones
+    pequeno = generar_datos(60, semilla=1)
+    planificador = sup_plan.PlanificadorViajes(*pequeno, k_max=args.k)
+    completo = sup_plan.PlanificadorViajes(*pequeno, k_max=10**9)
+    for presupuesto, pesos in [(300, {}), (800, {'precio': 0.0, 'duracion': 1.0}), (1500, {'puntuacion': 2.0, 'distancia': 1.0})]:
+        viajes = planificador.planificar(presupuesto, pesos, k=args.k)
+        for ciudad, esperados in fuerza_bruta(completo, presupuesto, pesos, args.k).items():
+            assert np.allclose(viajes.loc[viajes['ciudad'] == ciudad, 'coste'], esperados), (ciudad, presupuesto, pesos)
+    print('Resultados idénticos a recorrer todas las combinaciones')
+
+    datos = generar_datos(args.opciones)
+    inicio = time.perf_counter()
+    planificador = sup_plan.PlanificadorViajes(*datos, k_max=args.k)
+    print(f'Indexado de {args.opciones} opciones por fuente: {time.perf_counter() - inicio:.2f} s')
+    print(planificador.estadisticas().to_string(index=False))
+
+    rng = np.random.default_rng(2)
+    tiempos = []
+    for _ in range(args.consultas):
+        pesos = dict(zip(sup_plan.PESOS_POR_DEFECTO, rng.uniform(0, 1, 4)))
+        inicio = time.perf_counter()
+        planificador.planificar(rng.uniform(200, 2000), pesos, k=args.k)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tiempos = np.array(tiempos) * 1000
+    print(f'Consultas: {args.consultas}, mediana {np.median(tiempos):.2f} ms, p95 {np.percentile(tiempos, 95):.2f} ms, máximo {tiempos.max():.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
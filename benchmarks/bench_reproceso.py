@@ -0,0 +1,67 @@
+"""
+Benchmark de `support_reproceso.reprocesar`.
+
+Replica las páginas de `datos/html` hasta el número de páginas indicado en un directorio temporal y mide el tiempo
+de reprocesarlas con distinto número de procesos, comprobando que la tabla resultante es siempre la misma.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_reproceso.py --paginas 64 --procesos 1 2 4 8
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from src import support_reproceso as sup_repro
+
+
+def generar_archivo(directorio, paginas):
+    """
+    Copia las páginas de `datos/html` en `directorio` hasta tener `paginas` ficheros, con ciudades numeradas.
+    """
+
+    originales = sup_repro.listar_paginas([RAIZ / 'datos' / 'html'])
+    for i in range(paginas):
+        original = originales[i % len(originales)]
+        tipo, ciudad = original.stem.split('_')[:2]
+        shutil.copy(original, Path(directorio) / f'{tipo}_{ciudad}{i:05d}.html')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paginas', type=int, default=64, help='Número de páginas del archivo de prueba')
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, 2, 4, os.cpu_count()], help='Números de procesos a medir')
+    parser.add_argument('--parser', default=None, help="Backend de parseo: 'lxml' o 'html.parser'")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        generar_archivo(directorio, args.paginas)
+        print(f'Páginas: {args.paginas}, núcleos: {os.cpu_count()}')
+
+        referencia, tiempo_referencia = None, None
+        for procesos in sorted(set(args.procesos)):
+            inicio = time.perf_counter()
+            tablas = sup_repro.reprocesar([directorio], procesos, args.parser)
+            duracion = time.perf_counter() - inicio
+
+            if referencia is None:
+                referencia, tiempo_referencia = tablas, duracion
+            for tipo in referencia:
+                pd.testing.assert_frame_equal(referencia[tipo], tablas[tipo])
+
+            print(f'{procesos:3d} procesos: {duracion:8.3f} s  ({args.paginas / duracion:6.1f} páginas/s, x{tiempo_referencia / duracion:.2f})')
+
+    print('Resultados idénticos')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Suite de benchmarks del procesado con los datos del repositorio y con entradas sintéticas escaladas.
+
+Casos:
+    obtener_actividades  las páginas de `datos/html/actividades_*.html`, replicadas `escala` veces.
+    soup_to_df           tarjetas de Booking generadas con los alojamientos de `datos/df_alojamientos_*.csv`, replicadas.
+    clean_df             el texto sin limpiar de esos alojamientos (ver bench_clean_df.py), replicado.
+    crear_dataframe      las respuestas de `datos/jsons/respuestas/vuelo_*.json` con sus itinerarios replicados, leídas del fichero.
+
+De cada caso y escala se mide la mediana del tiempo de varias repeticiones y el pico de memoria de una ejecución
+aparte (memoria reservada desde Python con tracemalloc, incluidos los arrays de numpy y pandas; los árboles de lxml
+no cuentan). Por eso en los casos que parsean HTML (obtener_actividades y soup_to_df) se mide además el pico de
+memoria residente (RSS) de otra ejecución en un proceso hijo, que sí incluye lxml. Esos dos casos llegan a 100x
+por defecto (a 1000x cada medida tarda minutos y necesita varios GB); el motivo queda en la línea base.
+
+Con --guardar se escribe la línea base en benchmarks/baseline.json; sin él se compara con ella y el script termina
+con código 1 si algún caso supera la tolerancia de tiempo o de memoria. La línea base depende de la máquina: hay
+que generarla en la misma en la que se compara.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_suite.py --guardar                       # medir y guardar la línea base
+    python benchmarks/bench_suite.py                                 # medir y comparar con la línea base
+    python benchmarks/bench_suite.py --casos clean_df --escalas 1 10 100 1000
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from bench_clean_df import desformatear
+from src import support_actividades as sup_act
+from src import support_alojamiento as sup_aloja
+from src import support_parser as sup_parser
+from src import support_vuelos as sup_vuelos
+
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+
+def _alojamientos():
+    rutas = sorted(glob.glob(str(RAIZ / 'datos' / 'df_alojamientos_*.csv')))
+    return pd.concat([pd.read_csv(ruta, index_col=0) for ruta in rutas], ignore_index=True)
+
+
+def preparar_actividades(escala, directorio):
+    paginas = {Path(ruta).stem.split('_')[1]: Path(ruta).read_text(encoding='utf-8') for ruta in sorted(glob.glob(str(RAIZ / 'datos' / 'html' / 'actividades_*.html')))}
+    df = pd.DataFrame({'ciudades': list(paginas) * escala, 'codigos_pagina': list(paginas.values()) * escala})
+    return len(df), lambda: df
+
+
+def tarjeta_booking(fila):
+    """
+    Devuelve el HTML de una tarjeta de propiedad de Booking con los 'data-testid' que lee `esquema_propiedad`.
+    """
+
+    partes = [f'<div data-testid="title">{fila["Name"]}</div>',
+              f'<a data-testid="title-link" href="{fila["Link"]}">Ver disponibilidad</a>',
+              f'<span data-testid="address">{fila["Address"]}</span>',
+              f'<span data-testid="distance">{fila["Distance to center"]}</span>',
+              f'<span data-testid="price-and-discounted-price">{fila["Price (€)"]}</span>']
+    if not pd.isna(fila['Score']):
+        # El plan se queda con los caracteres 11 a 15 del texto: 'Puntuación 8,3 '
+        partes.append(f'<div data-testid="review-score">Puntuación {fila["Score"]:<4}<div>Muy bien</div></div>')
+    if not pd.isna(fila['Location score']):
+        partes.append(f'<a data-testid="secondary-review-score-link"><span>{fila["Location score"]}</span></a>')
+    return f'<div data-testid="property-card">{"".join(partes)}</div>'
+
+
+def preparar_soup_to_df(escala, directorio):
+    crudo = desformatear(_alojamientos())
+    tarjetas = ''.join(tarjeta_booking(fila) for _, fila in crudo.iterrows())
+    html = f'<html><body>{tarjetas * escala}</body></html>'
+    return len(crudo) * escala, lambda: html
+
+
+def preparar_clean_df(escala, directorio):
+    df = pd.concat([desformatear(_alojamientos())] * escala, ignore_index=True)
+    return len(df), df.copy
+
+
+def preparar_crear_dataframe(escala, directorio):
+    rutas = []
+    filas = 0
+    for ruta in sorted(glob.glob(str(RAIZ / 'datos' / 'jsons' / 'respuestas' / 'vuelo_*.json'))):
+        data = json.loads(Path(ruta).read_text(encoding='utf-8'))
+        data['data']['itineraries'] = data['data']['itineraries'] * escala
+        filas += len(data['data']['itineraries'])
+        rutas.append(Path(directorio) / Path(ruta).name)
+        rutas[-1].write_text(json.dumps(data), encoding='utf-8')
+    return filas, lambda: rutas
+
+
+# Los casos con 'rss' parsean HTML con lxml, cuya memoria no ve tracemalloc; 'omitidas' explica las escalas que no se miden
+CASOS = {
+    'obtener_actividades': {'preparar': preparar_actividades, 'ejecutar': sup_act.obtener_actividades, 'escalas': [1, 10, 100], 'rss': True,
+                            'omitidas': {1000: '2000 páginas de 3 MB: unos 15 minutos por escala; las páginas se parsean de una en una, '
+                                               'así que 100x ya muestra si la memoria deja de ser constante'}},
+    'soup_to_df': {'preparar': preparar_soup_to_df, 'ejecutar': sup_aloja.soup_to_df, 'escalas': [1, 10, 100], 'rss': True,
+                   'omitidas': {1000: 'El árbol de lxml de 1,5 millones de tarjetas ocupa unos 10 GB de RSS (1 GB a 100x)'}},
+    'clean_df': {'preparar': preparar_clean_df, 'ejecutar': sup_aloja.clean_df, 'escalas': [1, 10, 100, 1000]},
+    'crear_dataframe': {'preparar': preparar_crear_dataframe, 'ejecutar': lambda rutas: [sup_vuelos.crear_dataframe(str(ruta)) for ruta in rutas],
+                        'escalas': [1, 10, 100, 1000]},
+}
+
+
+def medir(ejecutar, entrada, repeticiones):
+    """
+    Devuelve la mediana del tiempo de `repeticiones` ejecuciones y el pico de memoria de una ejecución más, en MB.
+    """
+
+    tiempos = []
+    for _ in range(repeticiones):
+        datos = entrada()
+        inicio = time.perf_counter()
+        ejecutar(datos)
+        tiempos.append(time.perf_counter() - inicio)
+
+    datos = entrada()
+    tracemalloc.start()
+    ejecutar(datos)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return statistics.median(tiempos), pico / 2**20
+
+
+def _rss_actual():
+    """
+    Devuelve la memoria residente actual del proceso en bytes (en Linux; en otros sistemas, el pico hasta ahora).
+    """
+
+    statm = Path('/proc/self/statm')
+    if statm.exists():
+        import resource
+
+        return int(statm.read_text().split()[1]) * resource.getpagesize()
+    return _rss_pico()
+
+
+def _reiniciar_rss_pico():
+    """
+    Pone el pico de memoria residente al valor actual (en Linux), para que no cuente lo reservado al importar y preparar.
+    """
+
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        pass
+
+
+def _rss_pico():
+    status = Path('/proc/self/status')
+    if status.exists():
+        for linea in status.read_text().splitlines():
+            if linea.startswith('VmHWM:'):
+                return int(linea.split()[1]) * 1024
+
+    import resource
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def _medir_rss_hijo(caso, escala, directorio, parser):
+    if parser is not None:
+        sup_parser.PARSER_POR_DEFECTO = parser
+    _, entrada = CASOS[caso]['preparar'](escala, directorio)
+    datos = entrada()
+    _reiniciar_rss_pico()
+    antes = _rss_actual()
+    CASOS[caso]['ejecutar'](datos)
+    return max(0, _rss_pico() - antes) / 2**20
+
+
+def medir_rss(caso, escala, directorio, parser):
+    """
+    Devuelve en MB lo que crece el pico de memoria residente al ejecutar un caso, medido en un proceso nuevo para que
+    no cuente la memoria que el proceso principal ya tenía reservada.
+    """
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as ejecutor:
+        return ejecutor.submit(_medir_rss_hijo, caso, escala, directorio, parser).result()
+
+
+def comparar(resultado, base, tolerancia_tiempo, tolerancia_memoria, minimo_tiempo, minimo_rss):
+    """
+    Devuelve los motivos por los que una medida empeora respecto a la línea base (lista vacía si no empeora).
+    """
+
+    motivos = []
+    limite = base['segundos'] * (1 + tolerancia_tiempo)
+    # Por debajo de `minimo_tiempo` las diferencias son ruido de la máquina
+    if resultado['segundos'] > limite and resultado['segundos'] - base['segundos'] > minimo_tiempo:
+        motivos.append(f"tiempo {resultado['segundos']:.3f} s > {limite:.3f} s")
+    limite = base['memoria_mb'] * (1 + tolerancia_memoria)
+    if resultado['memoria_mb'] > limite:
+        motivos.append(f"memoria {resultado['memoria_mb']:.1f} MB > {limite:.1f} MB")
+    if 'rss_mb' in resultado and 'rss_mb' in base:
+        limite = base['rss_mb'] * (1 + tolerancia_memoria)
+        # El RSS crece por páginas y arenas del asignador: por debajo de `minimo_rss` las diferencias son ruido
+        if resultado['rss_mb'] > limite and resultado['rss_mb'] - base['rss_mb'] > minimo_rss:
+            motivos.append(f"RSS {resultado['rss_mb']:.1f} MB > {limite:.1f} MB")
+    return motivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--casos', nargs='+', choices=list(CASOS), default=list(CASOS), help='Casos a medir')
+    parser.add_argument('--escalas', type=int, nargs='+', help='Escalas a medir en todos los casos (por defecto, las de cada caso)')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Ejecuciones cronometradas de cada caso y escala')
+    parser.add_argument('--parser', default=None, help="Backend de parseo: 'lxml' o 'html.parser'")
+    parser.add_argument('--guardar', action='store_true', help='Guardar las medidas como nueva línea base')
+    parser.add_argument('--baseline', default=str(BASELINE), help='Fichero de la línea base')
+    parser.add_argument('--tolerancia-tiempo', type=float, default=0.5, help='Empeoramiento de tiempo admitido (0.5 = 50 %%)')
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.2, help='Empeoramiento de memoria admitido (0.2 = 20 %%)')
+    parser.add_argument('--minimo-tiempo', type=float, default=0.01, help='Diferencia de tiempo en segundos por debajo de la cual no se considera empeoramiento')
+    parser.add_argument('--minimo-rss', type=float, default=5.0, help='Diferencia de RSS en MB por debajo de la cual no se considera empeoramiento')
+    args = parser.parse_args()
+
+    if args.parser is not None:
+        sup_parser.PARSER_POR_DEFECTO = args.parser
+
+    ruta_base = Path(args.baseline)
+    base = json.loads(ruta_base.read_text(encoding='utf-8')) if ruta_base.exists() else {'medidas': {}}
+    medidas = {}
+    empeoramientos = []
+
+    print(f"{'caso':<22}{'escala':>7}{'filas':>10}{'tiempo (s)':>12}{'memoria (MB)':>14}{'RSS (MB)':>10}   línea base")
+    with tempfile.TemporaryDirectory() as directorio:
+        for caso in args.casos:
+            for escala in args.escalas or CASOS[caso]['escalas']:
+                filas, entrada = CASOS[caso]['preparar'](escala, directorio)
+                segundos, memoria = medir(CASOS[caso]['ejecutar'], entrada, args.repeticiones)
+                clave = f'{caso}@{escala}'
+                medidas[clave] = {'filas': filas, 'segundos': segundos, 'memoria_mb': memoria}
+                if CASOS[caso].get('rss'):
+                    medidas[clave]['rss_mb'] = medir_rss(caso, escala, directorio, args.parser)
+
+                referencia = base['medidas'].get(clave)
+                if referencia is None:
+                    estado = '-'
+                else:
+                    motivos = comparar(medidas[clave], referencia, args.tolerancia_tiempo, args.tolerancia_memoria, args.minimo_tiempo, args.minimo_rss)
+                    empeoramientos.extend(f'{clave}: {motivo}' for motivo in motivos)
+                    estado = 'EMPEORA' if motivos else f"ok ({segundos / referencia['segundos']:.2f}x tiempo, {memoria / referencia['memoria_mb']:.2f}x memoria)"
+                rss = f"{medidas[clave]['rss_mb']:.1f}" if 'rss_mb' in medidas[clave] else '-'
+                print(f'{caso:<22}{escala:>7}{filas:>10}{segundos:>12.3f}{memoria:>14.1f}{rss:>10}   {estado}')
+
+    if args.guardar:
+        base['medidas'].update(medidas)
+        base['escalas_omitidas'] = {f'{caso}@{escala}': motivo for caso, definicion in CASOS.items()
+                                    for escala, motivo in definicion.get('omitidas', {}).items()}
+        base['entorno'] = {'python': platform.python_version(), 'pandas': pd.__version__, 'parser': sup_parser.PARSER_POR_DEFECTO,
+                           'maquina': platform.machine(), 'sistema': platform.system()}
+        ruta_base.write_text(json.dumps(base, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f'Línea base guardada en {ruta_base}')
+        return
+
+    if empeoramientos:
+        print('\nEmpeoramientos respecto a la línea base:')
+        for empeoramiento in empeoramientos:
+            print(f'  {empeoramiento}')
+        sys.exit(1)
+    print('\nSin empeoramientos respecto a la línea base')
+
+
+if __name__ == '__main__':
+    main()
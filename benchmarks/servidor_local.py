@@ -0,0 +1,235 @@
+"""
+Servidor local que imita TripAdvisor, Booking y la API de vuelos de Sky-Scrapper con las respuestas grabadas en `datos/`,
+para medir y ajustar la descarga sin tocar las webs reales.
+
+Rutas:
+    /actividades/<ruta>                  una página de `datos/html/actividades_*.html`: la de la ciudad si su nombre aparece
+                                         en la ruta y si no una cualquiera (siempre la misma para la misma ruta)
+    /searchresults.es.html?dest_id=...   una página de resultados de Booking con las tarjetas de `datos/df_alojamientos_*.csv`
+                                         de la ciudad (París -1456928, Barcelona -372490)
+    /api/v2/flights/searchFlights?...    la respuesta de `datos/jsons/respuestas/vuelo_<origen>_<destino>_2025.json` de la ruta
+    /__estadisticas                      las respuestas servidas por código de estado, en JSON
+
+Cada respuesta tarda `--latencia` segundos más una parte aleatoria exponencial de media `--variacion`, que da una
+cola larga de tiempos como la de un servidor real. Con `--errores` una fracción de las respuestas son 503, y con
+`--tasa-maxima` el servidor admite como mucho esas peticiones por segundo (con ráfagas de `--rafaga`) y contesta 429
+con Retry-After a las que se pasan, como hacen las webs cuando se les pide demasiado rápido.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/servidor_local.py --puerto 8000 --latencia 0.2 --variacion 0.1 --errores 0.02 --tasa-maxima 20
+"""
+
+import argparse
+import glob
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from bench_clean_df import desformatear
+from bench_suite import tarjeta_booking
+from src import support_busqueda_vuelos as sup_busq
+
+
+# dest_id de Booking -> CSV de alojamientos de la ciudad
+ALOJAMIENTOS = {
+    '-1456928': RAIZ / 'datos' / 'df_alojamientos_2025_02_13-16.csv',
+    '-372490': RAIZ / 'datos' / 'df_alojamientos_Barcelona_2025_02_13-16.csv',
+}
+
+
+def cargar_respuestas():
+    """
+    Lee las respuestas grabadas y devuelve un diccionario con las páginas de actividades por ciudad, las páginas de
+    Booking por dest_id y las respuestas de vuelos por (skyId de origen, skyId de destino), todo ya en bytes.
+    """
+
+    actividades = {Path(ruta).stem.split('_')[1].lower(): Path(ruta).read_bytes()
+                   for ruta in sorted(glob.glob(str(RAIZ / 'datos' / 'html' / 'actividades_*.html')))}
+
+    booking = {}
+    for dest_id, ruta in ALOJAMIENTOS.items():
+        crudo = desformatear(pd.read_csv(ruta, index_col=0))
+        booking[dest_id] = f'<html><body>{"".join(tarjeta_booking(fila) for _, fila in crudo.iterrows())}</body></html>'.encode('utf-8')
+
+    vuelos = {}
+    for ruta in sorted(glob.glob(str(RAIZ / 'datos' / 'jsons' / 'respuestas' / 'vuelo_*.json'))):
+        _, origen, destino, _ = Path(ruta).stem.split('_')
+        clave = (sup_busq.cargar_aeropuertos(origen)[0]['skyId'], sup_busq.cargar_aeropuertos(destino)[0]['skyId'])
+        vuelos[clave] = Path(ruta).read_bytes()
+
+    return {'actividades': actividades, 'booking': booking, 'vuelos': vuelos}
+
+
+def _elegir(opciones, texto):
+    """
+    Elige una de las opciones de forma estable a partir de un texto, para que la misma ruta devuelva siempre lo mismo.
+    """
+
+    opciones = list(opciones)
+    return opciones[zlib.crc32(texto.encode('utf-8')) % len(opciones)]
+
+
+class ServidorLocal(ThreadingHTTPServer):
+    """
+    Servidor HTTP con keep-alive y un hilo por conexión que sirve las respuestas grabadas con la latencia, los errores
+    y la limitación de velocidad configurados.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, direccion, latencia=0.1, variacion=0.05, errores=0.0, tasa_maxima=None, rafaga=10, semilla=None):
+        super().__init__(direccion, Manejador)
+        self.respuestas = cargar_respuestas()
+        self.latencia = latencia
+        self.variacion = variacion
+        self.errores = errores
+        self.tasa_maxima = tasa_maxima
+        self.rafaga = rafaga
+        self.aleatorio = random.Random(semilla)
+
+        self.lock = threading.Lock()
+        self.tokens = rafaga
+        self.ultimo = time.monotonic()
+        self.estadisticas = {}
+
+    def admitir(self):
+        """
+        Consume un token del límite de velocidad; devuelve False si no queda ninguno y hay que contestar 429.
+        """
+
+        if self.tasa_maxima is None:
+            return True
+        with self.lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.rafaga, self.tokens + (ahora - self.ultimo) * self.tasa_maxima)
+            self.ultimo = ahora
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def contar(self, status):
+        with self.lock:
+            self.estadisticas[str(status)] = self.estadisticas.get(str(status), 0) + 1
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, contenido, tipo='text/html; charset=utf-8', cabeceras=None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(contenido)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(contenido)
+        if not self.path.startswith('/__'):
+            self.server.contar(status)
+
+    def _contenido(self, partes):
+        """
+        Devuelve el contenido y el tipo de la respuesta grabada de una ruta, o None si la ruta no existe.
+        """
+
+        respuestas = self.server.respuestas
+        ruta = partes.path.lower()
+        consulta = {clave: valores[0] for clave, valores in parse_qs(partes.query).items()}
+
+        if ruta.startswith('/actividades/'):
+            ciudad = next((ciudad for ciudad in respuestas['actividades'] if ciudad in ruta), None)
+            return respuestas['actividades'][ciudad or _elegir(respuestas['actividades'], ruta)], 'text/html; charset=utf-8'
+
+        if ruta.startswith('/searchresults'):
+            dest_id = consulta.get('dest_id')
+            pagina = respuestas['booking'].get(dest_id) or respuestas['booking'][_elegir(respuestas['booking'], partes.query)]
+            return pagina, 'text/html; charset=utf-8'
+
+        if ruta.endswith('/flights/searchflights'):
+            clave = (consulta.get('originSkyId'), consulta.get('destinationSkyId'))
+            vuelos = respuestas['vuelos'].get(clave) or respuestas['vuelos'][_elegir(respuestas['vuelos'], partes.query)]
+            return vuelos, 'application/json'
+
+        return None
+
+    def do_GET(self):
+        servidor = self.server
+        partes = urlsplit(self.path)
+
+        if partes.path == '/__estadisticas':
+            with servidor.lock:
+                contenido = json.dumps(servidor.estadisticas).encode('utf-8')
+            self._responder(200, contenido, 'application/json')
+            return
+
+        if not servidor.admitir():
+            self._responder(429, b'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+            return
+
+        with servidor.lock:
+            espera = servidor.latencia + (servidor.aleatorio.expovariate(1 / servidor.variacion) if servidor.variacion else 0)
+            falla = servidor.aleatorio.random() < servidor.errores
+        time.sleep(espera)
+
+        if falla:
+            self._responder(503, b'Service Unavailable', 'text/plain')
+            return
+
+        respuesta = self._contenido(partes)
+        if respuesta is None:
+            self._responder(404, b'Not Found', 'text/plain')
+            return
+        self._responder(200, *respuesta)
+
+
+def iniciar(puerto=0, **configuracion):
+    """
+    Arranca el servidor en un hilo aparte y lo devuelve; su dirección está en `servidor.url` y se para con `servidor.shutdown()`.
+    """
+
+    servidor = ServidorLocal(('127.0.0.1', puerto), **configuracion)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puerto', type=int, default=8000, help='Puerto (0 para uno libre cualquiera)')
+    parser.add_argument('--latencia', type=float, default=0.1, help='Segundos mínimos de cada respuesta')
+    parser.add_argument('--variacion', type=float, default=0.05, help='Media en segundos de la parte aleatoria de la latencia')
+    parser.add_argument('--errores', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--tasa-maxima', type=float, default=None, help='Peticiones por segundo admitidas; las que se pasan reciben 429')
+    parser.add_argument('--rafaga', type=int, default=10, help='Peticiones seguidas admitidas antes de aplicar la tasa máxima')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla de la latencia y los errores')
+    args = parser.parse_args()
+
+    servidor = ServidorLocal(('127.0.0.1', args.puerto), latencia=args.latencia, variacion=args.variacion, errores=args.errores,
+                             tasa_maxima=args.tasa_maxima, rafaga=args.rafaga, semilla=args.semilla)
+    # La primera línea la lee bench_carga.py para saber dónde conectarse
+    print(f'Sirviendo en {servidor.url}', flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from src.support_cli import main
+
+main()
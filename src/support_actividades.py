@@ -1,26 +1,17 @@
-from bs4 import BeautifulSoup
-
-# Requests
-import requests
-
 import pandas as pd
-import numpy as np
 
 from time import sleep, time
 
-# Importar librerías para automatización de navegadores web con Selenium
-# -----------------------------------------------------------------------
-from selenium import webdriver  # Selenium es una herramienta para automatizar la interacción con navegadores web.
-from webdriver_manager.chrome import ChromeDriverManager  # ChromeDriverManager gestiona la instalación del controlador de Chrome.
-from selenium.webdriver.common.keys import Keys  # Keys es útil para simular eventos de teclado en Selenium.
-from selenium.webdriver.support.ui import Select  # Select se utiliza para interactuar con elementos <select> en páginas web.
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException # Excepciones comunes de selenium que nos podemos encontrar 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-
 import random
+from urllib.parse import quote
+
+# Selenium, requests, BeautifulSoup y tqdm se importan dentro de las funciones que navegan o descargan,
+# para que extraer actividades de páginas ya guardadas no tenga que cargarlos
+
+from src import support_fetch as sup_fetch
+from src import support_metricas as sup_met
+from src import support_navegador as sup_nav
+from src import support_parser as sup_parser
 
 
 def sleep_random_time():
@@ -35,7 +26,8 @@ def sleep_random_time():
     """
 
     random_sleep_time = round(random.uniform(2, 5), 1)    
-    sleep(random_sleep_time)
+    with sup_met.medir('wait', modulo='actividades'):
+        sleep(random_sleep_time)
 
 
 
@@ -60,207 +52,324 @@ def scroll_random(driver):
 
 
 
-def obtener_urls_paginas_principales(ciudades):
+def url_busqueda_ciudad(ciudad):
     """
-    Obtiene las URLs de las páginas principales de búsqueda de TripAdvisor para una lista de ciudades y devuelve un DataFrame con las ciudades y sus URLs.
+    Construye la URL de búsqueda de TripAdvisor para una ciudad. Se usa como clave de caché de la página principal de la ciudad.
 
-    La función automatiza el proceso de búsqueda en el sitio web de TripAdvisor para cada ciudad de la lista, realiza un scroll aleatorio
-    en la página de resultados y devuelve la URL actual. El resultado final se guarda en un DataFrame que contiene las ciudades y las URLs correspondientes.
+    Args:
+        ciudad (str): Nombre de la ciudad.
 
-    Acciones principales:
-    1. Inicializa el navegador en modo incógnito.
-    2. Navega a la página principal de TripAdvisor.
-    3. Interactúa con el banner de cookies si está presente.
-    4. Realiza una búsqueda automática de la ciudad.
-    5. Navega a la página de la primera sugerencia de búsqueda.
-    6. Realiza un scroll aleatorio en la página.
-    7. Almacena la URL actual en una lista.
-    8. Devuelve los resultados en un DataFrame.
+    Returns:
+        str: La URL de búsqueda de la ciudad en TripAdvisor.
+    """
+
+    return f"https://www.tripadvisor.es/Search?q={quote(ciudad)}"
+
+
+# Selectores de la web de TripAdvisor
+SELECTOR_COOKIES = "#onetrust-reject-all-handler"
+SELECTOR_BUSCADOR = '#lithium-root > main > div:nth-child(4) > div > div > div.ctKgY > div > form > div > div > input'
+SELECTOR_SUGERENCIAS = '[role="listbox"] [role="option"]'
+SELECTOR_COSAS_QUE_HACER = '#lithium-root > span > header > span > div > div > div.uNcsI._T.o > div > div.f.M > button:nth-child(3) > span > a'
+SELECTOR_CATEGORIAS = 'div.BYvbL.A'
+COOKIE_CONSENTIMIENTO = 'OptanonAlertBoxClosed'
+
+
+def obtener_pagina_ciudad(driver, ciudad, timeout=10):
+    """
+    Busca una ciudad en TripAdvisor con un navegador ya abierto y devuelve la URL y el código de su página de actividades.
+
+    Cada paso espera a una condición concreta (página cargada, elemento clicable, sugerencias visibles, cambio de URL)
+    en lugar de dormir un tiempo fijo. Los pasos opcionales, como el banner de cookies o las sugerencias, continúan
+    al agotarse el tiempo; los imprescindibles lanzan la excepción para que el pool recicle el navegador.
 
     Args:
-        ciudades (list): Lista de nombres de ciudades para buscar en TripAdvisor.
+        driver (webdriver): El controlador de Selenium que se usará para la búsqueda.
+        ciudad (str): Nombre de la ciudad a buscar.
+        timeout (float): Tiempo máximo de espera de cada paso en segundos.
 
     Returns:
-        pd.DataFrame: Un DataFrame con dos columnas: 'ciudades' y 'urls', donde cada fila corresponde a la URL de búsqueda de la ciudad en TripAdvisor.
+        tuple: (url, codigo_pagina) de la página de actividades de la ciudad.
 
     Raises:
-        Exception: Si falla la interacción con las cookies o la navegación por la página, el script continúa con la siguiente ciudad.
+        TimeoutException: Si no aparece el buscador o la página de actividades de la ciudad.
     """
 
-    urls = []
-    codigos_pagina = []
-    for ciudad in ciudades:
-        chrome_options = Options()
-        chrome_options.add_argument("--incognito")
+    # Importar librerías para automatización de navegadores web con Selenium
+    from selenium.webdriver.common.keys import Keys  # Keys es útil para simular eventos de teclado en Selenium.
+    from selenium.webdriver.support import expected_conditions as EC
 
-        driver = webdriver.Chrome(options=chrome_options)
-        url_wunder = "https://www.tripadvisor.es/"
+    url_wunder = "https://www.tripadvisor.es/"
+    with sup_met.medir('fetch', modulo='actividades'):
         driver.get(url_wunder)
+    sup_nav.esperar(driver, sup_nav.pagina_cargada, timeout)
 
+    # El banner de cookies solo aparece si el navegador aún no tiene la cookie de consentimiento de OneTrust
+    if driver.get_cookie(COOKIE_CONSENTIMIENTO) is None:
+        cookies = sup_nav.esperar(driver, EC.element_to_be_clickable(("css selector", SELECTOR_COOKIES)), timeout / 2, obligatorio=False)
+        if cookies is not None:
+            cookies.click()
 
-        driver.maximize_window()
+    search_box = sup_nav.esperar(driver, EC.element_to_be_clickable(('css selector', SELECTOR_BUSCADOR)), timeout)
+    search_box.click()
+    search_box.clear()
+    search_box.send_keys(ciudad)
 
-        try:
-            WebDriverWait(driver, 10).until(EC.element_to_be_clickable(("css selector", "#onetrust-reject-all-handler"))).click()
-        except:
-            print("Fallo al aceptar las cookies")
+    sup_nav.esperar(driver, EC.visibility_of_element_located(('css selector', SELECTOR_SUGERENCIAS)), timeout, obligatorio=False)
+    search_box.send_keys(Keys.ARROW_DOWN)
+    search_box.send_keys(Keys.ENTER)
+    sup_nav.esperar(driver, EC.url_changes(url_wunder), timeout)
 
-        sup_sel.sleep_random_time()
+    sup_nav.esperar(driver, EC.element_to_be_clickable(('css selector', SELECTOR_COSAS_QUE_HACER)), timeout).click()
+    sup_nav.esperar(driver, EC.presence_of_element_located(('css selector', SELECTOR_CATEGORIAS)), timeout)
 
-        search_box = driver.find_element('css selector', '#lithium-root > main > div:nth-child(4) > div > div > div.ctKgY > div > form > div > div > input')
-        search_box.click()
-        sup_sel.sleep_random_time()
+    # El scroll carga los bloques perezosos; esperamos a que estén los seis que lee obtener_actividades
+    scroll_random(driver)
+    sup_nav.esperar(driver, lambda d: len(d.find_elements('css selector', SELECTOR_CATEGORIAS)) >= 6, timeout, obligatorio=False)
+    sup_nav.esperar(driver, sup_nav.pagina_cargada, timeout, obligatorio=False)
 
-        search_box.send_keys(ciudad)
-        sup_sel.sleep_random_time()
+    return driver.current_url, driver.page_source
 
-        search_box.send_keys(Keys.ARROW_DOWN)
-        sup_sel.sleep_random_time()
 
-        search_box.send_keys(Keys.ENTER)
-        sup_sel.sleep_random_time()
+def _archivar(url, contenido, archivo):
+    """
+    Guarda una página en el archivo de páginas y devuelve su handle, o el propio contenido si no hay archivo.
+    """
+
+    return archivo.guardar(url, contenido) if archivo is not None else contenido
 
-        WebDriverWait(driver, 10).until(EC.element_to_be_clickable(('css selector', '#lithium-root > span > header > span > div > div > div.uNcsI._T.o > div > div.f.M > button:nth-child(3) > span > a'))).click()
-        sup_sel.scroll_random(driver)
-        sleep(10) #dejamos tiempo a que cargen las cosas
 
-        urls.append(driver.current_url)
-        sleep(5)
-        codigos_pagina.append(driver.page_source)
 
-        sleep(1)
-        driver.quit()
+def _pagina_ciudad_en_cache(ciudad, cache, archivo=None):
+    """
+    Devuelve la URL y el código (o su handle en el archivo) de la página de una ciudad guardada en la caché, o None si
+    no hay caché o la ciudad no está en ella. Sin la URL final en los metadatos se usa la URL de búsqueda.
+    """
 
-    return pd.DataFrame({'ciudades': ciudades, 'urls': urls, 'codigos_pagina': codigos_pagina})
+    if cache is None:
+        return None
+    url_busqueda = url_busqueda_ciudad(ciudad)
+    guardado = cache.obtener(url_busqueda, con_metadatos=True)
+    if guardado is None:
+        return None
 
+    contenido, metadatos = guardado
+    url = metadatos.get('url', url_busqueda)
+    return url, _archivar(url, contenido.decode('utf-8'), archivo)
 
-def obtener_html_de_urls(urls):
+
+def obtener_urls_paginas_principales(ciudades, cache=None, pool=None, navegadores=2, archivo=None, diario=None):
     """
-    Realiza una solicitud HTTP a una URL de TripAdvisor simulando un navegador real y evitando la detección mediante técnicas de scraping.
+    Obtiene las URLs de las páginas principales de búsqueda de TripAdvisor para una lista de ciudades y devuelve un DataFrame con las ciudades y sus URLs.
 
-    Esta función envía una solicitud `GET` a la URL especificada utilizando encabezados personalizados para simular un navegador real.
-    Además, implementa una pausa aleatoria para imitar el comportamiento humano y evitar ser bloqueado por mecanismos de detección de bots.
+    La función automatiza el proceso de búsqueda en el sitio web de TripAdvisor para cada ciudad de la lista, realiza un scroll aleatorio
+    en la página de resultados y devuelve la URL actual. El resultado final se guarda en un DataFrame que contiene las ciudades y las URLs correspondientes.
 
     Acciones principales:
-    1. Genera un User-Agent aleatorio usando la biblioteca `fake_useragent` para simular diferentes navegadores en cada solicitud.
-    2. Añade un encabezado que indica que el lenguaje preferido es el español ('es').
-    3. Envía la solicitud `GET` a la URL especificada.
-    4. Implementa un retraso aleatorio entre 2 y 5 segundos para evitar realizar solicitudes demasiado rápidas, imitando así el comportamiento humano.
+    1. Si la ciudad ya está en el diario de una ejecución anterior, o en la caché, recupera su URL y su código de página sin abrir el navegador.
+    2. Reparte el resto de ciudades entre un pool de navegadores headless que se reutilizan de una ciudad a otra.
+    3. Para cada ciudad, busca en TripAdvisor y abre su página de actividades con `obtener_pagina_ciudad`.
+    4. Almacena la URL actual y el código de la página (también en la caché, si se ha indicado). Con un archivo de páginas,
+       el código se comprime en disco nada más descargarlo y el DataFrame solo guarda su handle. Con un diario, cada ciudad
+       terminada se registra en él en ese momento, de modo que si el proceso se corta la siguiente ejecución continúa donde lo dejó.
+    5. Devuelve los resultados en un DataFrame, en el mismo orden que `ciudades`.
 
     Args:
-        url (str): La URL de TripAdvisor (o cualquier otra página) que se desea scrapeer.
+        ciudades (list): Lista de nombres de ciudades para buscar en TripAdvisor.
+        cache (CachePaginas, optional): Caché de páginas de `support_cache`.
+        pool (PoolNavegadores, optional): Pool de navegadores de `support_navegador`. Si no se indica se crea uno y se cierra al terminar.
+        navegadores (int): Número de navegadores en paralelo del pool creado por la función.
+        archivo (ArchivoPaginas, optional): Archivo de páginas de `support_archivo`.
+        diario (Diario, optional): Diario de `support_diario` con las ciudades ya terminadas, por la URL de búsqueda de la ciudad.
 
     Returns:
-        str: El contenido HTML de la página si la solicitud es exitosa (código de estado 200).
-        None: Si la solicitud falla, no se devuelve ningún contenido, y se imprime un mensaje de error con el código de estado.
+        pd.DataFrame: Un DataFrame con las columnas 'ciudades', 'urls' y 'codigos_pagina', donde cada fila corresponde a la URL de búsqueda de la ciudad en TripAdvisor.
+                      Si se indica un archivo, 'codigos_pagina' contiene handles `PaginaArchivada` en lugar del HTML.
 
     Raises:
-        Exception: Si ocurre algún error durante la solicitud, la función manejará el código de estado con un mensaje adecuado.
+        Exception: Si falla la navegación por la página de una ciudad, se imprime el error y el script continúa con las demás ciudades.
     """
 
-    resultado = {'urls': [], 'html': []}
-    for url in urls:
-        sleep(5)
-        headers = {
-        # Decirle al server lenguaje español
-        'accept-language': 'es', 
-        # Simulamos que somos el navegador Chrome
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.69 Safari/537.36'
-        }
-
-        respuesta = requests.get(url, headers=headers)
-
-        if respuesta.status_code == 200:
-            resultado['urls'].append(url)
-            resultado['html'].append(BeautifulSoup(respuesta.content, 'html.parser'))
-
-    return pd.DataFrame(resultado)
+    resultados = {}
+    pendientes = []
+    for ciudad in ciudades:
+        url_busqueda = url_busqueda_ciudad(ciudad)
+        if diario is not None and url_busqueda in diario:
+            resultados[ciudad] = diario.obtener(url_busqueda)
+            continue
+
+        guardado = _pagina_ciudad_en_cache(ciudad, cache, archivo)
+        if guardado is not None:
+            resultados[ciudad] = guardado
+        else:
+            pendientes.append(ciudad)
+
+    def descargar(driver, ciudad):
+        # Cada página se guarda en cuanto se descarga, para no acumular el HTML de todas las ciudades en memoria
+        url, codigo_pagina = obtener_pagina_ciudad(driver, ciudad)
+        if cache is not None:
+            cache.guardar(url_busqueda_ciudad(ciudad), codigo_pagina, fuente='tripadvisor', metadatos={'url': url})
+
+        resultado = (url, _archivar(url, codigo_pagina, archivo))
+        if diario is not None:
+            diario.registrar(url_busqueda_ciudad(ciudad), resultado)
+        return resultado
+
+    if pendientes:
+        pool_propio = pool is None
+        pool = pool or sup_nav.PoolNavegadores(tamano=min(navegadores, len(pendientes)))
+        try:
+            for ciudad, resultado in zip(pendientes, pool.mapear(descargar, pendientes)):
+                if isinstance(resultado, Exception):
+                    print(f"Fallo al obtener la página de {ciudad}: {resultado!r}")
+                    continue
 
+                resultados[ciudad] = resultado
+        finally:
+            if pool_propio:
+                pool.cerrar()
 
-# SECCION OBTENER INFO
+    ciudades = [ciudad for ciudad in ciudades if ciudad in resultados]
+    return pd.DataFrame({'ciudades': ciudades,
+                         'urls': [resultados[ciudad][0] for ciudad in ciudades],
+                         'codigos_pagina': [resultados[ciudad][1] for ciudad in ciudades]})
 
-funciones_primera_celda = {
-    'get_subcategoria': lambda item:  item.find('span',{'class': 'biGQs _P fiohW hmDzD'}).getText(),
-    'get_nombre': lambda item:  item.find('h3',{'class': 'biGQs _P fiohW alXOW EEXWj GzNcM BYtua UTQMg alvrA fOtGX'}).getText(),
-    'get_precio': lambda item:  item.find('div',{'class': 'biGQs _P fiohW fOtGX'}).getText().replace('\xa0€',''),
-    'get_puntuacion': lambda item:  item.find('div',{'class': 'jVDab W f u w JqMhy'}).get('aria-label', 'Desconocido').split(' ')[0].replace(',','.'),
-    'get_n_reviews': lambda item:  item.find('div',{'class': 'jVDab W f u w JqMhy'}).get('aria-label', 'Desconocido').split(' ')[-2],
-    'get_url_detalles': lambda item:  item.find('a',{'class': 'BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS'})['href'],
-}
 
-funciones_celdas = {
-    'get_subcategoria': lambda item:  item.find_all('div',{'class': 'biGQs _P pZUbB hmDzD'})[1].getText(),
-    'get_nombre': lambda item:  item.find('div',{'class': 'biGQs _P fiohW alXOW NwcxK GzNcM ytVPx UTQMg RnEEZ ngXxk'}).getText(),
-    'get_precio': lambda item:  item.find('div',{'class': 'biGQs _P fiohW avBIb fOtGX'}).getText().replace('\xa0€',''),
-    'get_puntuacion': lambda item:  item.find('div',{'class': 'jVDab W f u w JqMhy'}).get('aria-label', 'Desconocido').split(' ')[0].replace(',','.'),
-    'get_n_reviews': lambda item:  item.find('div',{'class': 'jVDab W f u w JqMhy'}).get('aria-label', 'Desconocido').split(' ')[-2],
-    'get_url_detalles': lambda item:  item.find('a',{'class': 'BMQDV _F Gv wSSLS SwZTJ hNpWR'})['href'],
-}
+def obtener_html_de_urls(urls, concurrencia=8, tasa_por_host=0.5, reintentos=3, cache=None, archivo=None, diario=None):
+    """
+    Descarga el HTML de una lista de URLs de TripAdvisor simulando un navegador real, de forma concurrente y respetando un límite de velocidad por servidor.
 
+    Esta función envía solicitudes `GET` a las URLs especificadas utilizando encabezados personalizados para simular un navegador real.
+    En lugar de esperar una pausa fija antes de cada petición, limita la velocidad con un token bucket por host para no ser bloqueado.
 
-def obter_info(funcion, item):
-    """
-    Obtiene información de un elemento aplicando una función proporcionada. Si ocurre algún error,
-    retorna 'Desconocido' como valor predeterminado.
+    Acciones principales:
+    1. Reutiliza una sesión con conexiones keep-alive por host, con los encabezados de idioma español y User-Agent de Chrome.
+    2. Lanza hasta `concurrencia` peticiones a la vez, respetando `tasa_por_host` peticiones por segundo en cada servidor.
+    3. Reintenta con backoff exponencial las respuestas 429 y 5xx y los errores de red.
+       Las páginas que ya están en la caché (si se indica) se sirven desde disco sin hacer la petición.
+    4. Muestra el progreso a medida que llegan las respuestas y guarda las que tienen código de estado 200.
+       Con un diario, cada página descargada se registra en él al llegar y las URLs ya registradas no se vuelven a pedir.
 
     Args:
-        funcion (callable): La función que se aplicará al elemento para extraer la información.
-        item (objeto): El elemento sobre el cual se aplicará la función.
+        urls (list): Las URLs de TripAdvisor (o cualquier otra página) que se desean scrapear.
+        concurrencia (int): Número máximo de peticiones simultáneas.
+        tasa_por_host (float): Peticiones por segundo permitidas para cada servidor.
+        reintentos (int): Número máximo de reintentos por URL.
+        cache (CachePaginas, optional): Caché de páginas de `support_cache`.
+        archivo (ArchivoPaginas, optional): Archivo de páginas de `support_archivo`. Si se indica, cada página se comprime en disco
+                                            al llegar y la columna 'html' contiene handles `PaginaArchivada` en lugar de objetos BeautifulSoup,
+                                            que se descomprimen al pasarlos a `support_parser.parsear`.
+        diario (Diario, optional): Diario de `support_diario` con las URLs ya descargadas.
 
     Returns:
-        str: El resultado de aplicar la función al item, o 'Desconocido' si ocurre un error.
+        pd.DataFrame: Un DataFrame con las columnas 'urls' y 'html' (objeto BeautifulSoup o handle) para las solicitudes exitosas, en el mismo orden que `urls`.
+        Las URLs que fallan se omiten y se imprime un mensaje con su código de estado.
     """
 
-    try:
-        return funcion(item)
-    except:
-        return 'Desconocido'
+    from bs4 import BeautifulSoup
+    from tqdm import tqdm
+
+    # Las URLs que ya están en el diario de una ejecución anterior no se vuelven a descargar
+    respuestas = {}
+    pendientes = []
+    for posicion, url in enumerate(urls):
+        if diario is not None and url in diario:
+            respuestas[posicion] = diario.obtener(url)
+        else:
+            pendientes.append(posicion)
+
+    descargas = sup_fetch.iterar_descargas([urls[posicion] for posicion in pendientes], concurrencia=concurrencia, tasa_por_host=tasa_por_host, reintentos=reintentos, cache=cache)
+
+    for respuesta in tqdm(descargas, total=len(pendientes)):
+        if respuesta['status'] == 200:
+            contenido = _archivar(respuesta['url'], respuesta['contenido'], archivo)
+            if diario is not None:
+                diario.registrar(respuesta['url'], contenido)
+            respuestas[pendientes[respuesta['posicion']]] = contenido
+        else:
+            print(f"Fallo al descargar {respuesta['url']}: {respuesta['status'] or respuesta['error']}")
 
+    resultado = {'urls': [], 'html': []}
+    for posicion in sorted(respuestas):
+        resultado['urls'].append(urls[posicion])
+        contenido = respuestas[posicion]
+        resultado['html'].append(BeautifulSoup(contenido, 'html.parser') if isinstance(contenido, bytes) else contenido)
+
+    return pd.DataFrame(resultado)
+
+
+# SECCION OBTENER INFO
+
+# Los bloques de actividades de la página de una ciudad, en el orden en que aparecen
+CATEGORIAS = ['INPRESCINDIBLES', 'GASTRONOMIA', 'ARTE Y CULTURA', 'ATRACCIONES PRINCIPALES', 'OTRAS ATRACCIONES PRINCIPALES', 'VISITAS GUIADAS']
+
+# Las dos secciones comparten el nodo de la puntuación: el plan compilado lo busca una sola vez por actividad
+CLASE_PUNTUACION = {'class': 'jVDab W f u w JqMhy'}
 
-def obtener_actividades(df):
+esquema_primera_celda = {
+    'subcategoria': {'tag': 'span', 'attrs': {'class': 'biGQs _P fiohW hmDzD'}},
+    'nombre': {'tag': 'h3', 'attrs': {'class': 'biGQs _P fiohW alXOW EEXWj GzNcM BYtua UTQMg alvrA fOtGX'}},
+    'precio': {'tag': 'div', 'attrs': {'class': 'biGQs _P fiohW fOtGX'}, 'limpiar': lambda x: x.replace('\xa0€','')},
+    'puntuacion': {'tag': 'div', 'attrs': CLASE_PUNTUACION, 'atributo': 'aria-label', 'limpiar': lambda x: x.split(' ')[0].replace(',','.')},
+    'n_reviews': {'tag': 'div', 'attrs': CLASE_PUNTUACION, 'atributo': 'aria-label', 'limpiar': lambda x: x.split(' ')[-2]},
+    'url_detalles': {'tag': 'a', 'attrs': {'class': 'BMQDV _F Gv wSSLS SwZTJ FGwzt ukgoS'}, 'atributo': 'href'},
+}
+
+esquema_celdas = {
+    'subcategoria': {'tag': 'div', 'attrs': {'class': 'biGQs _P pZUbB hmDzD'}, 'indice': 1},
+    'nombre': {'tag': 'div', 'attrs': {'class': 'biGQs _P fiohW alXOW NwcxK GzNcM ytVPx UTQMg RnEEZ ngXxk'}},
+    'precio': {'tag': 'div', 'attrs': {'class': 'biGQs _P fiohW avBIb fOtGX'}, 'limpiar': lambda x: x.replace('\xa0€','')},
+    'puntuacion': {'tag': 'div', 'attrs': CLASE_PUNTUACION, 'atributo': 'aria-label', 'limpiar': lambda x: x.split(' ')[0].replace(',','.')},
+    'n_reviews': {'tag': 'div', 'attrs': CLASE_PUNTUACION, 'atributo': 'aria-label', 'limpiar': lambda x: x.split(' ')[-2]},
+    'url_detalles': {'tag': 'a', 'attrs': {'class': 'BMQDV _F Gv wSSLS SwZTJ hNpWR'}, 'atributo': 'href'},
+}
+
+plan_primera_celda = sup_parser.compilar_esquema(esquema_primera_celda, defecto='Desconocido', nombre='actividades_primera_celda')
+plan_celdas = sup_parser.compilar_esquema(esquema_celdas, defecto='Desconocido', nombre='actividades_celdas')
+
+
+def obtener_actividades(df, parser=None):
     """
     Extrae información de actividades de una columna HTML de un DataFrame y la organiza en categorías,
     subcategorías, nombres, precios, puntuaciones, número de reseñas y URLs detalladas.
 
+    Los campos se extraen con los planes compilados de `esquema_primera_celda` y `esquema_celdas`. Los que no se
+    encuentran valen 'Desconocido' y se cuentan en `df.attrs['fallos_selectores']`, con un informe por sección
+    (ver `PlanExtraccion.extraer`), para detectar cuándo cambia el diseño de TripAdvisor.
+
     Args:
         df (pd.DataFrame): El DataFrame que contiene una columna de ciudades y otra con código HTML de la página
                            donde se extrae la información de las actividades.
+        parser (str, optional): Backend de parseo ('lxml' o 'html.parser'). Por defecto el más rápido disponible;
+                                ambos producen el mismo DataFrame.
 
     Returns:
         pd.DataFrame: Un nuevo DataFrame que contiene las actividades extraídas, con las columnas:
                       'ciudad', 'categoria', 'subcategoria', 'nombre', 'precio', 'puntuacion', 'n_reviews', 'url_detalles'.
     """
 
-    categorias = ['INPRESCINDIBLES', 'GASTRONOMIA', 'ARTE Y CULTURA', 'ATRACCIONES PRINCIPALES', 'OTRAS ATRACCIONES PRINCIPALES', 'VISITAS GUIADAS']
     resultado = {"ciudad": [], "categoria": [], "subcategoria": [], "nombre": [], "precio": [], "puntuacion": [], "n_reviews": [], "url_detalles": []}
+    informes = {'primera_celda': [], 'celdas': []}
 
-    for i, fila in df.iterrows():
-        ciudad = fila['ciudades']
-        html = BeautifulSoup(fila['codigos_pagina'], 'html.parser')
+    for ciudad, codigo_pagina in zip(df['ciudades'], df['codigos_pagina']):
+        html, p = sup_parser.parsear(codigo_pagina, parser)
 
-        celdas = html.find_all('div', {'class': 'BYvbL A'})[:6]
+        celdas = p['buscar_todos'](html, 'div', {'class': 'BYvbL A'})[:6]
 
         for i, celda in enumerate(celdas):
-            for item in celda.find_all('li')[:4]:
-
-                if i == 0:
-                    resultado['ciudad'].append(ciudad)
-                    resultado['categoria'].append(categorias[i])
-                    resultado['subcategoria'].append(obter_info(funciones_primera_celda['get_subcategoria'], item))
-                    resultado['nombre'].append(obter_info(funciones_primera_celda['get_nombre'], item))
-                    resultado['precio'].append(obter_info(funciones_primera_celda['get_precio'], item))
-                    resultado['puntuacion'].append(obter_info(funciones_primera_celda['get_puntuacion'], item))
-                    resultado['n_reviews'].append(obter_info(funciones_primera_celda['get_n_reviews'], item))
-                    resultado['url_detalles'].append(obter_info(funciones_primera_celda['get_url_detalles'], item))
-                else:
-                    resultado['ciudad'].append(ciudad)
-                    resultado['categoria'].append(categorias[i])
-                    resultado['subcategoria'].append(obter_info(funciones_celdas['get_subcategoria'], item))
-                    resultado['nombre'].append(obter_info(funciones_celdas['get_nombre'], item))
-                    resultado['precio'].append(obter_info(funciones_celdas['get_precio'], item))
-                    resultado['puntuacion'].append(obter_info(funciones_celdas['get_puntuacion'], item))
-                    resultado['n_reviews'].append(obter_info(funciones_celdas['get_n_reviews'], item))
-                    resultado['url_detalles'].append(obter_info(funciones_celdas['get_url_detalles'], item))
-
-    return pd.DataFrame(resultado)                
-        
\ No newline at end of file
+            seccion = 'primera_celda' if i == 0 else 'celdas'
+            plan = plan_primera_celda if i == 0 else plan_celdas
+
+            items = p['buscar_todos'](celda, 'li')[:4]
+            columnas, informe = plan.extraer(items, p)
+            informes[seccion].append(informe)
+
+            resultado['ciudad'].extend([ciudad] * len(items))
+            resultado['categoria'].extend([CATEGORIAS[i]] * len(items))
+            for campo, valores in columnas.items():
+                resultado[campo].extend(valores)
+
+    with sup_met.medir('build', modulo='actividades'):
+        df_actividades = pd.DataFrame(resultado)
+    df_actividades.attrs['fallos_selectores'] = {seccion: sup_parser.sumar_informes(lista) for seccion, lista in informes.items()}
+    return df_actividades
@@ -0,0 +1,160 @@
+import uuid
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+DIRECTORIO_DATASET = Path(__file__).resolve().parent.parent / 'datos' / 'dataset'
+
+# Las particiones se leen siempre como texto, para que 'fecha' no se convierta en número ni en fecha
+PARTICIONES = ds.partitioning(pa.schema([('ciudad', pa.string()), ('fecha', pa.string())]), flavor='hive')
+
+FUENTES = ['actividades', 'alojamientos', 'vuelos']
+
+
+def _a_tabla(df):
+    """
+    Convierte un DataFrame en una tabla de Arrow con las columnas de texto codificadas como diccionario.
+
+    Las columnas de texto (nombres de ciudad, categorías, direcciones...) repiten mucho sus valores, y así se guardan
+    y se leen como índices a una lista de valores distintos (en pandas, como columnas categóricas).
+    """
+
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    for i, campo in enumerate(tabla.schema):
+        if pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+            tabla = tabla.set_column(i, campo.name, tabla.column(i).dictionary_encode())
+    return tabla
+
+
+def guardar_dataset(df, fuente, ciudad=None, fecha=None, raiz=DIRECTORIO_DATASET):
+    """
+    Añade un DataFrame de resultados al dataset Parquet de una fuente, particionado por ciudad y fecha.
+
+    Cada llamada escribe ficheros nuevos dentro de `<raiz>/<fuente>/ciudad=<ciudad>/fecha=<fecha>/`, así que las
+    ejecuciones nuevas de los scrapers nunca reescriben las particiones ya guardadas.
+
+    Args:
+        df (pd.DataFrame): La salida de `obtener_actividades`, `soup_to_df` o `crear_dataframe`.
+        fuente (str): 'actividades', 'alojamientos' o 'vuelos'.
+        ciudad (str, optional): Ciudad de los datos. Si es None se toma de la columna 'ciudad' del DataFrame
+            (como en `obtener_actividades`), con una partición por ciudad.
+        fecha (str o date, optional): Fecha de los datos ('YYYY-MM-DD'), por ejemplo la del scraping o la de check-in. Por defecto hoy.
+        raiz (str o Path): Directorio raíz del dataset.
+
+    Returns:
+        list: Las rutas de los ficheros escritos.
+
+    Raises:
+        ValueError: Si la fuente no existe o no se puede saber la ciudad de los datos.
+    """
+
+    if fuente not in FUENTES:
+        raise ValueError(f"Fuente '{fuente}' no válida. Opciones: {FUENTES}")
+
+    df = df.copy()
+    if ciudad is not None:
+        df['ciudad'] = ciudad
+    elif 'ciudad' not in df.columns:
+        raise ValueError("Indica la ciudad o pasa un DataFrame con la columna 'ciudad'")
+    df['ciudad'] = df['ciudad'].astype(str)
+    df['fecha'] = str(fecha or date.today())
+
+    escritos = []
+    ds.write_dataset(
+        _a_tabla(df),
+        Path(raiz) / fuente,
+        format='parquet',
+        partitioning=PARTICIONES,
+        basename_template=f'parte-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd', use_dictionary=True),
+        file_visitor=lambda fichero: escritos.append(fichero.path),
+    )
+
+    return escritos
+
+
+def _abrir(fuente, raiz, particiones=None):
+    directorio = Path(raiz) / fuente
+
+    # Con el esquema de las particiones el descubrimiento solo lista directorios, y el filtro de ciudad y fecha se
+    # resuelve con sus nombres: solo se abre el pie de los Parquet de las particiones pedidas
+    fragmentos = list(ds.dataset(directorio, format='parquet', partitioning=PARTICIONES, schema=PARTICIONES.schema)
+                      .get_fragments(filter=particiones))
+    if not fragmentos:
+        return ds.dataset(directorio, format='parquet', partitioning=PARTICIONES)
+
+    # Cada ejecución puede traer columnas distintas (por ejemplo, vuelos con más tramos): unificamos los esquemas
+    esquemas = []
+    for fragmento in fragmentos:
+        if not any(fragmento.physical_schema.equals(esquema) for esquema in esquemas):
+            esquemas.append(fragmento.physical_schema)
+
+    esquema = pa.unify_schemas([*esquemas, PARTICIONES.schema], promote_options='permissive')
+    return ds.dataset([fragmento.path for fragmento in fragmentos], format='parquet', partitioning=PARTICIONES,
+                      partition_base_dir=str(directorio), schema=esquema)
+
+
+def leer_dataset(fuente, columnas=None, ciudades=None, fechas=None, filtro=None, raiz=DIRECTORIO_DATASET):
+    """
+    Lee del dataset Parquet solo las columnas y particiones que se piden.
+
+    Los filtros de ciudad y fecha descartan directorios enteros sin abrir sus ficheros, y de los ficheros leídos
+    solo se cargan las columnas indicadas.
+
+    Args:
+        fuente (str): 'actividades', 'alojamientos' o 'vuelos'.
+        columnas (list, optional): Columnas a leer. Por defecto todas (incluidas 'ciudad' y 'fecha').
+        ciudades (list, optional): Ciudades a leer. Por defecto todas.
+        fechas (list, optional): Fechas a leer ('YYYY-MM-DD'). Por defecto todas.
+        filtro (pyarrow.compute.Expression, optional): Filtro adicional, por ejemplo `ds.field('Price (€)') <= 400`.
+        raiz (str o Path): Directorio raíz del dataset.
+
+    Returns:
+        pd.DataFrame: Los datos leídos; las columnas de texto, 'ciudad' y 'fecha' llegan como categóricas.
+    """
+
+    condiciones = []
+    if ciudades is not None:
+        condiciones.append(ds.field('ciudad').isin([str(ciudad) for ciudad in ciudades]))
+    if fechas is not None:
+        condiciones.append(ds.field('fecha').isin([str(fecha) for fecha in fechas]))
+
+    particiones = None
+    for condicion in condiciones:
+        particiones = condicion if particiones is None else particiones & condicion
+    expresion = particiones if filtro is None else filtro if particiones is None else particiones & filtro
+
+    df = _abrir(fuente, raiz, particiones).to_table(columns=columnas, filter=expresion).to_pandas()
+
+    # Las columnas de partición llegan como texto: también las pasamos a categóricas
+    for particion in PARTICIONES.schema.names:
+        if particion in df.columns:
+            df[particion] = df[particion].astype('category')
+
+    return df
+
+
+def listar_particiones(fuente, raiz=DIRECTORIO_DATASET):
+    """
+    Devuelve las particiones (ciudad, fecha) guardadas de una fuente y el número de ficheros de cada una.
+
+    Args:
+        fuente (str): 'actividades', 'alojamientos' o 'vuelos'.
+        raiz (str o Path): Directorio raíz del dataset.
+
+    Returns:
+        pd.DataFrame: Un DataFrame con las columnas 'ciudad', 'fecha' y 'ficheros'.
+    """
+
+    # Las claves salen de los nombres de los directorios: no hace falta abrir los ficheros
+    filas = []
+    for fragmento in ds.dataset(Path(raiz) / fuente, format='parquet', partitioning=PARTICIONES, schema=PARTICIONES.schema).get_fragments():
+        claves = ds.get_partition_keys(fragmento.partition_expression)
+        filas.append({'ciudad': claves.get('ciudad'), 'fecha': claves.get('fecha')})
+
+    return pd.DataFrame(filas, columns=['ciudad', 'fecha']).value_counts().rename('ficheros').reset_index()
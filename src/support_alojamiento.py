@@ -1,12 +1,41 @@
 import pandas as pd
-from bs4 import BeautifulSoup
-import requests
+import numpy as np
 
 import random
 from time import sleep
 
-from selenium import webdriver
-from selenium.webdriver.support import expected_conditions as EC
+# Selenium is imported inside the scraping functions, so cleaning and parsing saved pages does not load it
+
+from src import support_metricas as sup_met
+from src import support_parser as sup_parser
+
+
+# Button to load more results in the Booking search page
+SELECTOR_CARGAR_MAS = '#bodyconstraint-inner > div:nth-child(8) > div > div.af5895d4b2 > div.df7e6ba27d > div.bcbf33c5c3 > div.dcf496a7b9.bb2746aad9 > div.d4924c9e74 > div.c82435a4b8.f581fde0b8 > button'
+
+# Returns the HTML of the property cards not extracted yet and marks them as extracted.
+# If arguments[0] is true, the content of the extracted cards is removed so the browser DOM does not keep growing
+JS_TARJETAS_NUEVAS = """
+const tarjetas = document.querySelectorAll('div[data-testid="property-card"]:not([data-extraido])');
+const html = [];
+tarjetas.forEach(tarjeta => {
+    html.push(tarjeta.outerHTML);
+    tarjeta.setAttribute('data-extraido', '1');
+    if (arguments[0]) {
+        tarjeta.replaceChildren();
+    }
+});
+return html;
+"""
+
+
+def _pausa():
+    """
+    Espera entre 3 y 5 segundos al azar entre acciones del navegador; cuenta como 'wait' en las métricas.
+    """
+
+    with sup_met.medir('wait', modulo='alojamientos'):
+        sleep(random.uniform(3, 5))
 
 
 def distance_conversion(x):
@@ -19,9 +48,12 @@ def distance_conversion(x):
     - x (str): Una cadena de texto que representa la distancia (por ejemplo, '2.5 km' o '500 m'), con comas opcionalmente usadas como separadores decimales.
 
     Retorna:
-    - (float o None): La distancia en kilómetros, o None si la unidad no es reconocida.
+    - (float o None): La distancia en kilómetros, o None si la unidad no es reconocida o el valor falta.
     """
 
+    if not isinstance(x, str):
+        return None
+
     x = x.replace(',', '.')
     
     if x.split()[1] == 'km':
@@ -34,11 +66,44 @@ def distance_conversion(x):
         return None
 
 
+# Divisor to get kilometres from every distance unit; unknown units give NaN
+DIVISOR_UNIDADES = {'km': 1.0, 'm': 1000.0}
+
+
+def _por_valores_unicos(serie, funcion):
+    """
+    Aplica una conversión de texto a número solo sobre los valores distintos de la serie y reparte el resultado a todas las filas.
+
+    Las columnas de Booking repiten mucho sus valores (puntuaciones, distancias, precios), así que las operaciones de texto
+    se hacen sobre unos cientos de valores aunque la tabla tenga millones de filas. Los valores nulos dan NaN.
+
+    Parámetros:
+    - serie (pandas.Series): La columna de texto a convertir.
+    - funcion (callable): Recibe una serie con los valores distintos y devuelve una serie numérica de la misma longitud.
+
+    Retorna:
+    - (pandas.Series): La columna convertida a float, con el mismo índice que `serie`.
+    """
+
+    codigos, unicos = pd.factorize(serie)
+    valores = funcion(pd.Series(unicos, dtype=object)).to_numpy(dtype=float)
+
+    # El código -1 (nulo) apunta al NaN añadido al final
+    return pd.Series(np.append(valores, np.nan)[codigos], index=serie.index)
+
+
+def _convertir_distancias(serie):
+    partes = serie.str.extract(r'(\d+\,?\d*)\s(\w{1,2})')
+    return partes[0].str.replace(',', '.').astype(float) / partes[1].map(DIVISOR_UNIDADES)
+
+
+@sup_met.cronometrado('clean', modulo='alojamientos')
 def clean_df(df):
     """
     Limpia y formatea columnas específicas de un DataFrame.
 
     Esta función procesa las columnas 'Distance to center', 'Score', 'Price (€)', y 'Location score', aplicando las conversiones y formatos necesarios, tales como la extracción de valores numéricos, el manejo de unidades y la conversión de cadenas a valores flotantes.
+    Las conversiones de texto se hacen una sola vez por valor distinto de cada columna, y las filas sin valor quedan como NaN.
 
     Parámetros:
     - df (pandas.DataFrame): El DataFrame de entrada que contiene las columnas a limpiar.
@@ -47,69 +112,104 @@ def clean_df(df):
     - (pandas.DataFrame): El DataFrame limpio con las columnas formateadas.
     """
 
-    # Formatting 'Distance to center'
-    df['Distance to center'] = df['Distance to center'].str.extract(r'(\d+\,?\d*\s\w{1,2})')
-    df['Distance to center'] = df['Distance to center'].apply(distance_conversion)
+    # Formatting 'Distance to center': '2,7 km' -> 2.7, '500 m' -> 0.5, unknown units -> NaN
+    df['Distance to center'] = _por_valores_unicos(df['Distance to center'], _convertir_distancias)
 
     # Formatting 'Score'
-    df['Score'] = df['Score'].str.replace(',', '.').astype(float)
+    df['Score'] = _por_valores_unicos(df['Score'], lambda x: x.str.replace(',', '.').astype(float))
     # Formatting 'Price (€)'
-    df['Price (€)'] = df['Price (€)'].str.replace('€','').str.replace(' ','').str.replace('.','').astype(float)
+    df['Price (€)'] = _por_valores_unicos(df['Price (€)'], lambda x: x.str.replace(r'[€ .]', '', regex=True).astype(float))
     # Formatting 'Location score'
-    df['Location score'] = df['Location score'].str.replace(r'\w+\s','', regex=True).str.replace(',','.').astype(float)
+    df['Location score'] = _por_valores_unicos(df['Location score'], lambda x: x.str.replace(r'\w+\s','', regex=True).str.replace(',','.').astype(float))
+
+    return df
+
+
+# Declarative schema of the information in every property card, compiled once into an extraction plan
+esquema_propiedad = {'Name': {'tag': 'div', 'attrs': {"data-testid": "title"}},
+                     'Address': {'tag': 'span', 'attrs': {"data-testid": "address"}},
+                     'Distance to center': {'tag': 'span', 'attrs': {"data-testid": "distance"}},
+                     'Score': {'tag': 'div', 'attrs': {"data-testid": "review-score"}, 'limpiar': lambda x: x[11:15]},
+                     'Location score': {'tag': 'a', 'attrs': {"data-testid": "secondary-review-score-link"}},
+                     'Price (€)': {'tag': 'span', 'attrs': {"data-testid": "price-and-discounted-price"}},
+                     'Link': {'tag': 'a', 'attrs': {'data-testid': 'title-link'}, 'atributo': 'href'}
+                     }
+
+plan_propiedad = sup_parser.compilar_esquema(esquema_propiedad, nombre='alojamientos_propiedad')
 
+
+def extraer_propiedades(soup, p):
+    """
+    Extrae los datos sin limpiar de cada tarjeta de propiedad ('property-card') de un documento con `plan_propiedad`.
+
+    Parámetros:
+    - soup (documento parseado): El documento o fragmento que contiene las tarjetas.
+    - p (dict): Las primitivas del backend de parseo del documento (ver `support_parser`).
+
+    Retorna:
+    - (tuple): (columnas, informe). `columnas` es un diccionario columna -> valores por propiedad, donde los campos que no
+      se encuentran valen None; `informe` cuenta los fallos de cada selector (ver `PlanExtraccion.extraer`).
+    """
+
+    # Get every item from the soup
+    items = p['buscar_todos'](soup, 'div', {'data-testid': 'property-card'})
+
+    return plan_propiedad.extraer(items, p)
+
+
+def _tabla_propiedades(soup, p):
+    """
+    Devuelve el DataFrame limpio de las tarjetas de un documento, con el informe de fallos en `df.attrs['fallos_selectores']`.
+    """
+
+    columnas, informe = extraer_propiedades(soup, p)
+
+    with sup_met.medir('build', modulo='alojamientos'):
+        df = pd.DataFrame(columnas)
+    df = clean_df(df)
+    df.attrs['fallos_selectores'] = informe
     return df
 
 
-def soup_to_df(soup):
+def soup_to_df(soup, parser=None):
     """
-    Extrae datos de propiedades de un objeto BeautifulSoup y los devuelve como un DataFrame limpio.
+    Extrae datos de propiedades de un documento HTML y los devuelve como un DataFrame limpio.
 
     La función obtiene detalles de propiedades como nombre, dirección, distancia al centro, puntuación, puntuación de la ubicación, precio y enlace desde elementos HTML identificados por IDs de datos específicos. Los datos extraídos luego se limpian usando la función `clean_df`.
+    Los selectores que no encuentran su nodo se cuentan en `df.attrs['fallos_selectores']`.
 
     Parámetros:
-    - soup (BeautifulSoup): Un objeto BeautifulSoup que contiene el HTML de los listados de propiedades.
+    - soup (BeautifulSoup, elemento lxml o str): El HTML de los listados de propiedades, ya parseado o como texto.
+    - parser (str, opcional): Backend de parseo a usar si `soup` es texto ('lxml' o 'html.parser'). Ambos producen el mismo DataFrame.
 
     Retorna:
     - (pandas.DataFrame): Un DataFrame limpio con los datos de las propiedades extraídas.
     """
 
-    # Get every item from the soup
-    items = soup.find_all('div', {'data-testid': 'property-card'})
-
-    # Defining a dictionary with the funcions that capture the information
-    keys = {'Name': lambda x: x.find('div', {"data-testid": "title"}).text,
-            'Address': lambda x: x.find('span', {"data-testid": "address"}).text, 
-            'Distance to center': lambda x: x.find('span', {"data-testid": "distance"}).text, 
-            'Score': lambda x: x.find('div', {"data-testid": "review-score"}).text[11:15], 
-            'Location score': lambda x: x.find('a', {"data-testid": "secondary-review-score-link"}).text, 
-            'Price (€)': lambda x: x.find('span', {"data-testid": "price-and-discounted-price"}).text, 
-            'Link': lambda x: x.find("a", {'data-testid': 'title-link'}).get('href')
-            }
-    
-    # Empty list to store items
-    data = []
-
-    for item in items:
-        # Empty dictionary to store data for every item
-        dc = {}
-        # Fill dictionary
-        for key in keys:
-            try:
-                dc[key] = keys[key](item)
-            except:
-                dc[key] = None
+    soup, p = sup_parser.parsear(soup, parser)
 
-        data.append(dc)
+    return _tabla_propiedades(soup, p)
 
-    df = clean_df(pd.DataFrame(data))
 
-    return df
+def url_busqueda_booking(dest_id, checkin, checkout):
+    """
+    Construye la URL de la búsqueda de Booking.com de una ciudad y unas fechas, para 2 adultos y una habitación.
 
+    Parámetros:
+    - dest_id (str): El ID de destino usado para buscar la ciudad.
+    - checkin (str): La fecha de check-in en formato 'YYYY-MM-DD'.
+    - checkout (str): La fecha de check-out en formato 'YYYY-MM-DD'.
 
-def scrap_url(dest_id, checkin, checkout):
+    Retorna:
+    - (str): La URL de la página de resultados.
     """
-    Abre una URL en un navegador para hacer scraping de datos de propiedades en Booking.com, realiza desplazamiento para cargar más resultados y devuelve el código fuente de la página como un objeto BeautifulSoup.
+
+    return f"https://www.booking.com/searchresults.es.html?lang=es&dest_id={dest_id}&dest_type=city&checkin={checkin}&checkout={checkout}&group_adults=2&no_rooms=1&group_children=0"
+
+
+def scrap_url(dest_id, checkin, checkout, parser=None, cache=None, driver=None):
+    """
+    Abre una URL en un navegador para hacer scraping de datos de propiedades en Booking.com, realiza desplazamiento para cargar más resultados y devuelve el código fuente de la página ya parseado.
 
     La función navega a una página de resultados de búsqueda específica en Booking.com para una ciudad, según el ID de destino y las fechas de check-in y check-out proporcionadas. Desplaza continuamente la página para cargar más resultados, hace clic en el botón de "cargar más resultados" y finalmente retorna el contenido HTML de la página.
 
@@ -117,47 +217,196 @@ def scrap_url(dest_id, checkin, checkout):
     - dest_id (str): El ID de destino usado para buscar la ciudad.
     - checkin (str): La fecha de check-in en formato 'YYYY-MM-DD'.
     - checkout (str): La fecha de check-out en formato 'YYYY-MM-DD'.
+    - parser (str, opcional): Backend de parseo ('lxml' o 'html.parser'). Con 'html.parser' se devuelve un objeto BeautifulSoup.
+    - cache (CachePaginas, opcional): Caché de páginas de `support_cache`. Si la búsqueda ya está guardada no se abre el navegador.
+    - driver (webdriver, opcional): Navegador ya abierto, por ejemplo de un `PoolNavegadores`. No se cierra al terminar. Por defecto se abre un Chrome propio.
 
     Retorna:
-    - (BeautifulSoup): Un objeto BeautifulSoup que contiene el HTML de la página de resultados de búsqueda.
+    - (BeautifulSoup o elemento lxml): El documento con el HTML de la página de resultados de búsqueda, listo para `soup_to_df`.
     """
-    
-    # Open a window
-    driver = webdriver.Chrome()
-    driver.implicitly_wait(5)
 
     # Get the proper URL
-    url = f"https://www.booking.com/searchresults.es.html?lang=es&dest_id={dest_id}&dest_type=city&checkin={checkin}&checkout={checkout}&group_adults=2&no_rooms=1&group_children=0"
-    driver.get(url)
-    driver.maximize_window()
+    url = url_busqueda_booking(dest_id, checkin, checkout)
+
+    # Skip the browser if we already have this search
+    guardado = cache.obtener(url) if cache is not None else None
+    if guardado is not None:
+        soup, _ = sup_parser.parsear(guardado.decode('utf-8'), parser)
+        return soup
+
+    propio = driver is None
+    if propio:
+        from selenium import webdriver
+
+        # Open a window
+        driver = webdriver.Chrome()
+    else:
+        # Un navegador prestado se devuelve con la espera implícita que tenía
+        espera_previa = driver.timeouts.implicit_wait
+    driver.implicitly_wait(5)
+    with sup_met.medir('fetch', modulo='alojamientos'):
+        driver.get(url)
+    if propio:
+        driver.maximize_window()
     
     while True:
         # Scroll to the end
-        sleep(random.uniform(3,5))
+        _pausa()
         driver.execute_script('window.scrollBy(0, 20000)')
-        sleep(random.uniform(3,5))
+        _pausa()
         # Scroll a bit up to fin the button to load more items
         driver.execute_script('window.scrollBy(0, -400)')
-        sleep(random.uniform(3,5))
+        _pausa()
 
         try:
             # Press 'load more results'
-            driver.find_element('css selector', '#bodyconstraint-inner > div:nth-child(8) > div > div.af5895d4b2 > div.df7e6ba27d > div.bcbf33c5c3 > div.dcf496a7b9.bb2746aad9 > div.d4924c9e74 > div.c82435a4b8.f581fde0b8 > button').click()
+            driver.find_element('css selector', SELECTOR_CARGAR_MAS).click()
 
-        except:
+        except Exception as e:
+            # NoSuchElementException is the normal end; anything else is a failure that also ends the loop
+            sup_met.contar('booking_fin_carga', error=type(e).__name__)
             print('No more loading available')
             break
     
-    sleep(random.uniform(3,5))
+    _pausa()
 
     page_source = driver.page_source
-    soup = BeautifulSoup(page_source, 'html.parser')
+    soup, _ = sup_parser.parsear(page_source, parser)
+
+    if cache is not None:
+        cache.guardar(url, page_source, fuente='booking')
     
-    # Cerrar navegador
-    driver.close()
+    # Cerrar navegador, salvo si es prestado
+    if propio:
+        driver.close()
+    else:
+        driver.implicitly_wait(espera_previa)
 
     # Print the URL in case we want to test it manually
     print(url)
 
     return soup
 
+
+def _lote_tarjetas(tarjetas, backend):
+    """
+    Parsea el HTML de un lote de tarjetas de propiedad y devuelve su DataFrame limpio.
+    """
+
+    with sup_met.medir('parse'):
+        fragmento = backend['parsear'](f"<html><body>{''.join(tarjetas)}</body></html>")
+    return _tabla_propiedades(fragmento, backend)
+
+
+def scrap_url_por_lotes(dest_id, checkin, checkout, parser=None, podar_dom=True):
+    """
+    Versión incremental de `scrap_url` + `soup_to_df`: devuelve las propiedades por lotes a medida que Booking las va cargando.
+
+    Después de cada carga solo se extraen las tarjetas 'property-card' nuevas (se marcan en el navegador como ya extraídas),
+    se limpian con `clean_df` y se devuelven como un DataFrame. Así la memoria no crece con el número de resultados y,
+    si el scraping falla a mitad, los lotes ya devueltos no se pierden.
+
+    Parámetros:
+    - dest_id (str): El ID de destino usado para buscar la ciudad.
+    - checkin (str): La fecha de check-in en formato 'YYYY-MM-DD'.
+    - checkout (str): La fecha de check-out en formato 'YYYY-MM-DD'.
+    - parser (str, opcional): Backend de parseo ('lxml' o 'html.parser').
+    - podar_dom (bool, opcional): Si es True, vacía en el navegador las tarjetas ya extraídas para que el DOM no crezca.
+      Si la página dejase de cargar resultados al vaciarlas, usar False.
+
+    Retorna:
+    - (generator): Un generador de DataFrames limpios, con las mismas columnas que `soup_to_df`. Por ejemplo,
+      `pd.concat(scrap_url_por_lotes(...), ignore_index=True)` reúne todos los lotes.
+    """
+
+    backend = sup_parser.obtener_backend(parser)
+
+    from selenium import webdriver
+
+    # Open a window
+    driver = webdriver.Chrome()
+    driver.implicitly_wait(5)
+
+    # Get the proper URL
+    url = url_busqueda_booking(dest_id, checkin, checkout)
+    with sup_met.medir('fetch', modulo='alojamientos'):
+        driver.get(url)
+    driver.maximize_window()
+
+    # Print the URL in case we want to test it manually
+    print(url)
+
+    try:
+        while True:
+            # Extract only the cards loaded since the last batch
+            tarjetas = driver.execute_script(JS_TARJETAS_NUEVAS, podar_dom)
+            if tarjetas:
+                yield _lote_tarjetas(tarjetas, backend)
+
+            # Scroll to the end
+            _pausa()
+            driver.execute_script('window.scrollBy(0, 20000)')
+            _pausa()
+            # Scroll a bit up to fin the button to load more items
+            driver.execute_script('window.scrollBy(0, -400)')
+            _pausa()
+
+            try:
+                # Press 'load more results'
+                driver.find_element('css selector', SELECTOR_CARGAR_MAS).click()
+
+            except Exception as e:
+                sup_met.contar('booking_fin_carga', error=type(e).__name__)
+                print('No more loading available')
+                break
+
+        _pausa()
+
+        # Last batch, loaded after the last click
+        tarjetas = driver.execute_script(JS_TARJETAS_NUEVAS, podar_dom)
+        if tarjetas:
+            yield _lote_tarjetas(tarjetas, backend)
+
+    finally:
+        # Cerrar navegador
+        driver.close()
+
+
+def scrap_ventanas(dest_id, ventanas, parser=None, cache=None, diario=None):
+    """
+    Hace el scraping de una ciudad en Booking.com para varias ventanas de fechas y devuelve todas las propiedades en un DataFrame.
+
+    Cada ventana se procesa con `scrap_url` + `soup_to_df` y, si se indica un diario, sus filas limpias se registran en él
+    en cuanto termina. Si el proceso se corta o Booking bloquea una búsqueda, al volver a ejecutarlo con el mismo diario
+    las ventanas ya registradas se leen del diario sin abrir el navegador y solo se hacen las que faltan.
+
+    Parámetros:
+    - dest_id (str): El ID de destino usado para buscar la ciudad.
+    - ventanas (list): Pares (checkin, checkout) en formato 'YYYY-MM-DD'.
+    - parser (str, opcional): Backend de parseo ('lxml' o 'html.parser').
+    - cache (CachePaginas, opcional): Caché de páginas de `support_cache`.
+    - diario (Diario, opcional): Diario de `support_diario` con las ventanas ya terminadas, por la URL de su búsqueda.
+
+    Retorna:
+    - (pandas.DataFrame): Las propiedades de todas las ventanas, en el orden de `ventanas`, con las columnas de `soup_to_df`
+      más 'checkin' y 'checkout'. Las ventanas que fallan se omiten y se imprime un mensaje.
+    """
+
+    dfs = []
+    for checkin, checkout in ventanas:
+        url = url_busqueda_booking(dest_id, checkin, checkout)
+        if diario is not None and url in diario:
+            dfs.append(diario.obtener(url))
+            continue
+
+        try:
+            df = soup_to_df(scrap_url(dest_id, checkin, checkout, parser, cache), parser).assign(checkin=checkin, checkout=checkout)
+        except Exception as e:
+            print(f"Fallo en la búsqueda {checkin}/{checkout}: {e!r}")
+            continue
+
+        if diario is not None:
+            diario.registrar(url, df)
+        dfs.append(df)
+
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
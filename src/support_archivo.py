@@ -0,0 +1,214 @@
+import hashlib
+import mmap
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from src import support_cache as sup_cache
+
+
+DIRECTORIO_ARCHIVO = Path(__file__).resolve().parent.parent / 'datos' / 'archivo'
+
+# Registro de tamaño fijo del índice: huella de la URL normalizada, huella del contenido, posición y longitud
+# del blob comprimido en el fichero de datos y tamaño original de la página
+REGISTRO = np.dtype([('clave', '<u8'), ('huella', '<u8'), ('posicion', '<u8'), ('longitud', '<u4'), ('tamano', '<u4')])
+
+# Mapas de memoria de los ficheros de datos abiertos en este proceso, compartidos por todos los handles
+_MAPAS = {}
+_LOCK_MAPAS = threading.Lock()
+
+
+def _huella(datos):
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), 'little')
+
+
+def _mapa(ruta, fin):
+    """
+    Devuelve un mapa de memoria del fichero de datos que llegue al menos hasta el byte `fin`.
+    El fichero solo crece, así que cuando se ha añadido algo después de mapearlo se vuelve a mapear.
+    """
+
+    with _LOCK_MAPAS:
+        mapa = _MAPAS.get(ruta)
+        if mapa is None or len(mapa) < fin:
+            with open(ruta, 'rb') as fichero:
+                mapa = mmap.mmap(fichero.fileno(), 0, access=mmap.ACCESS_READ)
+            _MAPAS[ruta] = mapa
+        return mapa
+
+
+class PaginaArchivada:
+    """
+    Referencia ligera a una página de un `ArchivoPaginas`: solo guarda la URL y dónde está el blob comprimido.
+
+    Ocupa unos pocos bytes en un DataFrame y se serializa con pickle sin el contenido de la página. El HTML se
+    descomprime del fichero mapeado en memoria cada vez que se pide con `texto()`, por ejemplo al pasar el handle
+    a `support_parser.parsear`, y no se queda en memoria.
+    """
+
+    __slots__ = ('ruta', 'url', 'posicion', 'longitud', 'tamano')
+
+    def __init__(self, ruta, url, posicion, longitud, tamano):
+        self.ruta = ruta
+        self.url = url
+        self.posicion = posicion
+        self.longitud = longitud
+        self.tamano = tamano
+
+    def leer(self):
+        """
+        Devuelve el contenido original de la página en bytes.
+        """
+
+        fin = self.posicion + self.longitud
+        return zlib.decompress(_mapa(self.ruta, fin)[self.posicion:fin])
+
+    def texto(self):
+        """
+        Devuelve el HTML de la página como cadena.
+        """
+
+        return self.leer().decode('utf-8', errors='replace')
+
+    def __str__(self):
+        return self.texto()
+
+    def __repr__(self):
+        return f'<PaginaArchivada {self.url} ({self.tamano / 1024:.0f} KB, {self.longitud / 1024:.0f} KB comprimida)>'
+
+
+class ArchivoPaginas:
+    """
+    Archivo en disco de páginas HTML comprimidas, con acceso aleatorio por URL.
+
+    Las páginas se añaden comprimidas con zlib al final de un único fichero de datos y cada una deja un registro de
+    tamaño fijo en el fichero de índice, que se abre como un array de numpy mapeado en memoria. Las URLs se
+    normalizan como en `support_cache`, y si una URL se vuelve a guardar con el mismo contenido no se escribe de nuevo.
+    Varios hilos pueden guardar y leer a la vez; no está pensado para varios procesos escribiendo a la vez.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_ARCHIVO, nivel=6):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.nivel = nivel
+        self.ruta_datos = str(self.directorio / 'paginas.z')
+        self.ruta_indice = self.directorio / 'indice.bin'
+        self.lock = threading.Lock()
+
+        self.datos = open(self.ruta_datos, 'ab')
+        self.fichero_indice = open(self.ruta_indice, 'ab')
+
+        # Un registro a medias (por ejemplo, si se cortó la escritura) se descarta para que los nuevos queden alineados
+        registros = self.ruta_indice.stat().st_size // REGISTRO.itemsize
+        self.fichero_indice.truncate(registros * REGISTRO.itemsize)
+        self.indice = np.memmap(self.ruta_indice, dtype=REGISTRO, mode='r', shape=(registros,)) if registros else np.empty(0, REGISTRO)
+
+        # Orden estable por clave para buscar con searchsorted; ante URLs repetidas vale el último registro
+        self.orden = np.argsort(self.indice['clave'], kind='stable')
+        self.claves_ordenadas = self.indice['clave'][self.orden]
+
+        # Registros añadidos desde que se abrió el archivo
+        self.nuevos = {}
+
+    def _registro(self, clave):
+        if clave in self.nuevos:
+            return self.nuevos[clave]
+
+        fin = np.searchsorted(self.claves_ordenadas, clave, side='right')
+        if fin == 0 or self.claves_ordenadas[fin - 1] != clave:
+            return None
+        return self.indice[self.orden[fin - 1]]
+
+    def _handle(self, url, registro):
+        return PaginaArchivada(self.ruta_datos, url, int(registro['posicion']), int(registro['longitud']), int(registro['tamano']))
+
+    def obtener(self, url):
+        """
+        Devuelve el handle de la última versión guardada de una URL.
+
+        Args:
+            url (str): La URL de la página.
+
+        Returns:
+            PaginaArchivada or None: El handle de la página, o None si la URL no está en el archivo.
+        """
+
+        with self.lock:
+            registro = self._registro(_huella(sup_cache.normalizar_url(url).encode('utf-8')))
+        return self._handle(url, registro) if registro is not None else None
+
+    def guardar(self, url, contenido):
+        """
+        Añade una página al archivo y devuelve su handle.
+
+        Args:
+            url (str): La URL de la página.
+            contenido (bytes or str): El contenido de la página. Las cadenas se guardan codificadas en UTF-8.
+
+        Returns:
+            PaginaArchivada: El handle de la página, para guardarlo en un DataFrame en lugar del HTML.
+        """
+
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+
+        clave = _huella(sup_cache.normalizar_url(url).encode('utf-8'))
+        huella = _huella(contenido)
+
+        with self.lock:
+            registro = self._registro(clave)
+            if registro is not None and registro['huella'] == huella:
+                return self._handle(url, registro)
+
+            comprimido = zlib.compress(contenido, self.nivel)
+            registro = np.array((clave, huella, self.datos.tell(), len(comprimido), len(contenido)), dtype=REGISTRO)
+
+            # El registro del índice se escribe después del blob: si se corta a mitad, el índice no apunta a datos incompletos
+            self.datos.write(comprimido)
+            self.datos.flush()
+            self.fichero_indice.write(registro.tobytes())
+            self.fichero_indice.flush()
+            self.nuevos[clave] = registro
+
+        return self._handle(url, registro)
+
+    def __contains__(self, url):
+        return self.obtener(url) is not None
+
+    def _todos_los_registros(self):
+        with self.lock:
+            registros = self.ruta_indice.stat().st_size // REGISTRO.itemsize
+        return np.fromfile(self.ruta_indice, dtype=REGISTRO, count=registros)
+
+    def __len__(self):
+        return len(np.unique(self._todos_los_registros()['clave']))
+
+    def estadisticas(self):
+        """
+        Devuelve el número de páginas del archivo y su tamaño original y comprimido.
+
+        Returns:
+            dict: Páginas distintas, registros (versiones guardadas), bytes originales y comprimidos de todos los registros y ratio de compresión.
+        """
+
+        registros = self._todos_los_registros()
+        original, comprimido = int(registros['tamano'].sum()), int(registros['longitud'].sum())
+        return {
+            'paginas': len(np.unique(registros['clave'])),
+            'registros': len(registros),
+            'tamano_original': original,
+            'tamano_comprimido': comprimido,
+            'ratio': original / comprimido if comprimido else 0.0,
+        }
+
+    def cerrar(self):
+        self.datos.close()
+        self.fichero_indice.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
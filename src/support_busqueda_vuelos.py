@@ -0,0 +1,165 @@
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from dotenv import load_dotenv
+
+from src import support_fetch as sup_fetch
+from src import support_vuelos as sup_vuelos
+
+
+URL_API = "https://sky-scrapper.p.rapidapi.com/api/v2/flights/searchFlights"
+DIRECTORIO_AEROPUERTOS = Path(__file__).resolve().parent.parent / 'datos' / 'jsons'
+
+# Parámetros de búsqueda comunes a todas las peticiones, los del notebook de vuelos para el mercado español.
+# El notebook también usó countryCode 'US' (Madrid-París): para repetirlo, `buscar_vuelos(..., parametros={'countryCode': 'US'})`
+PARAMETROS_POR_DEFECTO = {
+    "cabinClass": "economy",
+    "adults": "2",
+    "sortBy": "best",
+    "limit": "15",
+    "currency": "EUR",
+    "market": "es-ES",
+    "countryCode": "ES",
+}
+
+
+def cargar_aeropuertos(ciudad, todos=False):
+    """
+    Lee los aeropuertos de una ciudad de su fichero `aeropuertos_<ciudad>.json` (respuesta de la API de aeropuertos de Sky-Scrapper).
+
+    Args:
+        ciudad (str): Nombre de la ciudad en el fichero (por ejemplo 'madrid') o ruta del fichero JSON.
+        todos (bool): Si es False solo se devuelve la primera sugerencia, que es la que mejor representa a la ciudad.
+
+    Returns:
+        list: Una lista de diccionarios con las claves 'skyId', 'entityId' y 'nombre'.
+    """
+
+    ruta = Path(ciudad)
+    if not ruta.suffix:
+        ruta = DIRECTORIO_AEROPUERTOS / f'aeropuertos_{ciudad.lower()}.json'
+
+    with open(ruta, encoding='utf-8') as fichero:
+        sugerencias = json.load(fichero)['data']
+
+    aeropuertos = [{'skyId': s['skyId'], 'entityId': s['entityId'], 'nombre': s['presentation']['title']} for s in sugerencias]
+    return aeropuertos if todos else aeropuertos[:1]
+
+
+def construir_busquedas(rutas, fecha_inicio, fecha_fin, noches=3, todos_aeropuertos=False, parametros=None):
+    """
+    Genera los parámetros de todas las búsquedas de ida y vuelta para varias rutas y un rango de fechas de salida, sin duplicados.
+
+    Args:
+        rutas (list): Pares (origen, destino) de ciudades con fichero de aeropuertos, por ejemplo [('madrid', 'paris')].
+        fecha_inicio (str o date): Primera fecha de salida ('YYYY-MM-DD').
+        fecha_fin (str o date): Última fecha de salida, incluida.
+        noches (int o list): Noches de estancia; la vuelta es la fecha de salida más las noches. Puede ser una lista.
+        todos_aeropuertos (bool): Si es True se combinan todos los aeropuertos de cada ciudad y no solo el principal.
+        parametros (dict, optional): Parámetros que sustituyen o amplían `PARAMETROS_POR_DEFECTO`.
+
+    Returns:
+        list: Una lista de diccionarios de parámetros de la API. Dos búsquedas con la misma query aparecen una sola vez.
+    """
+
+    fecha_inicio, fecha_fin = date.fromisoformat(str(fecha_inicio)), date.fromisoformat(str(fecha_fin))
+    noches = [noches] if isinstance(noches, int) else list(noches)
+    fechas = [fecha_inicio + timedelta(days=d) for d in range((fecha_fin - fecha_inicio).days + 1)]
+
+    busquedas = {}
+    for ciudad_origen, ciudad_destino in rutas:
+        for origen in cargar_aeropuertos(ciudad_origen, todos_aeropuertos):
+            for destino in cargar_aeropuertos(ciudad_destino, todos_aeropuertos):
+                for fecha in fechas:
+                    for n in noches:
+                        query = {
+                            "originSkyId": origen['skyId'],
+                            "destinationSkyId": destino['skyId'],
+                            "originEntityId": origen['entityId'],
+                            "destinationEntityId": destino['entityId'],
+                            "date": fecha.isoformat(),
+                            "returnDate": (fecha + timedelta(days=n)).isoformat(),
+                            **PARAMETROS_POR_DEFECTO,
+                            **(parametros or {}),
+                        }
+                        # La query ordenada identifica la búsqueda: las repetidas se descartan
+                        busquedas.setdefault(urlencode(sorted(query.items())), query)
+
+    return list(busquedas.values())
+
+
+def etiqueta_busqueda(query):
+    """
+    Devuelve una etiqueta legible para una búsqueda, por ejemplo 'MAD-PARI 2025-02-13/2025-02-16'.
+    """
+
+    return f"{query['originSkyId']}-{query['destinationSkyId']} {query['date']}/{query['returnDate']}"
+
+
+def buscar_vuelos(rutas, fecha_inicio, fecha_fin, noches=3, todos_aeropuertos=False, parametros=None, api_key=None,
+                  url=URL_API, cache=None, concurrencia=4, tasa=1.0, reintentos=3, turno=None):
+    """
+    Lanza en paralelo todas las búsquedas de vuelos de varias rutas y fechas y devuelve los vuelos en un único DataFrame.
+
+    Las búsquedas repetidas se hacen una sola vez, las que están en la caché no se vuelven a pedir a la API y el
+    ritmo de peticiones se limita a `tasa` por segundo con reintentos ante respuestas 429 y 5xx (ver `support_fetch`).
+    Las respuestas válidas se guardan en la caché por query y se vuelcan directamente en el DataFrame de vuelos.
+
+    Args:
+        rutas (list): Pares (origen, destino) de ciudades con fichero de aeropuertos, por ejemplo [('madrid', 'paris')].
+        fecha_inicio (str o date): Primera fecha de salida ('YYYY-MM-DD').
+        fecha_fin (str o date): Última fecha de salida, incluida.
+        noches (int o list): Noches de estancia.
+        todos_aeropuertos (bool): Si es True se combinan todos los aeropuertos de cada ciudad.
+        parametros (dict, optional): Parámetros que sustituyen o amplían `PARAMETROS_POR_DEFECTO`.
+        api_key (str, optional): Clave de RapidAPI. Por defecto la variable de entorno RAPIDAPI_KEY (también desde un fichero .env).
+        url (str): Endpoint de búsqueda. Se puede apuntar a un servidor local que imite la API.
+        cache (CachePaginas, optional): Caché de páginas de `support_cache`.
+        concurrencia (int): Número máximo de peticiones simultáneas.
+        tasa (float): Peticiones por segundo permitidas contra la API.
+        reintentos (int): Número máximo de reintentos por búsqueda.
+        turno (callable, optional): Espera antes de cada petición compartida con otras descargas (ver `support_fetch.descargar_urls`).
+
+    Returns:
+        pd.DataFrame: Los vuelos de todas las búsquedas con el formato de `crear_dataframe`, más la columna categórica
+        'busqueda' (ver `etiqueta_busqueda`). Las búsquedas que fallan se omiten y se imprime un mensaje.
+    """
+
+    load_dotenv()
+    api_key = api_key or os.getenv('RAPIDAPI_KEY')
+    cabeceras = {"x-rapidapi-key": api_key or '', "x-rapidapi-host": urlsplit(url).netloc}
+
+    busquedas = construir_busquedas(rutas, fecha_inicio, fecha_fin, noches, todos_aeropuertos, parametros)
+    urls = [f"{url}?{urlencode(query)}" for query in busquedas]
+
+    respuestas = {}
+    pendientes = []
+    for posicion, url_busqueda in enumerate(urls):
+        guardado = cache.obtener(url_busqueda, fuente='sky-scrapper') if cache is not None else None
+        if guardado is not None:
+            respuestas[posicion] = json.loads(guardado)
+        else:
+            pendientes.append(url_busqueda)
+
+    posiciones = {url_busqueda: posicion for posicion, url_busqueda in enumerate(urls)}
+    for resultado in sup_fetch.iterar_descargas(pendientes, concurrencia=concurrencia, tasa_por_host=tasa, reintentos=reintentos, cabeceras=cabeceras,
+                                                turno=turno):
+        posicion = posiciones[resultado['url']]
+        if resultado['status'] != 200:
+            print(f"Fallo en la búsqueda {etiqueta_busqueda(busquedas[posicion])}: {resultado['status'] or resultado['error']}")
+            continue
+
+        data = json.loads(resultado['contenido'])
+        if not data.get('status'):
+            print(f"La API no devolvió vuelos para {etiqueta_busqueda(busquedas[posicion])}: {data.get('message')}")
+            continue
+
+        # Solo guardamos en la caché las respuestas válidas
+        respuestas[posicion] = data
+        if cache is not None:
+            cache.guardar(urls[posicion], resultado['contenido'], fuente='sky-scrapper')
+
+    return sup_vuelos.crear_dataframe_busquedas((etiqueta_busqueda(busquedas[posicion]), respuestas[posicion]) for posicion in sorted(respuestas))
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+DIRECTORIO_POR_DEFECTO = Path(__file__).resolve().parent.parent / 'datos' / 'cache'
+
+# Tiempo de vida (en segundos) de las páginas de cada fuente: los precios de Booking y de los vuelos
+# cambian a diario, mientras que las actividades de TripAdvisor son estables durante días
+TTL_POR_FUENTE = {
+    'tripadvisor': 7 * 24 * 3600,
+    'booking': 24 * 3600,
+    'sky-scrapper': 6 * 3600,
+    None: 24 * 3600,
+}
+
+# Parámetros de seguimiento que no cambian el contenido de la página y se quitan de la clave
+PARAMETROS_IGNORADOS = {'aid', 'label', 'sid', 'srpvid', 'srepoch', 'ucfs', 'arphpl', 'hpos', 'hapos', 'nad_id', 'nad_cpc', 'nad_track', 'from'}
+
+
+def normalizar_url(url, ignorar=PARAMETROS_IGNORADOS):
+    """
+    Normaliza una URL para usarla como clave de caché.
+
+    Pasa el esquema y el host a minúsculas, elimina el puerto por defecto y el fragmento, descarta los parámetros
+    de seguimiento y ordena el resto de parámetros (por ejemplo 'dest_id', 'checkin' y 'checkout'), de forma que
+    dos URLs que piden la misma página producen la misma clave.
+
+    Args:
+        url (str): La URL a normalizar.
+        ignorar (set): Nombres de parámetros de la query que no forman parte de la clave.
+
+    Returns:
+        str: La URL normalizada.
+    """
+
+    partes = urlsplit(url.strip())
+    esquema = partes.scheme.lower()
+    host = partes.netloc.lower()
+
+    if (esquema, host.rsplit(':', 1)[-1]) in {('http', '80'), ('https', '443')}:
+        host = host.rsplit(':', 1)[0]
+
+    parametros = sorted((k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if k not in ignorar)
+    return urlunsplit((esquema, host, partes.path or '/', urlencode(parametros), ''))
+
+
+def fuente_de_url(url):
+    """
+    Identifica la fuente de una URL a partir de su host, para aplicarle su TTL.
+
+    Args:
+        url (str): La URL de la página.
+
+    Returns:
+        str or None: 'tripadvisor', 'booking', 'sky-scrapper' o None si el host no es conocido.
+    """
+
+    host = urlsplit(url).netloc.lower()
+    for fuente in ('tripadvisor', 'booking', 'sky-scrapper'):
+        if fuente in host:
+            return fuente
+    return None
+
+
+class CachePaginas:
+    """
+    Caché en disco de páginas descargadas, compartida por los scrapers de actividades, alojamientos y vuelos.
+
+    Cada URL normalizada apunta a un blob comprimido cuyo nombre es el hash de su contenido, de modo que las
+    páginas idénticas se guardan una sola vez. Las entradas caducan según el TTL de su fuente y, cuando el tamaño
+    total supera `tamano_maximo`, se desalojan las menos usadas recientemente (LRU).
+    """
+
+    def __init__(self, directorio=DIRECTORIO_POR_DEFECTO, tamano_maximo=2 * 1024 ** 3, ttl=None):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.tamano_maximo = tamano_maximo
+        self.ttl = {**TTL_POR_FUENTE, **(ttl or {})}
+        self.estadisticas_sesion = {'aciertos': 0, 'fallos': 0, 'expirados': 0, 'desalojos': 0, 'guardados': 0}
+
+        self.lock = threading.Lock()
+        self.conexion = sqlite3.connect(self.directorio / 'indice.sqlite', check_same_thread=False)
+        self.conexion.execute('''
+            CREATE TABLE IF NOT EXISTS paginas (
+                clave TEXT PRIMARY KEY,
+                url TEXT,
+                fuente TEXT,
+                hash TEXT,
+                tamano INTEGER,
+                creado REAL,
+                ultimo_acceso REAL,
+                metadatos TEXT
+            )''')
+        self.conexion.execute('CREATE INDEX IF NOT EXISTS idx_acceso ON paginas (ultimo_acceso)')
+        self.conexion.commit()
+
+    def _ruta_blob(self, hash_contenido):
+        return self.directorio / hash_contenido[:2] / f'{hash_contenido}.z'
+
+    def _borrar(self, clave):
+        """
+        Borra una entrada y devuelve los bytes que se liberan: el tamaño de su blob si era la última entrada que lo
+        usaba, o 0 si otra URL sigue apuntando al mismo contenido.
+        """
+
+        fila = self.conexion.execute('SELECT hash, tamano FROM paginas WHERE clave = ?', (clave,)).fetchone()
+        self.conexion.execute('DELETE FROM paginas WHERE clave = ?', (clave,))
+
+        # El blob solo se borra si ninguna otra URL apunta al mismo contenido
+        if fila and not self.conexion.execute('SELECT 1 FROM paginas WHERE hash = ?', (fila[0],)).fetchone():
+            self._ruta_blob(fila[0]).unlink(missing_ok=True)
+            return fila[1]
+        return 0
+
+    def _entrada(self, url, fuente):
+        clave = normalizar_url(url)
+        fila = self.conexion.execute('SELECT hash, fuente, creado, metadatos FROM paginas WHERE clave = ?', (clave,)).fetchone()
+        if fila is None:
+            return clave, None
+
+        hash_contenido, fuente_guardada, creado, metadatos = fila
+        fuente = fuente or fuente_guardada
+        if time.time() - creado > self.ttl.get(fuente, self.ttl[None]):
+            self._borrar(clave)
+            self.conexion.commit()
+            self.estadisticas_sesion['expirados'] += 1
+            return clave, None
+
+        return clave, (hash_contenido, json.loads(metadatos) if metadatos else {})
+
+    def obtener(self, url, fuente=None, con_metadatos=False):
+        """
+        Devuelve el contenido guardado para una URL si existe y no ha caducado.
+
+        Args:
+            url (str): La URL de la página.
+            fuente (str, optional): Fuente de la página para elegir el TTL. Por defecto se deduce del host.
+            con_metadatos (bool): Si es True devuelve también los metadatos de la página, leídos en la misma consulta
+                para que no pueda caducar o desalojarse entre una lectura y otra.
+
+        Returns:
+            bytes or None: El contenido de la página, o None si no está en caché (fallo). Con `con_metadatos`, una
+            tupla (contenido, metadatos), con metadatos {} si se guardó sin ellos, o None.
+        """
+
+        with self.lock:
+            clave, entrada = self._entrada(url, fuente or fuente_de_url(url))
+            ruta = self._ruta_blob(entrada[0]) if entrada else None
+
+            if ruta is None or not ruta.exists():
+                self.estadisticas_sesion['fallos'] += 1
+                return None
+
+            # Leemos dentro del lock para que un desalojo concurrente no borre el blob a mitad de lectura
+            comprimido = ruta.read_bytes()
+            self.conexion.execute('UPDATE paginas SET ultimo_acceso = ? WHERE clave = ?', (time.time(), clave))
+            self.conexion.commit()
+            self.estadisticas_sesion['aciertos'] += 1
+
+        contenido = zlib.decompress(comprimido)
+        return (contenido, entrada[1]) if con_metadatos else contenido
+
+    def metadatos(self, url):
+        """
+        Devuelve los metadatos guardados junto a una página (por ejemplo, la URL final tras una redirección).
+        No cuenta como acceso en las estadísticas.
+
+        Args:
+            url (str): La URL de la página.
+
+        Returns:
+            dict or None: Los metadatos, o None si la URL no está en caché.
+        """
+
+        with self.lock:
+            _, entrada = self._entrada(url, fuente_de_url(url))
+        return entrada[1] if entrada else None
+
+    def guardar(self, url, contenido, fuente=None, metadatos=None):
+        """
+        Guarda el contenido de una URL en la caché y desaloja las entradas menos usadas si se supera el tamaño máximo.
+
+        Args:
+            url (str): La URL de la página.
+            contenido (bytes or str): El contenido de la página. Las cadenas se guardan codificadas en UTF-8.
+            fuente (str, optional): Fuente de la página para elegir el TTL. Por defecto se deduce del host.
+            metadatos (dict, optional): Información adicional serializable a JSON que se guarda con la página.
+
+        Returns:
+            None
+        """
+
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+        ruta = self._ruta_blob(hash_contenido)
+        comprimido = zlib.compress(contenido)
+
+        with self.lock:
+            if not ruta.exists():
+                ruta.parent.mkdir(exist_ok=True)
+                # Escribimos en un fichero temporal y lo renombramos para no dejar blobs a medias
+                temporal = ruta.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+                temporal.write_bytes(comprimido)
+                temporal.replace(ruta)
+
+            ahora = time.time()
+            self.conexion.execute(
+                'INSERT OR REPLACE INTO paginas VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (normalizar_url(url), url, fuente or fuente_de_url(url), hash_contenido, len(comprimido), ahora, ahora,
+                 json.dumps(metadatos) if metadatos else None))
+            self.estadisticas_sesion['guardados'] += 1
+            self._desalojar()
+            self.conexion.commit()
+
+    def _desalojar(self):
+        tamano = self._tamano_total()
+        while tamano > self.tamano_maximo:
+            fila = self.conexion.execute('SELECT clave FROM paginas ORDER BY ultimo_acceso LIMIT 1').fetchone()
+            if fila is None:
+                break
+            # El total se calcula una sola vez y se descuenta lo que libera cada borrado
+            tamano -= self._borrar(fila[0])
+            self.estadisticas_sesion['desalojos'] += 1
+
+    def _tamano_total(self):
+        return self.conexion.execute('SELECT COALESCE(SUM(tamano), 0) FROM (SELECT DISTINCT hash, tamano FROM paginas)').fetchone()[0]
+
+    def limpiar_expirados(self):
+        """
+        Borra todas las entradas caducadas según el TTL de su fuente.
+
+        Returns:
+            int: Número de entradas borradas.
+        """
+
+        with self.lock:
+            ahora = time.time()
+            filas = self.conexion.execute('SELECT clave, fuente, creado FROM paginas').fetchall()
+            expiradas = [clave for clave, fuente, creado in filas if ahora - creado > self.ttl.get(fuente, self.ttl[None])]
+            for clave in expiradas:
+                self._borrar(clave)
+            self.conexion.commit()
+            self.estadisticas_sesion['expirados'] += len(expiradas)
+
+        return len(expiradas)
+
+    def estadisticas(self):
+        """
+        Devuelve las estadísticas de uso de la caché en esta sesión junto a su ocupación actual.
+
+        Returns:
+            dict: Aciertos, fallos, tasa de aciertos, expirados, desalojos, guardados, número de entradas y tamaño en bytes.
+        """
+
+        with self.lock:
+            entradas = self.conexion.execute('SELECT COUNT(*) FROM paginas').fetchone()[0]
+            tamano = self._tamano_total()
+
+        consultas = self.estadisticas_sesion['aciertos'] + self.estadisticas_sesion['fallos']
+        return {
+            **self.estadisticas_sesion,
+            'tasa_aciertos': self.estadisticas_sesion['aciertos'] / consultas if consultas else 0.0,
+            'entradas': entradas,
+            'tamano': tamano,
+        }
+
+    def cerrar(self):
+        self.conexion.close()
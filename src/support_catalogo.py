@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from src import support_actividades as sup_act
+
+
+URL_TRIPADVISOR = 'https://www.tripadvisor.es'
+
+# Campos de `obtener_actividades` que describen la actividad; la ciudad y la categoría van en las apariciones
+CAMPOS = ['subcategoria', 'nombre', 'precio', 'puntuacion', 'n_reviews', 'url_detalles']
+
+# Textos que se repiten mucho y se guardan como categóricos: cada texto distinto se guarda una sola vez
+TEXTOS = ['subcategoria', 'nombre']
+
+
+def id_actividad(urls):
+    """
+    Devuelve el identificador de producto de TripAdvisor de cada URL de detalles, el número que sigue a '-d'
+    ('/AttractionProductReview-g187147-d27750611-Eiffel_Tower_Tour...' -> 27750611).
+
+    Args:
+        urls (pd.Series): La columna 'url_detalles' de `obtener_actividades`, con URLs relativas o absolutas.
+
+    Returns:
+        pd.Series: Los identificadores (Int64), nulos si la URL no tiene identificador (por ejemplo 'Desconocido').
+    """
+
+    return pd.to_numeric(urls.astype(str).str.extract(r'-d(\d+)-', expand=False), errors='coerce').astype('Int64')
+
+
+class CatalogoActividades:
+    """
+    Índice canónico de las actividades de TripAdvisor de muchas ciudades y scrapings, con una entrada por actividad.
+
+    La misma actividad aparece a menudo en varias categorías de la página de una ciudad ('INPRESCINDIBLES',
+    'ATRACCIONES PRINCIPALES', 'VISITAS GUIADAS'...) y en cada scraping. El catálogo la identifica por el número de
+    producto de su URL de detalles (ver `id_actividad`) y guarda sus datos una sola vez, con el nombre y la
+    subcategoría como categóricos. Dónde aparece se guarda aparte, una fila por actividad y ciudad con una máscara de
+    bits de las categorías (bit i = `categorias[i]`) y el número de veces que se ha visto. De un scraping a otro se
+    conservan los últimos valores de cada campo (precio, puntuación, reseñas...).
+
+    Las filas sin identificador, que son las que no se pudieron extraer, no entran en el catálogo.
+    """
+
+    def __init__(self, categorias=sup_act.CATEGORIAS):
+        """
+        Args:
+            categorias (list): Las categorías posibles, como máximo 8. Por defecto las de `obtener_actividades`.
+        """
+
+        if len(categorias) > 8:
+            raise ValueError(f"Como máximo 8 categorías, una por bit de la máscara: {len(categorias)}")
+        self.categorias = list(categorias)
+        self.bits = {categoria: 1 << posicion for posicion, categoria in enumerate(self.categorias)}
+
+        self.entidades = pd.DataFrame({campo: pd.Series(dtype=object) for campo in CAMPOS}, index=pd.Index([], dtype='int64', name='id'))
+        self.apariciones = pd.DataFrame({'categorias': pd.Series(dtype=np.uint8), 'vistas': pd.Series(dtype=np.int32)},
+                                        index=pd.MultiIndex.from_arrays([pd.Index([], dtype='int64'), pd.Index([], dtype=object)], names=['id', 'ciudad']))
+        self.filas = 0
+        self.bytes_filas = 0
+
+    def __len__(self):
+        return len(self.entidades)
+
+    def agregar(self, df):
+        """
+        Añade al catálogo las actividades de un DataFrame de `obtener_actividades` (de una o varias ciudades).
+
+        Args:
+            df (pd.DataFrame): Con las columnas 'ciudad', 'categoria' y las de `CAMPOS`.
+
+        Returns:
+            dict: Número de actividades nuevas, de filas de actividades que ya estaban en el catálogo (en otra
+            categoría, ciudad o scraping) y de filas descartadas por no tener identificador.
+        """
+
+        ids = id_actividad(df['url_detalles'])
+        validas = ids.notna().to_numpy()
+        filas = df.loc[validas, ['ciudad', 'categoria'] + CAMPOS].assign(id=ids[validas].astype('int64').to_numpy())
+        desconocidas = set(filas['categoria']) - set(self.bits)
+        if desconocidas:
+            raise ValueError(f"Categorías desconocidas: {sorted(desconocidas)}")
+
+        self.filas += len(df)
+        self.bytes_filas += int(df.memory_usage(deep=True).sum())
+
+        # Entidades: primero las que ya estaban, en su orden, con los valores del último scraping
+        nuevas = filas.loc[~filas['id'].isin(self.entidades.index), 'id'].nunique()
+        partes = [self.entidades.astype({campo: object for campo in TEXTOS})] if len(self.entidades) else []
+        entidades = pd.concat(partes + [filas.set_index('id')[CAMPOS]])
+        entidades = entidades.groupby(level='id', sort=False).last()
+        self.entidades = entidades.astype({campo: 'category' for campo in TEXTOS})
+
+        # Apariciones: la máscara de varias categorías es la suma de sus bits distintos
+        filas = filas.assign(bit=filas['categoria'].map(self.bits).astype(np.uint8))
+        mascaras = filas.drop_duplicates(['id', 'ciudad', 'bit']).groupby(['id', 'ciudad'], sort=False)['bit'].sum()
+        vistas = filas.groupby(['id', 'ciudad'], sort=False).size()
+
+        indice = self.apariciones.index.append(mascaras.index.difference(self.apariciones.index, sort=False))
+        apariciones = self.apariciones.reindex(indice, fill_value=0)
+        apariciones['categorias'] = (apariciones['categorias'].to_numpy() | mascaras.reindex(indice, fill_value=0).to_numpy()).astype(np.uint8)
+        apariciones['vistas'] = (apariciones['vistas'].to_numpy() + vistas.reindex(indice, fill_value=0).to_numpy()).astype(np.int32)
+        apariciones.index.names = ['id', 'ciudad']
+        self.apariciones = apariciones
+
+        return {'nuevas': int(nuevas), 'repetidas': int(len(filas) - nuevas), 'descartadas': int((~validas).sum())}
+
+    def nombres_categorias(self, mascara):
+        """
+        Devuelve la lista de categorías de una máscara de bits.
+        """
+
+        return [categoria for categoria, bit in self.bits.items() if mascara & bit]
+
+    def actividades(self, ciudad=None, categoria=None):
+        """
+        Devuelve las actividades del catálogo, una fila por actividad y ciudad.
+
+        Args:
+            ciudad (str, optional): Solo las de esta ciudad.
+            categoria (str, optional): Solo las que aparecen en esta categoría.
+
+        Returns:
+            pd.DataFrame: Con las columnas 'id', 'ciudad', las de `CAMPOS`, 'categorias' (los nombres separados por ', ')
+            y 'vistas' (veces que se ha visto en la ciudad), en el orden en que se añadieron.
+        """
+
+        apariciones = self.apariciones
+        if ciudad is not None:
+            apariciones = apariciones[apariciones.index.get_level_values('ciudad') == ciudad]
+        if categoria is not None:
+            apariciones = apariciones[(apariciones['categorias'].to_numpy() & self.bits[categoria]) > 0]
+
+        ids = apariciones.index.get_level_values('id')
+        resultado = self.entidades.loc[ids].reset_index()
+        resultado.insert(1, 'ciudad', apariciones.index.get_level_values('ciudad'))
+        resultado['categorias'] = [', '.join(self.nombres_categorias(mascara)) for mascara in apariciones['categorias']]
+        resultado['vistas'] = apariciones['vistas'].to_numpy()
+        return resultado
+
+    def urls_detalles(self, excluir=None, base=URL_TRIPADVISOR):
+        """
+        Devuelve la URL de la página de detalles de cada actividad, una por actividad aunque aparezca en varias
+        categorías, ciudades o scrapings, lista para `obtener_html_de_urls`.
+
+        Args:
+            excluir (Diario o set, optional): URLs ya descargadas que no se devuelven, por ejemplo el diario que se
+                pasa a `obtener_html_de_urls`.
+            base (str): Dominio que se antepone a las URLs relativas.
+
+        Returns:
+            list: Las URLs absolutas, en el orden en que se añadieron las actividades.
+        """
+
+        urls = [url if url.startswith('http') else base + url for url in self.entidades['url_detalles'].astype(str)]
+        return [url for url in urls if excluir is None or url not in excluir]
+
+    def estadisticas(self):
+        """
+        Devuelve el número de filas añadidas, de actividades y de apariciones, y la memoria de las filas añadidas
+        frente a la del catálogo, en bytes.
+        """
+
+        return {'filas': self.filas, 'actividades': len(self.entidades), 'apariciones': len(self.apariciones),
+                'bytes_filas': self.bytes_filas,
+                'bytes_catalogo': int(self.entidades.memory_usage(deep=True).sum() + self.apariciones.memory_usage(deep=True).sum())}
@@ -0,0 +1,163 @@
+"""
+Línea de comandos del proyecto, con un subcomando por fase del proceso:
+
+    fetch   Descarga páginas: las de actividades de TripAdvisor de varias ciudades (con navegador) o una lista de URLs.
+    parse   Extrae actividades y alojamientos de páginas HTML guardadas, en varios procesos.
+    clean   Limpia datos sin procesar: alojamientos con texto de Booking o respuestas JSON de vuelos.
+    report  Resume una tabla CSV y, opcionalmente, guarda las gráficas de vuelos (una por búsqueda, sin ventana).
+
+Cada subcomando importa solo lo que necesita: selenium y requests se cargan en 'fetch' y matplotlib en
+'report --graficos', de modo que 'parse' y 'clean' arrancan sin ellos.
+
+Uso (desde la raíz del repositorio):
+    python -m src fetch --ciudades Barcelona Paris --salida datos/html
+    python -m src parse datos/html --salida datos/reproceso
+    python -m src clean datos/jsons/respuestas --fuente vuelos --salida datos/vuelos.csv
+    python -m src report datos/vuelos.csv --graficos imagenes/vuelos
+    python -m src --metricas metricas.prom parse datos/html
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+def fetch(args):
+    from src import support_actividades as sup_act
+    from src import support_archivo as sup_archivo
+    from src import support_diario as sup_diario
+
+    # Con un diario, repetir el mismo comando tras un corte solo descarga lo que faltaba
+    diario = sup_diario.Diario(args.diario) if args.diario else None
+
+    if args.ciudades:
+        # Cada página se guarda como '<tipo>_<Ciudad>.html', el formato que lee 'parse'
+        salida = Path(args.salida)
+        salida.mkdir(parents=True, exist_ok=True)
+        paginas = sup_act.obtener_urls_paginas_principales(args.ciudades, navegadores=args.navegadores, diario=diario)
+        for ciudad, codigo_pagina in zip(paginas['ciudades'], paginas['codigos_pagina']):
+            (salida / f'actividades_{ciudad}.html').write_text(str(codigo_pagina), encoding='utf-8')
+        print(f"{len(paginas)} páginas guardadas en {salida}")
+
+    if args.urls:
+        urls = [url.strip() for url in Path(args.urls).read_text(encoding='utf-8').splitlines() if url.strip()]
+        with sup_archivo.ArchivoPaginas(args.archivo) as archivo:
+            paginas = sup_act.obtener_html_de_urls(urls, concurrencia=args.concurrencia, tasa_por_host=args.tasa, archivo=archivo, diario=diario)
+            print(f"{len(paginas)} de {len(urls)} páginas guardadas en {args.archivo}: {archivo.estadisticas()}")
+
+
+def parse(args):
+    from src import support_reproceso as sup_repro
+
+    tablas = sup_repro.reprocesar(args.rutas, args.procesos, args.parser)
+
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    for tipo, df in tablas.items():
+        df.to_csv(salida / f'{tipo}.csv')
+        print(f"{tipo}: {len(df)} filas -> {salida / f'{tipo}.csv'}")
+
+
+def clean(args):
+    import pandas as pd
+
+    if args.fuente == 'alojamientos':
+        from src import support_alojamiento as sup_aloja
+        df = sup_aloja.clean_df(pd.read_csv(args.entrada, index_col=0, dtype=str))
+    else:
+        from src import support_vuelos as sup_vuelos
+        entrada = Path(args.entrada)
+        df = sup_vuelos.cargar_respuestas(str(entrada / '*.json') if entrada.is_dir() else args.entrada)
+
+    df.to_csv(args.salida)
+    print(f"{len(df)} filas -> {args.salida}")
+
+
+def report(args):
+    import pandas as pd
+
+    df = pd.read_csv(args.tabla, index_col=0)
+    print(f"{args.tabla}: {len(df)} filas, {len(df.columns)} columnas\n")
+    print(df.describe(include='all').T.to_string())
+
+    if args.graficos:
+        from src import support_vuelos as sup_vuelos
+
+        if not {'price', 'total_duration'} <= set(df.columns):
+            print("Las gráficas solo están disponibles para tablas de vuelos ('price' y 'total_duration')")
+            return
+
+        if 'flight_name' not in df.columns:
+            df['flight_name'] = [sup_vuelos.crear_nombre_vuelo(fila, indice) for indice, fila in df.iterrows()]
+
+        # Una gráfica por búsqueda (cada fichero de respuestas es una ruta), dibujadas sin ventana y en paralelo
+        if 'busqueda' in df.columns:
+            vuelos_por_ciudad = {str(busqueda): grupo for busqueda, grupo in df.groupby('busqueda', sort=False)}
+        else:
+            vuelos_por_ciudad = {Path(args.tabla).stem: df}
+
+        rutas = sup_vuelos.guardar_graficas_vuelos(vuelos_por_ciudad, args.graficos, args.procesos, args.formato, args.max_barras)
+        for ruta in rutas:
+            print(f"Gráfica -> {ruta}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog='python -m src', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--metricas', help="Fichero donde guardar los tiempos por etapa y los fallos de extracción (ver support_metricas): JSON si termina en '.json', formato Prometheus en otro caso")
+    subcomandos = parser.add_subparsers(dest='subcomando', required=True)
+
+    p = subcomandos.add_parser('fetch', help='Descarga páginas de actividades o una lista de URLs')
+    p.add_argument('--ciudades', nargs='+', help='Ciudades cuya página de actividades de TripAdvisor se descarga con navegador')
+    p.add_argument('--salida', default='datos/html', help='Directorio de las páginas de actividades descargadas')
+    p.add_argument('--navegadores', type=int, default=2, help='Navegadores en paralelo')
+    p.add_argument('--urls', help='Fichero con una URL por línea, que se descargan con requests al archivo de páginas')
+    p.add_argument('--archivo', default='datos/archivo', help='Directorio del archivo de páginas (ver support_archivo)')
+    p.add_argument('--concurrencia', type=int, default=8, help='Peticiones simultáneas')
+    p.add_argument('--tasa', type=float, default=0.5, help='Peticiones por segundo a cada servidor')
+    p.add_argument('--diario', help='Fichero de diario (ver support_diario) para poder reanudar la descarga')
+    p.set_defaults(funcion=fetch)
+
+    p = subcomandos.add_parser('parse', help='Extrae actividades y alojamientos de páginas HTML guardadas')
+    p.add_argument('rutas', nargs='+', help="Ficheros o directorios con páginas '<tipo>_<Ciudad>.html'")
+    p.add_argument('--salida', default='datos/reproceso', help='Directorio donde se escribe un CSV por tipo de página')
+    p.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, uno por núcleo)')
+    p.add_argument('--parser', default=None, help="Backend de parseo: 'lxml' o 'html.parser'")
+    p.set_defaults(funcion=parse)
+
+    p = subcomandos.add_parser('clean', help='Limpia alojamientos sin procesar o respuestas JSON de vuelos')
+    p.add_argument('entrada', help='CSV de alojamientos, o fichero, patrón o directorio de respuestas JSON de vuelos')
+    p.add_argument('--fuente', choices=['alojamientos', 'vuelos'], required=True, help='Tipo de datos de la entrada')
+    p.add_argument('--salida', required=True, help='CSV de salida')
+    p.set_defaults(funcion=clean)
+
+    p = subcomandos.add_parser('report', help='Resume una tabla CSV')
+    p.add_argument('tabla', help='CSV a resumir')
+    p.add_argument('--graficos', help='Directorio donde guardar las gráficas de precio y duración (solo tablas de vuelos)')
+    p.add_argument('--formato', default='png', help="Formato de las gráficas: 'png', 'svg', 'pdf'...")
+    p.add_argument('--max-barras', type=int, default=30, help='Vuelos con barra propia en cada gráfica; el resto se resume en histogramas')
+    p.add_argument('--procesos', type=int, default=1, help='Procesos para dibujar las gráficas de varias búsquedas')
+    p.set_defaults(funcion=report)
+
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+
+    if args.metricas:
+        from src import support_metricas as sup_met
+        sup_met.activar()
+
+    inicio = time.perf_counter()
+    try:
+        args.funcion(args)
+    finally:
+        # Las métricas se guardan también si el subcomando falla, para ver hasta dónde llegó
+        if args.metricas:
+            sup_met.exportar(args.metricas)
+    print(f"Tiempo: {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import base64
+import json
+import os
+import pickle
+import threading
+import time
+import zlib
+from pathlib import Path
+
+
+DIRECTORIO_DIARIOS = Path(__file__).resolve().parent.parent / 'datos' / 'diarios'
+
+
+class Diario:
+    """
+    Diario en disco (write-ahead) de las unidades de trabajo terminadas de un scraping: ciudades, URLs o búsquedas.
+
+    Cada unidad se añade como una línea JSON con su clave y su resultado (serializado con pickle y comprimido) en
+    cuanto termina, y se sincroniza con el disco antes de seguir. Si el proceso se corta, al volver a abrir el diario
+    se conservan todas las unidades completas y se descarta la última línea si quedó a medias, de modo que al repetir
+    el scraping solo se hacen las unidades que faltan. Si una clave se registra varias veces, vale la última.
+
+    En memoria solo se guarda la posición de cada línea: los resultados se leen del fichero al pedirlos.
+    """
+
+    def __init__(self, ruta, sincronizar=True):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.ruta.touch()
+        self.sincronizar = sincronizar
+        self.lock = threading.Lock()
+        self.posiciones = {}
+
+        with open(self.ruta, 'rb') as fichero:
+            posicion = 0
+            for linea in fichero:
+                try:
+                    clave = json.loads(linea)['clave']
+                except (ValueError, KeyError):
+                    # Línea incompleta de una escritura cortada: es la última, y desde ella se vuelve a escribir
+                    break
+                if not linea.endswith(b'\n'):
+                    break
+                self.posiciones[clave] = (posicion, len(linea))
+                posicion += len(linea)
+
+        self.fichero = open(self.ruta, 'ab')
+        self.fichero.truncate(posicion)
+        self.fichero.seek(posicion)
+
+    def registrar(self, clave, datos):
+        """
+        Añade una unidad terminada al diario y espera a que esté escrita en disco.
+
+        Args:
+            clave (str): Identificador de la unidad, por ejemplo su URL.
+            datos (objeto): El resultado de la unidad (texto, bytes, tuplas, DataFrames...), serializable con pickle.
+
+        Returns:
+            None
+        """
+
+        datos = base64.b64encode(zlib.compress(pickle.dumps(datos, protocol=pickle.HIGHEST_PROTOCOL))).decode('ascii')
+        linea = (json.dumps({'clave': clave, 'hora': time.time(), 'datos': datos}) + '\n').encode('utf-8')
+
+        with self.lock:
+            posicion = self.fichero.tell()
+            self.fichero.write(linea)
+            self.fichero.flush()
+            if self.sincronizar:
+                os.fsync(self.fichero.fileno())
+            self.posiciones[clave] = (posicion, len(linea))
+
+    def obtener(self, clave, defecto=None):
+        """
+        Devuelve el resultado registrado para una clave.
+
+        Args:
+            clave (str): Identificador de la unidad.
+            defecto (objeto, optional): Valor si la clave no está en el diario.
+
+        Returns:
+            objeto: El resultado registrado, o `defecto`.
+        """
+
+        entrada = self._entrada(clave)
+        if entrada is None:
+            return defecto
+        return pickle.loads(zlib.decompress(base64.b64decode(entrada['datos'])))
+
+    def hora(self, clave):
+        """
+        Devuelve el momento en que se registró una clave (segundos desde epoch, como `time.time()`), o None si no está.
+        """
+
+        entrada = self._entrada(clave)
+        return entrada['hora'] if entrada is not None else None
+
+    def _entrada(self, clave):
+        with self.lock:
+            if clave not in self.posiciones:
+                return None
+            posicion, longitud = self.posiciones[clave]
+
+        with open(self.ruta, 'rb') as fichero:
+            fichero.seek(posicion)
+            return json.loads(fichero.read(longitud))
+
+    def __contains__(self, clave):
+        return clave in self.posiciones
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def claves(self):
+        """
+        Devuelve las claves registradas, en el orden en que se registraron por primera vez.
+        """
+
+        return list(self.posiciones)
+
+    def cerrar(self):
+        self.fichero.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
@@ -0,0 +1,244 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from src import support_metricas as sup_met
+
+# Requests se importa al descargar: importar este módulo (por ejemplo desde support_actividades) no lo carga
+
+
+CABECERAS = {
+    # Decirle al server lenguaje español
+    'accept-language': 'es',
+    # Simulamos que somos el navegador Chrome
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.69 Safari/537.36'
+}
+
+# Códigos de estado que merece la pena reintentar
+CODIGOS_REINTENTO = {429, 500, 502, 503, 504}
+
+
+class CuboTokens:
+    """
+    Limitador de velocidad por token bucket: permite ráfagas de hasta `capacidad` peticiones y después
+    una media de `tasa` peticiones por segundo.
+    """
+
+    def __init__(self, tasa, capacidad=1):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def adquirir(self):
+        """
+        Espera hasta que haya un token disponible y lo consume. Las esperas se atienden por orden de llegada.
+        """
+
+        async with self.lock:
+            while True:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+
+def _crear_sesion(concurrencia, cabeceras):
+    """
+    Crea una sesión de requests que mantiene abiertas (keep-alive) hasta `concurrencia` conexiones con un host.
+    """
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=concurrencia)
+    sesion.mount('http://', adaptador)
+    sesion.mount('https://', adaptador)
+    sesion.headers.update(cabeceras)
+    return sesion
+
+
+def _espera_reintento(respuesta, intento, espera_base):
+    """
+    Calcula cuánto esperar antes de reintentar: respeta la cabecera Retry-After si el servidor la envía y,
+    si no, usa un backoff exponencial con algo de aleatoriedad para no reintentar todos a la vez.
+    """
+
+    if respuesta is not None:
+        retry_after = respuesta.headers.get('Retry-After')
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+
+    return espera_base * 2 ** intento * random.uniform(1, 1.5)
+
+
+async def descargar_urls(urls, concurrencia=8, tasa_por_host=1.0, rafaga=1, reintentos=3, espera_base=1.0, timeout=30, cabeceras=None, cache=None,
+                         turno=None):
+    """
+    Descarga una lista de URLs de forma concurrente y devuelve cada resultado en cuanto está listo.
+
+    Cada host tiene su propia sesión con conexiones keep-alive y su propio token bucket, por lo que el límite
+    de velocidad se aplica por servidor en lugar de con una pausa fija antes de cada petición. Las respuestas
+    429 y 5xx, así como los errores de red, se reintentan con backoff exponencial. Si se pasa una caché, las
+    páginas guardadas se devuelven sin tocar la red y las respuestas 200 nuevas se guardan en ella.
+
+    Args:
+        urls (list): Lista de URLs a descargar.
+        concurrencia (int): Número máximo de peticiones en vuelo entre todos los hosts.
+        tasa_por_host (float): Peticiones por segundo permitidas para cada host.
+        rafaga (int): Número de peticiones que se pueden lanzar seguidas a un host antes de aplicar la tasa.
+        reintentos (int): Número máximo de reintentos por URL.
+        espera_base (float): Segundos de espera antes del primer reintento; se duplica en cada intento.
+        timeout (float): Tiempo máximo en segundos para cada petición.
+        cabeceras (dict, optional): Cabeceras HTTP. Por defecto `CABECERAS`.
+        cache (CachePaginas, optional): Caché de páginas de `support_cache`.
+        turno (callable, optional): Función que recibe la URL y espera antes de cada petición, por ejemplo
+            `ColaTrabajos.esperar_turno`, para que el límite de velocidad se comparta con otras descargas.
+
+    Yields:
+        dict: Un diccionario por URL, en orden de llegada, con las claves 'posicion' (índice en `urls`), 'url',
+              'status' (None si no hubo respuesta), 'contenido' (bytes o None), 'intentos', 'error' y 'cache'
+              (True si el contenido viene de la caché).
+    """
+
+    import requests
+
+    cabeceras = cabeceras or CABECERAS
+    semaforo = asyncio.Semaphore(concurrencia)
+    sesiones = {}
+    cubos = {}
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+
+        async def descargar(posicion, url):
+            contenido = cache.obtener(url) if cache is not None else None
+            if contenido is not None:
+                sup_met.contar('peticiones_cache')
+                return {'posicion': posicion, 'url': url, 'status': 200, 'contenido': contenido, 'intentos': 0, 'error': None, 'cache': True}
+
+            host = urlsplit(url).netloc
+            if host not in sesiones:
+                sesiones[host] = _crear_sesion(concurrencia, cabeceras)
+                cubos[host] = CuboTokens(tasa_por_host, rafaga)
+
+            respuesta, error = None, None
+            for intento in range(reintentos + 1):
+                # La espera del limitador de velocidad cuenta como 'wait', no como tiempo de red
+                with sup_met.medir('wait', host=host):
+                    await cubos[host].adquirir()
+                if turno is not None:
+                    await loop.run_in_executor(ejecutor, turno, url)
+                async with semaforo:
+                    try:
+                        with sup_met.medir('fetch', host=host):
+                            respuesta = await loop.run_in_executor(ejecutor, lambda: sesiones[host].get(url, timeout=timeout))
+                        error = None
+                    except requests.RequestException as e:
+                        respuesta, error = None, str(e)
+                sup_met.contar('peticiones', host=host, status=respuesta.status_code if respuesta is not None else 'error')
+
+                if respuesta is not None and respuesta.status_code not in CODIGOS_REINTENTO:
+                    break
+                if intento < reintentos:
+                    sup_met.contar('reintentos', host=host)
+                    await asyncio.sleep(_espera_reintento(respuesta, intento, espera_base))
+
+            if cache is not None and respuesta is not None and respuesta.status_code == 200:
+                cache.guardar(url, respuesta.content)
+
+            return {
+                'posicion': posicion,
+                'url': url,
+                'status': respuesta.status_code if respuesta is not None else None,
+                'contenido': respuesta.content if respuesta is not None else None,
+                'intentos': intento + 1,
+                'error': error,
+                'cache': False,
+            }
+
+        tareas = [asyncio.create_task(descargar(posicion, url)) for posicion, url in enumerate(urls)]
+        try:
+            for tarea in asyncio.as_completed(tareas):
+                yield await tarea
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            for sesion in sesiones.values():
+                sesion.close()
+
+
+def iterar_descargas(urls, **kwargs):
+    """
+    Versión síncrona de `descargar_urls`: devuelve los resultados a medida que llegan.
+
+    El bucle de asyncio se ejecuta en un hilo aparte, de modo que también funciona dentro de un notebook de
+    Jupyter, que ya tiene su propio bucle de eventos en marcha. Los resultados pasan por una cola acotada: si quien
+    consume se retrasa, las descargas se frenan en lugar de acumular páginas en memoria. Si deja de consumir antes
+    de acabar (un `break`, una excepción, un KeyboardInterrupt...), las descargas pendientes se cancelan.
+
+    Args:
+        urls (list): Lista de URLs a descargar.
+        **kwargs: Parámetros de `descargar_urls` (concurrencia, tasa_por_host, reintentos...).
+
+    Yields:
+        dict: Los mismos resultados que `descargar_urls`, en orden de llegada.
+    """
+
+    resultados = queue.Queue(maxsize=2 * kwargs.get('concurrencia', 8))
+    fin = object()
+    parar = threading.Event()
+    bucle = {}
+
+    async def consumir():
+        bucle['loop'], bucle['tarea'] = asyncio.get_running_loop(), asyncio.current_task()
+        if parar.is_set():
+            return
+        async for resultado in descargar_urls(urls, **kwargs):
+            # La espera de un hueco en la cola no bloquea el bucle de eventos
+            await asyncio.to_thread(resultados.put, resultado)
+
+    def ejecutar():
+        try:
+            asyncio.run(consumir())
+        except BaseException as e:
+            resultados.put(e)
+        finally:
+            resultados.put(fin)
+
+    hilo = threading.Thread(target=ejecutar, daemon=True)
+    hilo.start()
+
+    try:
+        while True:
+            resultado = resultados.get()
+            if resultado is fin:
+                break
+            if isinstance(resultado, BaseException):
+                raise resultado
+            yield resultado
+    finally:
+        parar.set()
+        if 'tarea' in bucle:
+            try:
+                bucle['loop'].call_soon_threadsafe(bucle['tarea'].cancel)
+            except RuntimeError:
+                # El bucle ya había terminado
+                pass
+        # Se vacía la cola para que el hilo no se quede esperando un hueco
+        while hilo.is_alive():
+            try:
+                resultados.get_nowait()
+            except queue.Empty:
+                hilo.join(0.05)
@@ -0,0 +1,277 @@
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+DIRECTORIO_HISTORICO = Path(__file__).resolve().parent.parent / 'datos' / 'historico'
+
+# Columnas de `soup_to_df` que se guardan; el precio va aparte porque es lo que más cambia
+ATRIBUTOS = ['Name', 'Address', 'Distance to center', 'Score', 'Location score', 'Link']
+PRECIO = 'Price (€)'
+
+ESQUEMA = pa.schema([
+    ('fecha', pa.timestamp('us')),
+    ('id', pa.string()),
+    ('tipo', pa.string()),
+    ('Name', pa.string()),
+    ('Address', pa.string()),
+    ('Distance to center', pa.float64()),
+    ('Score', pa.float64()),
+    ('Location score', pa.float64()),
+    (PRECIO, pa.float64()),
+    ('Link', pa.string()),
+])
+
+# Tipos de cambio: las altas y los cambios de datos guardan la fila entera, los de precio solo el precio y las bajas solo el id
+TIPOS = ['alta', 'baja', 'precio', 'datos']
+
+FORMATO_FECHA = '%Y%m%dT%H%M%S'
+
+
+def id_propiedad(links):
+    """
+    Devuelve el identificador estable de cada alojamiento a partir de su enlace de Booking: país y nombre de la
+    página del hotel, sin idioma ni parámetros de seguimiento ('https://www.booking.com/hotel/fr/la-sanguine.es.html?aid=...' -> 'fr/la-sanguine').
+
+    Args:
+        links (pd.Series): La columna 'Link' de `soup_to_df`.
+
+    Returns:
+        pd.Series: Los identificadores, NaN si el enlace no es de un hotel de Booking.
+    """
+
+    partes = links.astype(str).str.extract(r'booking\.com/hotel/([a-z]{2})/([^/?#.]+)')
+    return partes[0] + '/' + partes[1]
+
+
+def limpiar_link(links):
+    """
+    Quita del enlace de Booking los parámetros de la búsqueda y de seguimiento, que ocupan casi todo el texto.
+    """
+
+    return links.astype(str).str.split('?', n=1).str[0].where(links.notna())
+
+
+def _preparar(df):
+    """
+    Devuelve la tabla de un scraping indexada por id de alojamiento, con solo las columnas que se guardan.
+    Las filas sin id se descartan y, si un alojamiento aparece varias veces, se queda la primera.
+    """
+
+    tabla = df.reindex(columns=ATRIBUTOS + [PRECIO]).copy()
+    tabla.index = id_propiedad(df['Link']).to_numpy()
+    tabla['Link'] = limpiar_link(tabla['Link'])
+    tabla = tabla[tabla.index.notna()]
+    tabla = tabla[~tabla.index.duplicated()]
+    tabla.index.name = 'id'
+    return tabla.astype({columna: float for columna in ['Distance to center', 'Score', 'Location score', PRECIO]})
+
+
+def _distintos(a, b):
+    """
+    Compara dos DataFrames alineados columna a columna, considerando iguales dos NaN.
+    """
+
+    return (a != b) & ~(a.isna() & b.isna())
+
+
+def diferencias(anterior, nueva):
+    """
+    Calcula los cambios entre dos instantáneas preparadas (indexadas por id).
+
+    Args:
+        anterior (pd.DataFrame): La instantánea previa.
+        nueva (pd.DataFrame): La instantánea nueva.
+
+    Returns:
+        pd.DataFrame: Un cambio por fila, con las columnas 'id', 'tipo' y las de la instantánea (vacías donde el tipo no las usa).
+    """
+
+    altas = nueva.index.difference(anterior.index, sort=False)
+    bajas = anterior.index.difference(nueva.index, sort=False)
+    comunes = nueva.index.intersection(anterior.index, sort=False)
+
+    previos, actuales = anterior.loc[comunes], nueva.loc[comunes]
+    cambia_datos = _distintos(previos[ATRIBUTOS], actuales[ATRIBUTOS]).any(axis=1).to_numpy()
+    cambia_precio = _distintos(previos[PRECIO], actuales[PRECIO]).to_numpy() & ~cambia_datos
+
+    partes = [
+        nueva.loc[altas].assign(tipo='alta'),
+        pd.DataFrame(index=bajas).assign(tipo='baja'),
+        actuales.loc[cambia_precio, [PRECIO]].assign(tipo='precio'),
+        actuales.loc[cambia_datos].assign(tipo='datos'),
+    ]
+    partes = [parte for parte in partes if len(parte)]
+    cambios = pd.concat(partes) if partes else pd.DataFrame(columns=['tipo'], index=pd.Index([], dtype=object))
+    cambios = cambios.reindex(columns=['tipo'] + ATRIBUTOS + [PRECIO])
+    cambios.index.name = 'id'
+    return cambios.reset_index()
+
+
+def aplicar(instantanea, cambios):
+    """
+    Aplica a una instantánea (indexada por id) los cambios de `diferencias` y devuelve la nueva.
+    """
+
+    tipo = cambios['tipo'].to_numpy()
+    resultado = instantanea.drop(index=cambios.loc[tipo == 'baja', 'id'])
+
+    precios = cambios[tipo == 'precio']
+    resultado.loc[precios['id'].to_numpy(), PRECIO] = precios[PRECIO].to_numpy()
+
+    filas = cambios[(tipo == 'alta') | (tipo == 'datos')].set_index('id')[ATRIBUTOS + [PRECIO]]
+    resultado = pd.concat([resultado.drop(index=filas.index, errors='ignore'), filas])
+    resultado.index.name = 'id'
+    return resultado
+
+
+class HistoricoAlojamientos:
+    """
+    Histórico de los alojamientos de una búsqueda (ciudad y fechas de estancia) a lo largo de varios scrapings.
+
+    Cada scraping que se registra se compara con la instantánea anterior y solo se guardan los cambios (altas,
+    bajas, cambios de precio y cambios del resto de datos) en un fichero Parquet por scraping en
+    `<directorio>/cambios/`. Cada `cada_completa` registros se guarda además la instantánea completa en
+    `<directorio>/completas/`, de modo que reconstruir un día solo aplica los cambios desde la última completa.
+    Los alojamientos se identifican por `id_propiedad`, y los enlaces se guardan sin los parámetros de seguimiento.
+    """
+
+    def __init__(self, directorio, cada_completa=30):
+        self.directorio = Path(directorio)
+        self.cambios = self.directorio / 'cambios'
+        self.completas = self.directorio / 'completas'
+        self.cambios.mkdir(parents=True, exist_ok=True)
+        self.completas.mkdir(parents=True, exist_ok=True)
+        self.cada_completa = cada_completa
+
+        # Última instantánea, para comparar con ella el siguiente scraping sin reconstruirla cada vez
+        self._ultima = None
+
+    def _fechas(self, directorio):
+        return [pd.Timestamp(datetime.strptime(ruta.stem, FORMATO_FECHA)) for ruta in sorted(directorio.glob('*.parquet'))]
+
+    def _ruta(self, directorio, fecha):
+        return directorio / f'{fecha.strftime(FORMATO_FECHA)}.parquet'
+
+    def fechas(self):
+        """
+        Devuelve las fechas de los scrapings registrados, en orden.
+        """
+
+        return self._fechas(self.cambios)
+
+    def __len__(self):
+        return len(self.fechas())
+
+    def _escribir(self, ruta, cambios, fecha):
+        cambios = cambios.assign(fecha=fecha)[ESQUEMA.names]
+        pq.write_table(pa.Table.from_pandas(cambios, schema=ESQUEMA, preserve_index=False), ruta)
+
+    def _leer(self, ruta):
+        return pq.read_table(ruta, schema=ESQUEMA).to_pandas().drop(columns='fecha')
+
+    def registrar(self, df, fecha=None):
+        """
+        Registra un scraping nuevo guardando solo sus diferencias con el anterior.
+
+        Args:
+            df (pd.DataFrame): La salida limpia de `soup_to_df` (o de `scrap_url` + `soup_to_df`).
+            fecha (str, date o datetime, optional): Momento del scraping. Por defecto ahora. Debe ser posterior al último registrado.
+
+        Returns:
+            dict: Número de altas, bajas, cambios de precio y cambios de datos, y de filas descartadas por no tener id o estar repetidas.
+
+        Raises:
+            ValueError: Si la fecha no es posterior a la del último scraping registrado.
+        """
+
+        fecha = pd.Timestamp.now() if fecha is None else pd.Timestamp(fecha)
+        fecha = fecha.floor('s')
+        fechas = self.fechas()
+        if fechas and fecha <= fechas[-1]:
+            raise ValueError(f"La fecha {fecha} no es posterior al último scraping registrado ({fechas[-1]})")
+
+        nueva = _preparar(df)
+        anterior = self._ultima if self._ultima is not None else self.instantanea()
+        cambios = diferencias(anterior, nueva)
+        self._escribir(self._ruta(self.cambios, fecha), cambios, fecha)
+
+        # El primer registro ya es una instantánea completa (todo son altas)
+        if (len(fechas) + 1) % self.cada_completa == 0:
+            self._escribir(self._ruta(self.completas, fecha), nueva.reset_index().assign(tipo='alta'), fecha)
+        self._ultima = nueva
+
+        resumen = cambios['tipo'].value_counts()
+        return {**{tipo: int(resumen.get(tipo, 0)) for tipo in TIPOS}, 'descartadas': len(df) - len(nueva)}
+
+    def instantanea(self, fecha=None):
+        """
+        Reconstruye los alojamientos tal y como estaban en un momento dado.
+
+        Args:
+            fecha (str, date o datetime, optional): El momento. Por defecto, el último scraping.
+
+        Returns:
+            pd.DataFrame: La instantánea del último scraping anterior o igual a `fecha`, indexada por id (vacía si no hay ninguno).
+        """
+
+        fechas = self.fechas()
+        if fecha is not None:
+            fecha = pd.Timestamp(fecha)
+        elif fechas:
+            fecha = fechas[-1]
+
+        resultado = pd.DataFrame(columns=ATRIBUTOS + [PRECIO]).astype({columna: float for columna in ['Distance to center', 'Score', 'Location score', PRECIO]})
+        resultado.index.name = 'id'
+        if fecha is None:
+            return resultado
+
+        desde = None
+        completas = [completa for completa in self._fechas(self.completas) if completa <= fecha]
+        if completas:
+            desde = completas[-1]
+            resultado = self._leer(self._ruta(self.completas, desde)).set_index('id')[ATRIBUTOS + [PRECIO]]
+
+        for registro in fechas:
+            if (desde is None or registro > desde) and registro <= fecha:
+                resultado = aplicar(resultado, self._leer(self._ruta(self.cambios, registro)))
+
+        return resultado
+
+    def curva_precios(self, ids=None):
+        """
+        Devuelve el precio de cada alojamiento en cada scraping, leyendo solo las columnas de precio de los cambios.
+
+        Args:
+            ids (list, optional): Los ids de los alojamientos (ver `id_propiedad`). Por defecto todos.
+
+        Returns:
+            pd.DataFrame: Una fila por scraping y una columna por alojamiento, con NaN mientras no aparece en la búsqueda.
+        """
+
+        filtro = None if ids is None else ds.field('id').isin(list(ids))
+        dataset = ds.dataset(self.cambios, schema=ESQUEMA, format='parquet')
+        eventos = dataset.to_table(columns=['fecha', 'id', 'tipo', PRECIO], filter=filtro).to_pandas()
+
+        # Las bajas se marcan con -1 y los precios que pasan a faltar con -2 para que no se confundan con "sin cambios"
+        # al arrastrar el último precio; los dos vuelven a ser NaN después
+        eventos[PRECIO] = eventos[PRECIO].fillna(-2.0).where(eventos['tipo'] != 'baja', -1.0)
+        curva = eventos.pivot_table(index='fecha', columns='id', values=PRECIO, aggfunc='last')
+        curva = curva.reindex(pd.DatetimeIndex(self.fechas(), name='fecha')).ffill()
+        curva = curva.mask(curva < 0)
+        if ids is not None:
+            curva = curva.reindex(columns=list(ids))
+        return curva
+
+    def estadisticas(self):
+        """
+        Devuelve el número de scrapings e instantáneas completas guardadas y el tamaño en disco.
+        """
+
+        tamano = lambda directorio: sum(ruta.stat().st_size for ruta in directorio.glob('*.parquet'))
+        return {'scrapings': len(self.fechas()), 'completas': len(self._fechas(self.completas)),
+                'bytes_cambios': tamano(self.cambios), 'bytes_completas': tamano(self.completas)}
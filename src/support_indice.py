@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+
+
+# Columnas numéricas de la salida limpia de `support_alojamiento.soup_to_df` por las que se filtra y se ordena
+COLUMNAS_INDICE = ['Score', 'Location score', 'Price (€)', 'Distance to center']
+
+# Filas que se comprueban de una vez al recorrer una columna en orden
+BLOQUE = 4096
+
+
+class IndiceAlojamientos:
+    """
+    Índice en memoria para buscar alojamientos por rangos de varias columnas y paginar los resultados ordenados.
+
+    Por cada columna indexada se guardan sus valores ordenados y la fila de cada uno, de modo que las filas dentro de
+    un rango se localizan con dos búsquedas binarias. En una consulta con varios rangos se parte del más selectivo y
+    solo se comprueban los demás sobre sus filas; para ordenar y paginar se recorre en orden la columna de ordenación
+    hasta completar la página si eso es más barato que ordenar todas las filas candidatas. Los valores NaN no cumplen
+    ningún rango y quedan al final al ordenar, como con una máscara y `sort_values` de pandas.
+
+    Las filas nuevas de un scraping se añaden con `agregar` intercalándolas en los arrays ya ordenados, sin reordenar todo.
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_INDICE):
+        """
+        Args:
+            df (pd.DataFrame): Alojamientos ya limpios (ver `support_alojamiento.clean_df`).
+            columnas (list): Columnas numéricas que se indexan.
+        """
+
+        self.columnas = list(columnas)
+        self.df = df.iloc[:0]
+        self.valores = {columna: np.empty(0) for columna in self.columnas}
+        self.ordenados = {columna: np.empty(0) for columna in self.columnas}
+        self.filas = {columna: np.empty(0, dtype=np.int64) for columna in self.columnas}
+        self.nulos = {columna: np.empty(0, dtype=np.int64) for columna in self.columnas}
+        self.agregar(df)
+
+    def __len__(self):
+        return len(self.df)
+
+    def agregar(self, df):
+        """
+        Añade filas al índice, por ejemplo las de un scraping nuevo.
+
+        Args:
+            df (pd.DataFrame): Filas nuevas con las mismas columnas.
+
+        Returns:
+            None
+        """
+
+        if not len(df):
+            return
+
+        inicio = len(self.df)
+        self.df = pd.concat([self.df, df]) if inicio else df
+        nuevas = np.arange(inicio, inicio + len(df))
+
+        for columna in self.columnas:
+            valores = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype=float)
+            self.valores[columna] = np.concatenate([self.valores[columna], valores])
+
+            validos = ~np.isnan(valores)
+            self.nulos[columna] = np.concatenate([self.nulos[columna], nuevas[~validos]])
+
+            # Las filas nuevas se intercalan después de las existentes con el mismo valor, así que el orden sigue siendo (valor, fila)
+            orden = np.argsort(valores[validos], kind='stable')
+            valores_nuevos, filas_nuevas = valores[validos][orden], nuevas[validos][orden]
+            posiciones = np.searchsorted(self.ordenados[columna], valores_nuevos, side='right')
+            self.ordenados[columna] = np.insert(self.ordenados[columna], posiciones, valores_nuevos)
+            self.filas[columna] = np.insert(self.filas[columna], posiciones, filas_nuevas)
+
+    def _filtros(self, filtros):
+        """
+        Descarta los filtros sin límites, que no excluyen ninguna fila (tampoco las que tienen NaN).
+        """
+
+        filtros = {columna: tuple(limites) for columna, limites in (filtros or {}).items() if any(limite is not None for limite in limites)}
+        for columna in filtros:
+            if columna not in self.ordenados:
+                raise KeyError(f"La columna '{columna}' no está indexada: {self.columnas}")
+        return filtros
+
+    def _rango(self, columna, minimo, maximo):
+        """
+        Devuelve las posiciones [inicio, fin) del array ordenado de la columna con valores entre `minimo` y `maximo` (incluidos).
+        """
+
+        ordenados = self.ordenados[columna]
+        inicio = 0 if minimo is None else np.searchsorted(ordenados, minimo, side='left')
+        fin = len(ordenados) if maximo is None else np.searchsorted(ordenados, maximo, side='right')
+        return inicio, max(inicio, fin)
+
+    def _cumplen(self, filas, rangos):
+        """
+        Devuelve la máscara de las filas que están dentro de todos los rangos.
+        """
+
+        mascara = np.ones(len(filas), dtype=bool)
+        for columna, (minimo, maximo) in rangos.items():
+            valores = self.valores[columna][filas]
+            if minimo is not None:
+                mascara &= valores >= minimo
+            if maximo is not None:
+                mascara &= valores <= maximo
+        return mascara
+
+    def _candidatas(self, filtros):
+        """
+        Devuelve las filas que cumplen los filtros, partiendo del rango con menos filas.
+        """
+
+        if not filtros:
+            return np.arange(len(self.df))
+
+        rangos = {columna: self._rango(columna, *limites) for columna, limites in filtros.items()}
+        mas_selectiva = min(rangos, key=lambda columna: rangos[columna][1] - rangos[columna][0])
+        inicio, fin = rangos[mas_selectiva]
+
+        filas = self.filas[mas_selectiva][inicio:fin]
+        resto = {columna: limites for columna, limites in filtros.items() if columna != mas_selectiva}
+        return np.sort(filas[self._cumplen(filas, resto)])
+
+    def contar(self, filtros=None):
+        """
+        Devuelve el número de alojamientos que cumplen los filtros.
+
+        Args:
+            filtros (dict, optional): Columna -> (mínimo, máximo), con los límites incluidos y None para no limitar.
+
+        Returns:
+            int: El número de filas que cumplen todos los filtros.
+        """
+
+        filtros = self._filtros(filtros)
+        if len(filtros) == 1:
+            # Con un solo rango basta con las dos búsquedas binarias
+            (columna, limites), = filtros.items()
+            inicio, fin = self._rango(columna, *limites)
+            return int(fin - inicio)
+        return len(self._candidatas(filtros))
+
+    def _recorrer_en_orden(self, columna, filtros, ascendente, necesarias):
+        """
+        Recorre la columna de ordenación por bloques hasta reunir `necesarias` filas que cumplen los filtros.
+        """
+
+        inicio, fin = self._rango(columna, *filtros.get(columna, (None, None)))
+        ordenados, filas = self.ordenados[columna], self.filas[columna]
+        resto = {otra: limites for otra, limites in filtros.items() if otra != columna}
+
+        encontradas = []
+        total = 0
+        while inicio < fin and total < necesarias:
+            if ascendente:
+                # Los valores iguales ya están ordenados por fila
+                corte = min(fin, inicio + BLOQUE)
+                bloque = filas[inicio:corte]
+                inicio = corte
+            else:
+                # En orden descendente los valores iguales deben seguir ordenados por fila, como con sort_values
+                corte = max(inicio, fin - BLOQUE)
+                if corte > inicio:
+                    corte = min(corte, np.searchsorted(ordenados, ordenados[corte], side='left'))
+                bloque = filas[corte:fin]
+                bloque = bloque[np.lexsort((bloque, -ordenados[corte:fin]))]
+                fin = corte
+
+            bloque = bloque[self._cumplen(bloque, resto)]
+            encontradas.append(bloque)
+            total += len(bloque)
+
+        # Las filas sin valor en la columna de ordenación van al final, si ningún filtro sobre ella las excluye
+        if total < necesarias and columna not in filtros:
+            bloque = self.nulos[columna][self._cumplen(self.nulos[columna], resto)]
+            encontradas.append(bloque)
+
+        return np.concatenate(encontradas) if encontradas else np.empty(0, dtype=np.int64)
+
+    def buscar(self, filtros=None, ordenar_por=None, ascendente=True, pagina=0, por_pagina=20):
+        """
+        Devuelve una página de los alojamientos que cumplen los filtros.
+
+        Args:
+            filtros (dict, optional): Columna -> (mínimo, máximo), con los límites incluidos y None para no limitar,
+                por ejemplo {'Score': (8, None), 'Price (€)': (None, 400), 'Distance to center': (None, 2)}.
+            ordenar_por (str, optional): Columna indexada por la que se ordena. Por defecto, el orden de llegada.
+            ascendente (bool): Sentido del orden. Los empates mantienen el orden de llegada.
+            pagina (int): Número de página, empezando en 0.
+            por_pagina (int): Filas por página.
+
+        Returns:
+            pd.DataFrame: Las filas de la página, igual que `df[mascara].sort_values(ordenar_por, kind='stable').iloc[...]`.
+        """
+
+        filtros = self._filtros(filtros)
+        desde, hasta = pagina * por_pagina, (pagina + 1) * por_pagina
+
+        if ordenar_por is None:
+            return self.df.iloc[self._candidatas(filtros)[desde:hasta]]
+        if ordenar_por not in self.ordenados:
+            raise KeyError(f"La columna '{ordenar_por}' no está indexada: {self.columnas}")
+
+        # Filas que habría que revisar por cada estrategia, suponiendo que los filtros son independientes
+        rangos = {columna: self._rango(columna, *limites) for columna, limites in filtros.items()}
+        tamanos = {columna: fin - inicio for columna, (inicio, fin) in rangos.items()}
+        candidatas = min(tamanos.values(), default=len(self.df))
+        selectividad = np.prod([tamano / max(len(self.df), 1) for columna, tamano in tamanos.items() if columna != ordenar_por])
+        a_recorrer = hasta / selectividad if selectividad else np.inf
+
+        if a_recorrer < candidatas:
+            filas = self._recorrer_en_orden(ordenar_por, filtros, ascendente, hasta)
+        else:
+            filas = self._candidatas(filtros)
+            valores = self.valores[ordenar_por][filas]
+            validos = ~np.isnan(valores)
+            clave = valores[validos] if ascendente else -valores[validos]
+            filas = np.concatenate([filas[validos][np.lexsort((filas[validos], clave))], filas[~validos]])
+
+        return self.df.iloc[filas[desde:hasta]]
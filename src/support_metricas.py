@@ -0,0 +1,356 @@
+"""
+Instrumentación opcional del scraping y del procesado: tiempos por etapa, contadores y fallos de extracción.
+
+Está desactivada por defecto y entonces cada punto de medida solo comprueba una variable global. Con `activar()`
+se acumulan, por etapa y etiquetas, el número de llamadas y el tiempo total y máximo:
+
+    fetch    peticiones HTTP y cargas de página del navegador
+    wait     esperas de Selenium y pausas entre acciones del navegador
+    parse    parseo de HTML (y decodificación de las respuestas JSON de vuelos)
+    extract  aplicación de los planes de extracción de `support_parser`
+    clean    limpieza de columnas (`support_alojamiento.clean_df`)
+    build    construcción de los DataFrames finales
+
+Cada duración se cuenta también en una cubeta de `LIMITES_DURACION`, de la que se estiman los percentiles (ver
+`percentil`) y el histograma de Prometheus. Además se cuentan los elementos procesados por cada plan de extracción y los campos y selectores que no se
+encontraron, para calcular la tasa de fallos por campo. Las métricas se exportan a JSON o al formato de texto de
+Prometheus (por ejemplo, para el textfile collector de node_exporter), sin ningún servicio externo.
+
+Las métricas son de cada proceso: las de otros procesos (por ejemplo, los del pool de `support_reproceso`) se
+envían al principal como una `instantanea()` y se suman a las suyas con `fusionar`.
+"""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+
+ETAPAS = ['fetch', 'wait', 'parse', 'extract', 'clean', 'build']
+
+PREFIJO = 'viajes'
+
+# Límites superiores en segundos de las cubetas de duraciones, como los de un histograma de Prometheus
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ACTIVAS = False
+_LOCK = threading.Lock()
+
+# (etapa, etiquetas) -> [llamadas, segundos, máximo, llamadas por cubeta (la última, sin límite)]
+_TIEMPOS = {}
+# (nombre, etiquetas) -> valor
+_CONTADORES = {}
+# plan -> {'items': n, 'campos': {campo: fallos}, 'selectores': {selector: fallos}}
+_EXTRACCION = {}
+
+# Lo que devuelve `medir` con las métricas desactivadas: un único objeto que no hace nada
+_NULO = nullcontext()
+
+
+def activar():
+    """
+    Empieza a acumular métricas en este proceso.
+    """
+
+    global _ACTIVAS
+    _ACTIVAS = True
+
+
+def desactivar():
+    """
+    Deja de acumular métricas; las ya acumuladas se conservan hasta `reiniciar`.
+    """
+
+    global _ACTIVAS
+    _ACTIVAS = False
+
+
+def activas():
+    return _ACTIVAS
+
+
+def reiniciar():
+    """
+    Borra todas las métricas acumuladas.
+    """
+
+    with _LOCK:
+        _TIEMPOS.clear()
+        _CONTADORES.clear()
+        _EXTRACCION.clear()
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((etiqueta, str(valor)) for etiqueta, valor in etiquetas.items()))
+
+
+class _Cronometro:
+    __slots__ = ('clave', 'inicio')
+
+    def __init__(self, clave):
+        self.clave = clave
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        duracion = time.perf_counter() - self.inicio
+        with _LOCK:
+            tiempos = _TIEMPOS.get(self.clave)
+            if tiempos is None:
+                tiempos = _TIEMPOS[self.clave] = [0, 0.0, 0.0, [0] * (len(LIMITES_DURACION) + 1)]
+            tiempos[0] += 1
+            tiempos[1] += duracion
+            tiempos[2] = max(tiempos[2], duracion)
+            tiempos[3][bisect.bisect_left(LIMITES_DURACION, duracion)] += 1
+
+
+def medir(etapa, **etiquetas):
+    """
+    Mide el tiempo de un bloque de código como una llamada a una etapa.
+
+    Args:
+        etapa (str): Una de `ETAPAS`.
+        **etiquetas: Etiquetas que distinguen la medida, por ejemplo modulo='alojamientos'.
+
+    Returns:
+        Context manager: Uso `with sup_met.medir('parse'):`.
+    """
+
+    if not _ACTIVAS:
+        return _NULO
+    return _Cronometro(_clave(etapa, etiquetas))
+
+
+def cronometrado(etapa, **etiquetas):
+    """
+    Decorador que mide cada llamada a una función como una llamada a una etapa (ver `medir`).
+    """
+
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            if not _ACTIVAS:
+                return funcion(*args, **kwargs)
+            with _Cronometro(_clave(etapa, etiquetas)):
+                return funcion(*args, **kwargs)
+        return envoltorio
+
+    return decorador
+
+
+def contar(nombre, cantidad=1, **etiquetas):
+    """
+    Suma `cantidad` a un contador, por ejemplo de peticiones por código de estado o de reintentos.
+
+    Args:
+        nombre (str): El nombre del contador.
+        cantidad (int): Lo que se suma.
+        **etiquetas: Etiquetas que distinguen el contador, por ejemplo status=200.
+
+    Returns:
+        None
+    """
+
+    if not _ACTIVAS:
+        return
+    clave = _clave(nombre, etiquetas)
+    with _LOCK:
+        _CONTADORES[clave] = _CONTADORES.get(clave, 0) + cantidad
+
+
+def registrar_extraccion(plan, informe):
+    """
+    Acumula un informe de `PlanExtraccion.extraer`: elementos procesados y fallos por campo y por selector.
+
+    Args:
+        plan (str): El nombre del plan de extracción.
+        informe (dict): El informe, con las claves 'items', 'campos' y 'selectores'.
+
+    Returns:
+        None
+    """
+
+    if not _ACTIVAS:
+        return
+    with _LOCK:
+        total = _EXTRACCION.setdefault(plan, {'items': 0, 'campos': {}, 'selectores': {}})
+        total['items'] += informe['items']
+        for grupo in ('campos', 'selectores'):
+            for nombre, fallos in informe[grupo].items():
+                total[grupo][nombre] = total[grupo].get(nombre, 0) + fallos
+
+
+def instantanea():
+    """
+    Devuelve una copia de todas las métricas acumuladas.
+
+    Returns:
+        dict: Con las claves 'etapas' (llamadas, segundos, máximo y llamadas por cubeta de `LIMITES_DURACION`, más
+        una última sin límite, por etapa y etiquetas), 'contadores' y
+        'extraccion' (por plan: elementos y, por campo y selector, fallos y tasa de fallos).
+    """
+
+    with _LOCK:
+        etapas = [{'etapa': etapa, 'etiquetas': dict(etiquetas), 'llamadas': llamadas, 'segundos': segundos, 'maximo': maximo, 'cubetas': list(cubetas)}
+                  for (etapa, etiquetas), (llamadas, segundos, maximo, cubetas) in _TIEMPOS.items()]
+        contadores = [{'nombre': nombre, 'etiquetas': dict(etiquetas), 'valor': valor} for (nombre, etiquetas), valor in _CONTADORES.items()]
+        extraccion = {}
+        for plan, total in _EXTRACCION.items():
+            items = total['items']
+            extraccion[plan] = {'items': items}
+            for grupo in ('campos', 'selectores'):
+                extraccion[plan][grupo] = {nombre: {'fallos': fallos, 'tasa': fallos / items if items else 0.0}
+                                           for nombre, fallos in total[grupo].items()}
+
+    orden = {etapa: posicion for posicion, etapa in enumerate(ETAPAS)}
+    etapas.sort(key=lambda medida: (orden.get(medida['etapa'], len(orden)), sorted(medida['etiquetas'].items())))
+    return {'etapas': etapas, 'contadores': contadores, 'extraccion': extraccion}
+
+
+def fusionar(datos):
+    """
+    Suma a las métricas de este proceso las de una `instantanea()` de otro, por ejemplo de un proceso de un pool.
+
+    Args:
+        datos (dict): La instantánea del otro proceso.
+
+    Returns:
+        None
+    """
+
+    if not _ACTIVAS:
+        return
+    with _LOCK:
+        for medida in datos['etapas']:
+            clave = _clave(medida['etapa'], medida['etiquetas'])
+            tiempos = _TIEMPOS.get(clave)
+            if tiempos is None:
+                tiempos = _TIEMPOS[clave] = [0, 0.0, 0.0, [0] * (len(LIMITES_DURACION) + 1)]
+            tiempos[0] += medida['llamadas']
+            tiempos[1] += medida['segundos']
+            tiempos[2] = max(tiempos[2], medida['maximo'])
+            tiempos[3] = [a + b for a, b in zip(tiempos[3], medida['cubetas'])]
+
+        for contador in datos['contadores']:
+            clave = _clave(contador['nombre'], contador['etiquetas'])
+            _CONTADORES[clave] = _CONTADORES.get(clave, 0) + contador['valor']
+
+        for plan, informe in datos['extraccion'].items():
+            total = _EXTRACCION.setdefault(plan, {'items': 0, 'campos': {}, 'selectores': {}})
+            total['items'] += informe['items']
+            for grupo in ('campos', 'selectores'):
+                for nombre, fallo in informe[grupo].items():
+                    total[grupo][nombre] = total[grupo].get(nombre, 0) + fallo['fallos']
+
+
+def percentil(medida, q):
+    """
+    Estima un percentil de la duración de una etapa a partir de sus cubetas, interpolando dentro de la cubeta.
+
+    Args:
+        medida (dict): Una de las medidas de `instantanea()['etapas']`.
+        q (float): El percentil, entre 0 y 100.
+
+    Returns:
+        float: La duración estimada en segundos (nunca mayor que el máximo observado), o NaN si no hay llamadas.
+    """
+
+    if not medida['llamadas']:
+        return float('nan')
+
+    objetivo = medida['llamadas'] * q / 100
+    acumuladas = 0
+    for posicion, llamadas in enumerate(medida['cubetas']):
+        if llamadas and acumuladas + llamadas >= objetivo:
+            desde = LIMITES_DURACION[posicion - 1] if posicion else 0.0
+            hasta = LIMITES_DURACION[posicion] if posicion < len(LIMITES_DURACION) else medida['maximo']
+            return min(desde + (hasta - desde) * (objetivo - acumuladas) / llamadas, medida['maximo'])
+        acumuladas += llamadas
+    return medida['maximo']
+
+
+def exportar_json(ruta=None):
+    """
+    Devuelve las métricas como JSON y, si se indica una ruta, las escribe en ella.
+    """
+
+    texto = json.dumps(instantanea(), ensure_ascii=False, indent=2)
+    if ruta is not None:
+        Path(ruta).write_text(texto, encoding='utf-8')
+    return texto
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    escapar = lambda valor: str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{etiqueta}="{escapar(valor)}"' for etiqueta, valor in sorted(etiquetas.items())) + '}'
+
+
+def exportar_prometheus(ruta=None):
+    """
+    Devuelve las métricas en el formato de texto de Prometheus y, si se indica una ruta, las escribe en ella.
+
+    La ruta se escribe en un fichero temporal y se renombra, para que un textfile collector nunca lea un fichero a medias.
+    """
+
+    datos = instantanea()
+    lineas = []
+
+    def familia(nombre, tipo, ayuda, muestras):
+        lineas.append(f'# HELP {PREFIJO}_{nombre} {ayuda}')
+        lineas.append(f'# TYPE {PREFIJO}_{nombre} {tipo}')
+        lineas.extend(f'{PREFIJO}_{nombre}{_etiquetas(etiquetas)} {valor:g}' for etiquetas, valor in muestras)
+
+    etapas = [({'etapa': medida['etapa'], **medida['etiquetas']}, medida) for medida in datos['etapas']]
+    familia('etapa_llamadas_total', 'counter', 'Llamadas a cada etapa.', [(etiquetas, medida['llamadas']) for etiquetas, medida in etapas])
+    familia('etapa_segundos_total', 'counter', 'Tiempo total de cada etapa en segundos.', [(etiquetas, medida['segundos']) for etiquetas, medida in etapas])
+    familia('etapa_segundos_max', 'gauge', 'Duración máxima de una llamada a cada etapa en segundos.', [(etiquetas, medida['maximo']) for etiquetas, medida in etapas])
+
+    nombre = f'{PREFIJO}_etapa_duracion_segundos'
+    lineas.append(f'# HELP {nombre} Duración de las llamadas a cada etapa en segundos.')
+    lineas.append(f'# TYPE {nombre} histogram')
+    for etiquetas, medida in etapas:
+        acumuladas = 0
+        for limite, llamadas in zip(LIMITES_DURACION + ('+Inf',), medida['cubetas']):
+            acumuladas += llamadas
+            lineas.append(f"{nombre}_bucket{_etiquetas({**etiquetas, 'le': f'{limite:g}' if limite != '+Inf' else limite})} {acumuladas}")
+        lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {medida["segundos"]:g}')
+        lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {medida["llamadas"]}')
+
+    for nombre in dict.fromkeys(contador['nombre'] for contador in datos['contadores']):
+        familia(f'{nombre}_total', 'counter', f'Contador {nombre}.',
+                [(contador['etiquetas'], contador['valor']) for contador in datos['contadores'] if contador['nombre'] == nombre])
+
+    extraccion = datos['extraccion']
+    familia('extraccion_items_total', 'counter', 'Elementos procesados por cada plan de extracción.',
+            [({'plan': plan}, total['items']) for plan, total in extraccion.items()])
+    for grupo, singular in (('campos', 'campo'), ('selectores', 'selector')):
+        muestras = [({'plan': plan, singular: nombre}, fallo) for plan, total in extraccion.items() for nombre, fallo in total[grupo].items()]
+        familia(f'extraccion_fallos_{singular}_total', 'counter', f'Elementos en los que no se encontró cada {singular}.',
+                [(etiquetas, fallo['fallos']) for etiquetas, fallo in muestras])
+        familia(f'extraccion_tasa_fallos_{singular}', 'gauge', f'Fracción de elementos en los que no se encontró cada {singular}.',
+                [(etiquetas, fallo['tasa']) for etiquetas, fallo in muestras])
+
+    texto = '\n'.join(lineas) + '\n'
+    if ruta is not None:
+        ruta = Path(ruta)
+        temporal = ruta.with_name(ruta.name + '.tmp')
+        temporal.write_text(texto, encoding='utf-8')
+        temporal.replace(ruta)
+    return texto
+
+
+def exportar(ruta):
+    """
+    Escribe las métricas en un fichero: JSON si la extensión es '.json' y formato Prometheus en otro caso ('.prom', '.txt').
+    """
+
+    if Path(ruta).suffix == '.json':
+        return exportar_json(ruta)
+    return exportar_prometheus(ruta)
@@ -0,0 +1,184 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from src import support_metricas as sup_met
+
+# Selenium se importa dentro de las funciones que lo usan: el pool se puede crear (y probar con navegadores falsos) sin cargarlo
+
+
+def crear_driver_chrome(headless=True):
+    """
+    Crea un navegador Chrome en modo incógnito, por defecto sin interfaz gráfica (headless).
+
+    Args:
+        headless (bool): Si es True el navegador se ejecuta sin ventana.
+
+    Returns:
+        webdriver.Chrome: El controlador de Selenium del navegador.
+    """
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--incognito")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+
+    driver = webdriver.Chrome(options=chrome_options)
+    if not headless:
+        driver.maximize_window()
+    return driver
+
+
+def pagina_cargada(driver):
+    """
+    Condición de espera: la página ha terminado de cargar (document.readyState == 'complete').
+    """
+
+    return driver.execute_script('return document.readyState') == 'complete'
+
+
+def esperar(driver, condicion, timeout=10, obligatorio=True):
+    """
+    Espera a que se cumpla una condición de Selenium en lugar de dormir un tiempo fijo.
+
+    Args:
+        driver (webdriver): El controlador de Selenium.
+        condicion (callable): Una condición de `expected_conditions` o cualquier función que reciba el driver.
+        timeout (float): Tiempo máximo de espera en segundos.
+        obligatorio (bool): Si es False, al agotarse el tiempo se continúa devolviendo None en lugar de lanzar la excepción.
+
+    Returns:
+        objeto: Lo que devuelva la condición al cumplirse (por ejemplo, el elemento encontrado), o None.
+
+    Raises:
+        TimeoutException: Si la condición es obligatoria y no se cumple en el tiempo indicado.
+    """
+
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    try:
+        with sup_met.medir('wait', modulo='navegador'):
+            return WebDriverWait(driver, timeout).until(condicion)
+    except TimeoutException:
+        sup_met.contar('esperas_agotadas', obligatoria=obligatorio)
+        if obligatorio:
+            raise
+        return None
+
+
+class PoolNavegadores:
+    """
+    Pool acotado de navegadores de larga duración que se reutilizan entre tareas.
+
+    Como máximo hay `tamano` navegadores vivos a la vez. Un navegador se cierra y se sustituye por uno nuevo
+    cuando alcanza `usos_maximos` tareas o cuando una tarea falla con él (por ejemplo, si el navegador se ha
+    colgado). La función `fabrica` crea los navegadores, de modo que se puede sustituir por un objeto falso
+    con los métodos `get`, `quit`, etc. para probar el pool sin un navegador real.
+    """
+
+    def __init__(self, tamano=2, fabrica=crear_driver_chrome, usos_maximos=20):
+        self.tamano = tamano
+        self.fabrica = fabrica
+        self.usos_maximos = usos_maximos
+        self.libres = queue.LifoQueue()
+        self.usos = {}
+        self.vivos = 0
+        self.creados = 0
+        self.reciclados = 0
+        self.lock = threading.Lock()
+        self.hueco = threading.Semaphore(tamano)
+
+    def _cerrar_driver(self, driver, reciclado=True):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+        with self.lock:
+            self.usos.pop(id(driver), None)
+            self.vivos -= 1
+            self.reciclados += reciclado
+
+    @contextmanager
+    def driver(self):
+        """
+        Presta un navegador del pool durante el bloque `with`. Si no hay ninguno libre y el pool está lleno, espera.
+
+        Yields:
+            webdriver: Un navegador listo para usar.
+        """
+
+        self.hueco.acquire()
+        try:
+            try:
+                driver = self.libres.get_nowait()
+            except queue.Empty:
+                driver = self.fabrica()
+                with self.lock:
+                    self.usos[id(driver)] = 0
+                    self.vivos += 1
+                    self.creados += 1
+
+            try:
+                yield driver
+            except BaseException:
+                # No sabemos en qué estado ha quedado el navegador: lo reciclamos
+                self._cerrar_driver(driver)
+                raise
+
+            with self.lock:
+                self.usos[id(driver)] += 1
+                agotado = self.usos[id(driver)] >= self.usos_maximos
+
+            if agotado:
+                self._cerrar_driver(driver)
+            else:
+                self.libres.put(driver)
+        finally:
+            self.hueco.release()
+
+    def mapear(self, funcion, elementos):
+        """
+        Aplica `funcion(driver, elemento)` a cada elemento en paralelo, con tantos hilos como navegadores tiene el pool.
+
+        Args:
+            funcion (callable): Función que recibe un navegador y un elemento.
+            elementos (list): Los elementos a procesar (por ejemplo, ciudades).
+
+        Returns:
+            list: Por cada elemento, en el mismo orden, el resultado de la función o la excepción que lanzó.
+        """
+
+        def tarea(elemento):
+            try:
+                with self.driver() as driver:
+                    return funcion(driver, elemento)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.tamano) as ejecutor:
+            return list(ejecutor.map(tarea, elementos))
+
+    def cerrar(self):
+        """
+        Cierra todos los navegadores libres del pool.
+        """
+
+        while True:
+            try:
+                driver = self.libres.get_nowait()
+            except queue.Empty:
+                break
+            self._cerrar_driver(driver, reciclado=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
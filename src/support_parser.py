@@ -0,0 +1,329 @@
+import sys
+from collections import Counter
+from functools import lru_cache
+
+# lxml es opcional: si no está instalado usamos el parser de la librería estándar
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+from src import support_metricas as sup_met
+
+
+# SECCION BACKENDS DE PARSEO
+# Cada backend expone las mismas primitivas, de forma que los extractores de
+# support_actividades y support_alojamiento no dependen de la librería de parseo:
+#   - parsear(html): convierte el código HTML en un documento.
+#   - buscar(nodo, tag, attrs): primer descendiente que cumple el filtro o None.
+#   - buscar_todos(nodo, tag, attrs): lista de descendientes que cumplen el filtro.
+#   - texto(nodo): texto concatenado del nodo y sus descendientes.
+#   - atributo(nodo, nombre[, defecto]): valor del atributo; sin defecto lanza KeyError como `tag[nombre]`.
+
+
+def _bs4_parsear(html):
+    # BeautifulSoup se importa solo si se usa este backend: con lxml no hace falta cargarlo
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser')
+
+
+def _bs4_buscar_todos(nodo, tag, attrs=None):
+    return nodo.find_all(tag, attrs or {})
+
+
+def _bs4_atributo(nodo, nombre, *defecto):
+    if defecto:
+        return nodo.get(nombre, defecto[0])
+    return nodo[nombre]
+
+
+def _lxml_parsear(html):
+    # lxml no acepta cadenas con declaración de codificación, en ese caso le pasamos bytes
+    if isinstance(html, str) and html.lstrip().startswith('<?xml'):
+        html = html.encode('utf-8')
+    return lxml.html.document_fromstring(html)
+
+
+@lru_cache(maxsize=None)
+def _lxml_xpath(tag, attrs, primero):
+    """
+    Compila (una sola vez por filtro) la expresión XPath equivalente a `find`/`find_all` de BeautifulSoup.
+
+    Igual que BeautifulSoup, el atributo 'class' se compara con sus espacios normalizados y el resto de atributos
+    por igualdad exacta. Los valores se pasan como variables XPath para no tener que escaparlos.
+    """
+
+    condiciones = ''
+    for i, (nombre, _) in enumerate(attrs):
+        if nombre == 'class':
+            condiciones += f'[normalize-space(@class)=$v{i}]'
+        else:
+            condiciones += f'[@{nombre}=$v{i}]'
+
+    expresion = f'.//{tag}{condiciones}'
+    if primero:
+        expresion = f'({expresion})[1]'
+    return etree.XPath(expresion)
+
+
+def _lxml_ejecutar(nodo, tag, attrs, primero):
+    attrs = tuple((attrs or {}).items())
+    variables = {f'v{i}': valor for i, (_, valor) in enumerate(attrs)}
+    return _lxml_xpath(tag, attrs, primero)(nodo, **variables)
+
+
+def _lxml_buscar(nodo, tag, attrs=None):
+    encontrados = _lxml_ejecutar(nodo, tag, attrs, True)
+    return encontrados[0] if encontrados else None
+
+
+def _lxml_buscar_todos(nodo, tag, attrs=None):
+    return _lxml_ejecutar(nodo, tag, attrs, False)
+
+
+def _lxml_texto(nodo):
+    # text_content devuelve una subclase de str, la convertimos para que los DataFrames sean idénticos
+    return str(nodo.text_content())
+
+
+def _lxml_atributo(nodo, nombre, *defecto):
+    valor = nodo.get(nombre)
+    if valor is not None:
+        return valor
+    if defecto:
+        return defecto[0]
+    raise KeyError(nombre)
+
+
+BACKENDS = {
+    'html.parser': {
+        'parsear': _bs4_parsear,
+        'buscar': lambda nodo, tag, attrs=None: nodo.find(tag, attrs or {}),
+        'buscar_todos': _bs4_buscar_todos,
+        'texto': lambda nodo: nodo.get_text(),
+        'atributo': _bs4_atributo,
+    },
+}
+
+if lxml is not None:
+    BACKENDS['lxml'] = {
+        'parsear': _lxml_parsear,
+        'buscar': _lxml_buscar,
+        'buscar_todos': _lxml_buscar_todos,
+        'texto': _lxml_texto,
+        'atributo': _lxml_atributo,
+    }
+
+PARSER_POR_DEFECTO = 'lxml' if 'lxml' in BACKENDS else 'html.parser'
+
+
+def obtener_backend(parser=None):
+    """
+    Devuelve el diccionario de primitivas del backend de parseo indicado.
+
+    Args:
+        parser (str, optional): Nombre del backend ('lxml' o 'html.parser'). Si es None se usa `PARSER_POR_DEFECTO`.
+
+    Returns:
+        dict: Las primitivas 'parsear', 'buscar', 'buscar_todos', 'texto' y 'atributo' del backend.
+
+    Raises:
+        ValueError: Si el backend no existe o su librería no está instalada.
+    """
+
+    parser = parser or PARSER_POR_DEFECTO
+    if parser not in BACKENDS:
+        raise ValueError(f"Parser '{parser}' no disponible. Opciones: {list(BACKENDS)}")
+    return BACKENDS[parser]
+
+
+def detectar_backend(documento):
+    """
+    Identifica el backend al que pertenece un documento ya parseado.
+
+    Args:
+        documento (objeto): Un objeto BeautifulSoup/Tag o un elemento de lxml.
+
+    Returns:
+        str or None: El nombre del backend, o None si el documento no está parseado (por ejemplo, es una cadena HTML).
+    """
+
+    # Si bs4 no se ha importado, el documento no puede ser un objeto de BeautifulSoup
+    bs4_element = sys.modules.get('bs4.element')
+    if bs4_element is not None and isinstance(documento, bs4_element.Tag):
+        return 'html.parser'
+    if lxml is not None and isinstance(documento, etree._Element):
+        return 'lxml'
+    return None
+
+
+def parsear(html, parser=None):
+    """
+    Parsea código HTML con el backend indicado y devuelve el documento junto a sus primitivas.
+
+    Si `html` ya es un documento parseado se reutiliza tal cual con el backend que le corresponde, de modo que las
+    funciones de extracción aceptan indistintamente cadenas, bytes, objetos BeautifulSoup o elementos de lxml, además
+    de handles `PaginaArchivada` de `support_archivo`, que se descomprimen en este momento.
+
+    Args:
+        html (str, bytes, PaginaArchivada u objeto parseado): El código HTML de la página.
+        parser (str, optional): Nombre del backend a usar cuando hay que parsear. Por defecto `PARSER_POR_DEFECTO`.
+
+    Returns:
+        tuple: (documento, backend), donde backend es el diccionario de primitivas de `obtener_backend`.
+    """
+
+    nombre = detectar_backend(html)
+    if nombre is not None:
+        return html, BACKENDS[nombre]
+
+    # Las páginas de un ArchivoPaginas (support_archivo) se descomprimen justo antes de parsearlas
+    if callable(getattr(html, 'texto', None)):
+        html = html.texto()
+
+    backend = obtener_backend(parser)
+    with sup_met.medir('parse'):
+        documento = backend['parsear'](html)
+    return documento, backend
+
+
+# SECCION ESQUEMAS DE EXTRACCION
+# Un esquema describe de forma declarativa los campos que se extraen de cada elemento de una página:
+#   {'campo': {'tag': 'div', 'attrs': {...}, 'indice': 1, 'atributo': 'href', 'limpiar': funcion}, ...}
+#   - tag y attrs: el filtro del nodo que contiene el dato, como en `buscar`.
+#   - indice (opcional): posición del nodo entre todos los que cumplen el filtro, en lugar del primero.
+#   - atributo (opcional): atributo del nodo que contiene el dato; si no se indica se usa su texto.
+#   - limpiar (opcional): función que transforma el texto extraído.
+
+
+def _describir_selector(tag, attrs, indice):
+    """
+    Devuelve un selector legible para los informes de fallos, por ejemplo 'div[class="jVDab W f u w JqMhy"]'.
+    """
+
+    selector = tag + ''.join(f'[{nombre}="{valor}"]' for nombre, valor in attrs)
+    return selector if indice is None else f'{selector}:nth({indice})'
+
+
+class PlanExtraccion:
+    """
+    Esquema de extracción compilado: sabe qué nodos distintos hay que localizar y qué campos salen de cada uno.
+
+    Cada nodo se busca una sola vez por elemento aunque varios campos lo compartan (por ejemplo, la puntuación y
+    el número de reseñas salen del mismo 'aria-label'). Los nodos o atributos que no existen no lanzan excepciones:
+    el campo toma el valor por defecto y el fallo se cuenta por selector, de modo que un cambio en el diseño de la
+    web se ve en el informe en lugar de en una columna llena de valores por defecto.
+    """
+
+    def __init__(self, esquema, defecto=None, nombre='plan'):
+        self.defecto = defecto
+        self.nombre = nombre
+        self.nodos = []
+        self.campos = []
+
+        posiciones = {}
+        for nombre, campo in esquema.items():
+            clave = (campo['tag'], tuple(campo.get('attrs', {}).items()), campo.get('indice'))
+            if clave not in posiciones:
+                posiciones[clave] = len(self.nodos)
+                self.nodos.append(clave)
+            self.campos.append((nombre, posiciones[clave], campo.get('atributo'), campo.get('limpiar')))
+
+        self.selectores = [_describir_selector(*nodo) for nodo in self.nodos]
+
+    def _localizar(self, item, p, tag, attrs, indice):
+        if indice is None:
+            return p['buscar'](item, tag, dict(attrs))
+
+        encontrados = p['buscar_todos'](item, tag, dict(attrs))
+        return encontrados[indice] if len(encontrados) > indice else None
+
+    def extraer(self, items, p):
+        """
+        Aplica el plan a una lista de elementos.
+
+        Args:
+            items (list): Los nodos de los que se extraen los campos (por ejemplo, las tarjetas de una página).
+            p (dict): Las primitivas del backend de parseo de los nodos.
+
+        Returns:
+            tuple: (columnas, informe). `columnas` es un diccionario campo -> lista de valores, en el orden de `items`.
+            `informe` es un diccionario con las claves 'items' (elementos procesados), 'selectores' (veces que no se
+            encontró cada nodo) y 'campos' (valores por defecto de cada campo, por nodo, atributo o formato ausente).
+        """
+
+        with sup_met.medir('extract', plan=self.nombre):
+            columnas, informe = self._extraer(items, p)
+        sup_met.registrar_extraccion(self.nombre, informe)
+        return columnas, informe
+
+    def _extraer(self, items, p):
+        columnas = {nombre: [] for nombre, *_ in self.campos}
+        fallos_nodos = Counter()
+        fallos_campos = Counter()
+
+        for item in items:
+            encontrados = [self._localizar(item, p, *nodo) for nodo in self.nodos]
+            for posicion, nodo in enumerate(encontrados):
+                if nodo is None:
+                    fallos_nodos[self.selectores[posicion]] += 1
+
+            for nombre, posicion, atributo, limpiar in self.campos:
+                nodo = encontrados[posicion]
+                if nodo is None:
+                    valor = None
+                elif atributo is not None:
+                    valor = p['atributo'](nodo, atributo, None)
+                else:
+                    valor = p['texto'](nodo)
+
+                if valor is not None and limpiar is not None:
+                    try:
+                        valor = limpiar(valor)
+                    except (IndexError, ValueError):
+                        # El nodo existe pero el texto no tiene el formato esperado
+                        valor = None
+
+                if valor is None:
+                    fallos_campos[nombre] += 1
+                    valor = self.defecto
+
+                columnas[nombre].append(valor)
+
+        informe = {
+            'items': len(items),
+            'selectores': {selector: fallos_nodos[selector] for selector in self.selectores},
+            'campos': {nombre: fallos_campos[nombre] for nombre in columnas},
+        }
+        return columnas, informe
+
+
+def compilar_esquema(esquema, defecto=None, nombre='plan'):
+    """
+    Compila un esquema declarativo de extracción (ver el comentario de la sección) en un `PlanExtraccion`.
+
+    Args:
+        esquema (dict): Diccionario campo -> especificación del nodo y de cómo obtener el dato.
+        defecto (objeto, optional): Valor de los campos que no se pueden extraer.
+        nombre (str, optional): Nombre del plan en las métricas de `support_metricas`.
+
+    Returns:
+        PlanExtraccion: El plan, reutilizable con cualquier backend y desde varios hilos.
+    """
+
+    return PlanExtraccion(esquema, defecto, nombre)
+
+
+def sumar_informes(informes):
+    """
+    Suma varios informes de `PlanExtraccion.extraer` (por ejemplo, uno por página o por lote) en uno solo.
+    """
+
+    total = {'items': 0, 'selectores': Counter(), 'campos': Counter()}
+    for informe in informes:
+        total['items'] += informe['items']
+        total['selectores'].update(informe['selectores'])
+        total['campos'].update(informe['campos'])
+
+    return {'items': total['items'], 'selectores': dict(total['selectores']), 'campos': dict(total['campos'])}
@@ -0,0 +1,272 @@
+import heapq
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# Pesos por defecto del coste de un viaje: todos los términos están normalizados entre 0 y 1
+PESOS_POR_DEFECTO = {'precio': 1.0, 'duracion': 0.3, 'puntuacion': 0.5, 'distancia': 0.2}
+
+
+def clave_ciudad(nombre):
+    """
+    Normaliza el nombre de una ciudad para comparar fuentes distintas: 'París', 'paris' y 'Paris' dan 'paris'.
+    """
+
+    sin_tildes = unicodedata.normalize('NFKD', str(nombre)).encode('ascii', 'ignore').decode('ascii')
+    return sin_tildes.strip().lower()
+
+
+def _por_ciudad(datos):
+    """
+    Reparte un DataFrame con la columna 'ciudad' (o un diccionario ciudad -> DataFrame) en un diccionario por clave de ciudad.
+    """
+
+    if isinstance(datos, dict):
+        return {clave_ciudad(ciudad): df for ciudad, df in datos.items()}
+    return {clave_ciudad(ciudad): df for ciudad, df in datos.groupby('ciudad', observed=True, sort=False)}
+
+
+def _ciudades_de_vuelos(vuelos, ciudades):
+    """
+    Asigna cada vuelo a una de las ciudades conocidas según el destino de su primer tramo ('Paris Orly' -> 'paris').
+    """
+
+    destinos = vuelos['destination_1'].astype(str).map(clave_ciudad)
+    asignadas = pd.Series(None, index=vuelos.index, dtype=object)
+    for ciudad in sorted(ciudades, key=len, reverse=True):
+        asignadas = asignadas.mask(asignadas.isna() & destinos.str.startswith(ciudad), ciudad)
+    return {ciudad: vuelos[asignadas == ciudad] for ciudad in ciudades if (asignadas == ciudad).any()}
+
+
+def skyband(puntos, k=1):
+    """
+    Devuelve las posiciones de los puntos dominados por menos de `k` puntos (el k-skyband; con k=1, la frontera de Pareto).
+
+    Un punto domina a otro si no es peor en ningún criterio y es mejor en alguno, con todos los criterios a minimizar.
+    Para cualquier coste que crezca con cada criterio, las k mejores opciones están siempre dentro del k-skyband:
+    una opción dominada por k otras tiene al menos k alternativas que no son peores.
+
+    Args:
+        puntos (np.ndarray): Matriz (opciones x criterios).
+        k (int): Número de dominadores a partir del cual se descarta una opción.
+
+    Returns:
+        np.ndarray: Las posiciones de las opciones que se conservan, en orden creciente.
+    """
+
+    puntos = np.asarray(puntos, dtype=float)
+    # En orden lexicográfico, los dominadores de un punto siempre aparecen antes que él
+    orden = np.lexsort(puntos.T[::-1])
+
+    # Basta con comparar con los puntos ya conservados: si un punto tiene k dominadores, k de ellos están en el skyband
+    banda = np.empty_like(puntos)
+    conservados = []
+    for posicion in orden:
+        punto = puntos[posicion]
+        previos = banda[:len(conservados)]
+        dominadores = np.count_nonzero((previos <= punto).all(axis=1) & (previos < punto).any(axis=1))
+        if dominadores < k:
+            banda[len(conservados)] = punto
+            conservados.append(posicion)
+
+    return np.sort(np.array(conservados, dtype=int))
+
+
+def _mejores_combinaciones(costes, precios, presupuesto, k, max_expansiones):
+    """
+    Devuelve las k combinaciones (una opción por fuente) de menor coste total cuyo precio total no supera el presupuesto.
+
+    Cada fuente se ordena por coste y las combinaciones se recorren de menor a mayor coste total con un heap, partiendo
+    de la mejor opción de cada fuente y avanzando una posición en una sola fuente cada vez, sin generar el producto cartesiano.
+    """
+
+    ordenes = [np.argsort(coste, kind='stable') for coste in costes]
+    costes = [coste[orden] for coste, orden in zip(costes, ordenes)]
+    precios = [precio[orden] for precio, orden in zip(precios, ordenes)]
+
+    inicio = (0,) * len(costes)
+    heap = [(sum(coste[0] for coste in costes), inicio)]
+    vistos = {inicio}
+    resultado = []
+
+    while heap and len(resultado) < k and len(vistos) <= max_expansiones:
+        coste, posiciones = heapq.heappop(heap)
+        if sum(precio[i] for precio, i in zip(precios, posiciones)) <= presupuesto:
+            resultado.append((coste, tuple(int(orden[i]) for orden, i in zip(ordenes, posiciones))))
+
+        for fuente in range(len(costes)):
+            siguiente = posiciones[:fuente] + (posiciones[fuente] + 1,) + posiciones[fuente + 1:]
+            if siguiente[fuente] < len(costes[fuente]) and siguiente not in vistos:
+                vistos.add(siguiente)
+                heapq.heappush(heap, (coste - costes[fuente][posiciones[fuente]] + costes[fuente][siguiente[fuente]], siguiente))
+
+    return resultado
+
+
+class PlanificadorViajes:
+    """
+    Planificador de viajes completos (vuelo + alojamiento + actividad) por ciudad.
+
+    Al crearlo se indexa cada fuente por ciudad y se descartan las opciones que nunca pueden estar entre las `k_max`
+    mejores, sean cuales sean los pesos y el presupuesto: las dominadas por al menos `k_max` opciones de su misma fuente
+    (vuelos en precio y duración, alojamientos en precio, puntuación y distancia al centro, actividades en precio y
+    puntuación). Cada consulta solo calcula el coste de las opciones que quedan y busca las mejores combinaciones con
+    un heap, así que responde en milisegundos aunque cada fuente tenga decenas de miles de opciones.
+    """
+
+    def __init__(self, vuelos, alojamientos, actividades, k_max=10):
+        """
+        Args:
+            vuelos (pd.DataFrame o dict): Salida de `crear_dataframe` ('price', 'total_duration'). Si no tiene la columna
+                'ciudad', cada vuelo se asigna a la ciudad cuyo nombre empieza el destino del primer tramo.
+            alojamientos (pd.DataFrame o dict): Salida de `soup_to_df` con la columna 'ciudad', o un diccionario ciudad -> DataFrame.
+            actividades (pd.DataFrame o dict): Salida de `obtener_actividades`.
+            k_max (int): Número máximo de viajes por ciudad que se podrán pedir a `planificar`.
+        """
+
+        self.k_max = k_max
+        alojamientos = _por_ciudad(alojamientos)
+        actividades = _por_ciudad(actividades)
+        if isinstance(vuelos, dict) or 'ciudad' in vuelos.columns:
+            vuelos = _por_ciudad(vuelos)
+        else:
+            vuelos = _ciudades_de_vuelos(vuelos, set(alojamientos) | set(actividades))
+
+        self.ciudades = {}
+        for ciudad in sorted(set(vuelos) & set(alojamientos) & set(actividades)):
+            fuentes = {
+                'vuelo': self._indexar_vuelos(vuelos[ciudad]),
+                'alojamiento': self._indexar_alojamientos(alojamientos[ciudad]),
+                'actividad': self._indexar_actividades(actividades[ciudad]),
+            }
+            if all(len(fuente['datos']) for fuente in fuentes.values()):
+                self.ciudades[ciudad] = fuentes
+
+    def _indexar(self, datos, criterios):
+        conservados = skyband(np.column_stack(criterios), self.k_max) if len(datos) else np.array([], dtype=int)
+        return datos.iloc[conservados].reset_index(drop=True)
+
+    def _indexar_vuelos(self, df):
+        datos = pd.DataFrame({
+            'indice': df.index,
+            'vuelo': df['flight_name'] if 'flight_name' in df.columns else df['id'],
+            'precio': df['price'].astype(float),
+            'duracion': df['total_duration'].astype(float),
+        }).dropna(subset=['precio', 'duracion'])
+        return {'datos': self._indexar(datos, [datos['precio'], datos['duracion']]),
+                'normalizador': datos['duracion'].max() or 1.0,
+                'opciones': len(df)}
+
+    def _indexar_alojamientos(self, df):
+        datos = pd.DataFrame({
+            'indice': df.index,
+            'alojamiento': df['Name'],
+            'precio': df['Price (€)'].astype(float),
+            # Sin puntuación cuenta como la peor y sin distancia como la más lejana
+            'puntuacion': df['Score'].astype(float).fillna(0.0),
+            'distancia': df['Distance to center'].astype(float),
+        }).dropna(subset=['precio'])
+        datos['distancia'] = datos['distancia'].fillna(datos['distancia'].max())
+        return {'datos': self._indexar(datos, [datos['precio'], -datos['puntuacion'], datos['distancia']]),
+                'normalizador': datos['distancia'].max() or 1.0,
+                'opciones': len(df)}
+
+    def _indexar_actividades(self, df):
+        # Los precios vienen como texto ('42', '1.200' o 'Desconocido'): sin precio conocido se descarta, como los alojamientos
+        precios = pd.to_numeric(df['precio'].astype(str).str.replace('.', '', regex=False), errors='coerce')
+        datos = pd.DataFrame({
+            'indice': df.index,
+            'actividad': df['nombre'],
+            'precio': precios.astype(float),
+            'puntuacion': pd.to_numeric(df['puntuacion'], errors='coerce').fillna(0.0),
+        }).dropna(subset=['precio'])
+        return {'datos': self._indexar(datos, [datos['precio'], -datos['puntuacion']]),
+                'opciones': len(df)}
+
+    def estadisticas(self):
+        """
+        Devuelve, por ciudad y fuente, el número de opciones originales y las que quedan tras la poda.
+
+        Returns:
+            pd.DataFrame: Columnas 'ciudad', 'fuente', 'opciones' y 'conservadas'.
+        """
+
+        return pd.DataFrame([{'ciudad': ciudad, 'fuente': nombre, 'opciones': fuente['opciones'], 'conservadas': len(fuente['datos'])}
+                             for ciudad, fuentes in self.ciudades.items() for nombre, fuente in fuentes.items()])
+
+    def planificar(self, presupuesto, pesos=None, k=5, ciudades=None, max_expansiones=1_000_000):
+        """
+        Devuelve los k mejores viajes completos de cada ciudad que no superan el presupuesto.
+
+        El coste de un viaje (menor es mejor) es la suma ponderada de:
+            - precio: precio total (vuelo + alojamiento + actividad) dividido por el presupuesto.
+            - duracion: duración total del vuelo dividida por la máxima de la ciudad.
+            - puntuacion: 1 menos la media de la puntuación del alojamiento (sobre 10) y de la actividad (sobre 5).
+            - distancia: distancia del alojamiento al centro dividida por la máxima de la ciudad.
+
+        Args:
+            presupuesto (float): Precio total máximo del viaje en euros.
+            pesos (dict, optional): Pesos no negativos de 'precio', 'duracion', 'puntuacion' y 'distancia'. Los que no
+                se indiquen toman el valor de `PESOS_POR_DEFECTO`.
+            k (int): Número de viajes por ciudad (como máximo `k_max`).
+            ciudades (list, optional): Ciudades a planificar. Por defecto todas las que tienen las tres fuentes.
+            max_expansiones (int): Límite de combinaciones exploradas por ciudad, por si el presupuesto deja muy pocas válidas.
+
+        Returns:
+            pd.DataFrame: Un viaje por fila, ordenados por ciudad y coste, con el vuelo, el alojamiento y la actividad
+            elegidos, sus precios y puntuaciones y los índices de cada opción en su DataFrame original.
+
+        Raises:
+            ValueError: Si `k` supera `k_max`, el presupuesto no es positivo o algún peso es negativo.
+        """
+
+        if k > self.k_max:
+            raise ValueError(f"k={k} supera k_max={self.k_max}: crea el planificador con un k_max mayor")
+        if presupuesto <= 0:
+            raise ValueError(f"El presupuesto tiene que ser positivo: {presupuesto}")
+        pesos = {**PESOS_POR_DEFECTO, **(pesos or {})}
+        if any(peso < 0 for peso in pesos.values()):
+            raise ValueError("Los pesos no pueden ser negativos")
+
+        claves = self.ciudades if ciudades is None else [clave_ciudad(ciudad) for ciudad in ciudades]
+        filas = []
+        for ciudad in claves:
+            if ciudad not in self.ciudades:
+                continue
+            vuelo, alojamiento, actividad = (self.ciudades[ciudad][fuente] for fuente in ('vuelo', 'alojamiento', 'actividad'))
+            v, h, a = vuelo['datos'], alojamiento['datos'], actividad['datos']
+
+            # Coste parcial de cada opción: el coste de un viaje es la suma de los de sus tres opciones
+            costes = [
+                pesos['precio'] * v['precio'].to_numpy() / presupuesto + pesos['duracion'] * v['duracion'].to_numpy() / vuelo['normalizador'],
+                pesos['precio'] * h['precio'].to_numpy() / presupuesto + pesos['puntuacion'] * (1 - h['puntuacion'].to_numpy() / 10) / 2
+                + pesos['distancia'] * h['distancia'].to_numpy() / alojamiento['normalizador'],
+                pesos['precio'] * a['precio'].to_numpy() / presupuesto + pesos['puntuacion'] * (1 - a['puntuacion'].to_numpy() / 5) / 2,
+            ]
+            precios = [v['precio'].to_numpy(), h['precio'].to_numpy(), a['precio'].to_numpy()]
+
+            combinaciones = _mejores_combinaciones(costes, precios, presupuesto, k, max_expansiones)
+            for rango, (coste, (i, j, m)) in enumerate(combinaciones, start=1):
+                filas.append({
+                    'ciudad': ciudad,
+                    'rango': rango,
+                    'coste': coste,
+                    'precio_total': v['precio'][i] + h['precio'][j] + a['precio'][m],
+                    'vuelo': v['vuelo'][i],
+                    'precio_vuelo': v['precio'][i],
+                    'duracion_vuelo': v['duracion'][i],
+                    'alojamiento': h['alojamiento'][j],
+                    'precio_alojamiento': h['precio'][j],
+                    'puntuacion_alojamiento': h['puntuacion'][j],
+                    'distancia_centro': h['distancia'][j],
+                    'actividad': a['actividad'][m],
+                    'precio_actividad': a['precio'][m],
+                    'puntuacion_actividad': a['puntuacion'][m],
+                    'indice_vuelo': v['indice'][i],
+                    'indice_alojamiento': h['indice'][j],
+                    'indice_actividad': a['indice'][m],
+                })
+
+        return pd.DataFrame(filas)
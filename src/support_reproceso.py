@@ -0,0 +1,163 @@
+"""
+Reprocesa en paralelo un archivo de páginas HTML guardadas con los extractores actuales.
+
+Cada página se parsea y se extrae en un proceso distinto; al proceso principal solo vuelven los DataFrames ya
+extraídos, que se unen en una tabla por tipo de página en el orden de los ficheros.
+Si las métricas de `support_metricas` están activas, cada proceso devuelve también las de sus páginas y se suman
+a las del proceso principal.
+
+Uso (desde la raíz del repositorio):
+    python -m src.support_reproceso datos/html --salida datos/reproceso --procesos 4
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from src import support_actividades as sup_act
+from src import support_alojamiento as sup_aloja
+from src import support_metricas as sup_met
+from src import support_parser as sup_parser
+
+
+# Los ficheros del archivo se llaman '<tipo>_<Ciudad>[_...].html', como los de datos/html
+EXTRACTORES = {
+    'actividades': lambda html, ciudad, parser: sup_act.obtener_actividades(pd.DataFrame({'ciudades': [ciudad], 'codigos_pagina': [html]}), parser),
+    'alojamientos': lambda html, ciudad, parser: sup_aloja.soup_to_df(html, parser).assign(ciudad=ciudad),
+}
+
+
+def listar_paginas(rutas):
+    """
+    Devuelve, ordenados, los ficheros HTML de una lista de ficheros y directorios (los directorios se recorren de forma recursiva).
+
+    Args:
+        rutas (list): Ficheros o directorios del archivo de páginas.
+
+    Returns:
+        list: Las rutas (Path) de los ficheros '.html' cuyo tipo está en `EXTRACTORES`.
+    """
+
+    paginas = set()
+    for ruta in map(Path, rutas):
+        paginas.update(ruta.rglob('*.html') if ruta.is_dir() else [ruta])
+
+    return sorted(pagina for pagina in paginas if pagina.name.split('_')[0] in EXTRACTORES)
+
+
+def procesar_pagina(ruta, parser=None):
+    """
+    Lee, parsea y extrae una página del archivo. Es la tarea de cada proceso del pool.
+
+    Args:
+        ruta (str o Path): Fichero '<tipo>_<Ciudad>[_...].html'.
+        parser (str, optional): Backend de parseo ('lxml' o 'html.parser').
+
+    Returns:
+        tuple: (tipo, DataFrame extraído, error). Si la página falla, el DataFrame es None y error el mensaje.
+    """
+
+    ruta = Path(ruta)
+    tipo, ciudad = ruta.stem.split('_')[:2]
+    try:
+        html = ruta.read_text(encoding='utf-8')
+        return tipo, EXTRACTORES[tipo](html, ciudad, parser), None
+    except Exception as e:
+        return tipo, None, repr(e)
+
+
+def _procesar_pagina_con_metricas(ruta, parser=None):
+    """
+    Como `procesar_pagina`, pero mide la página en el proceso del pool y devuelve también sus métricas, para que
+    el proceso principal las sume con `support_metricas.fusionar`.
+    """
+
+    # Los procesos del pool se reutilizan entre páginas: cada una empieza de cero para no devolver nada dos veces
+    sup_met.activar()
+    sup_met.reiniciar()
+    return procesar_pagina(ruta, parser), sup_met.instantanea()
+
+
+def _sumar_informes(informes):
+    # Las actividades tienen un informe por sección de la página; los alojamientos, uno solo
+    if 'items' in informes[0]:
+        return sup_parser.sumar_informes(informes)
+    return {seccion: sup_parser.sumar_informes([informe[seccion] for informe in informes]) for seccion in informes[0]}
+
+
+def reprocesar(rutas, procesos=None, parser=None, chunksize=1):
+    """
+    Reprocesa todas las páginas de un archivo en un pool de procesos y une los resultados por tipo de página.
+
+    Args:
+        rutas (list): Ficheros o directorios del archivo de páginas.
+        procesos (int, optional): Número de procesos. Por defecto uno por núcleo; con 1 no se crea el pool.
+        parser (str, optional): Backend de parseo ('lxml' o 'html.parser').
+        chunksize (int): Páginas que se envían juntas a cada proceso. Subirlo ayuda con muchas páginas pequeñas.
+
+    Returns:
+        dict: Tipo de página -> DataFrame con las filas de todas sus páginas, en el orden de `listar_paginas`.
+        En `df.attrs['fallos_selectores']` está el informe de fallos sumado de todas las páginas.
+        Las páginas que fallan se omiten y se imprime un mensaje.
+    """
+
+    paginas = listar_paginas(rutas)
+    procesos = procesos or os.cpu_count()
+    parsers = [parser] * len(paginas)
+
+    if procesos == 1:
+        resultados = list(map(procesar_pagina, paginas, parsers))
+    else:
+        # map conserva el orden de las páginas aunque terminen en otro orden
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            if sup_met.activas():
+                resultados = []
+                for resultado, metricas in ejecutor.map(_procesar_pagina_con_metricas, paginas, parsers, chunksize=chunksize):
+                    sup_met.fusionar(metricas)
+                    resultados.append(resultado)
+            else:
+                resultados = list(ejecutor.map(procesar_pagina, paginas, parsers, chunksize=chunksize))
+
+    tablas = {}
+    for pagina, (tipo, df, error) in zip(paginas, resultados):
+        if error is not None:
+            print(f"Fallo al procesar {pagina}: {error}")
+            continue
+        tablas.setdefault(tipo, []).append(df)
+
+    unidas = {}
+    for tipo, dfs in tablas.items():
+        unidas[tipo] = pd.concat(dfs, ignore_index=True)
+        unidas[tipo].attrs['fallos_selectores'] = _sumar_informes([df.attrs['fallos_selectores'] for df in dfs])
+
+    return unidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rutas', nargs='+', help='Ficheros o directorios con las páginas HTML guardadas')
+    parser.add_argument('--salida', default='datos/reproceso', help='Directorio donde se escribe un CSV por tipo de página')
+    parser.add_argument('--procesos', type=int, default=None, help='Número de procesos (por defecto, uno por núcleo)')
+    parser.add_argument('--parser', default=None, help="Backend de parseo: 'lxml' o 'html.parser'")
+    parser.add_argument('--chunksize', type=int, default=1, help='Páginas que se envían juntas a cada proceso')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tablas = reprocesar(args.rutas, args.procesos, args.parser, args.chunksize)
+    duracion = time.perf_counter() - inicio
+
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    for tipo, df in tablas.items():
+        df.to_csv(salida / f'{tipo}.csv')
+        print(f"{tipo}: {len(df)} filas -> {salida / f'{tipo}.csv'}")
+
+    print(f"Tiempo: {duracion:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+"""
+Cola local de trabajos de scraping que reparte ciudades, páginas, ventanas de fechas y rutas de vuelos entre
+trabajadores de navegador y de HTTP que se ejecutan a la vez.
+
+Tipos de trabajo (parámetros de `ColaTrabajos.agregar`):
+
+    ciudad   ciudad=                             página de actividades de TripAdvisor, con un navegador del pool
+    url      url=                                una página cualquiera con requests (por ejemplo, las de actividades)
+    ventana  dest_id=, checkin=, checkout=       búsqueda de alojamientos de Booking, con un navegador del pool
+    ruta     origen=, destino=, fecha_inicio=,   búsquedas de vuelos de ida y vuelta en la API de Sky-Scrapper
+             fecha_fin=, noches=
+
+Cada trabajo se identifica por la misma clave que usan los scrapers en su diario (la URL de búsqueda de la ciudad,
+la URL de la página o la de la búsqueda de Booking), así que un diario de `obtener_urls_paginas_principales`,
+`obtener_html_de_urls` o `scrap_ventanas` sirve también para la cola y al revés.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+from src import support_actividades as sup_act
+from src import support_alojamiento as sup_aloja
+from src import support_busqueda_vuelos as sup_busq
+from src import support_fetch as sup_fetch
+from src import support_metricas as sup_met
+from src import support_navegador as sup_nav
+
+
+class ErrorTrabajo(Exception):
+    """
+    Fallo de un trabajo que no viene de una excepción de otra librería, por ejemplo una respuesta 404.
+
+    Si viene de una respuesta HTTP, `respuesta` la guarda para que el reintento respete su cabecera Retry-After.
+    """
+
+    def __init__(self, mensaje, respuesta=None):
+        super().__init__(mensaje)
+        self.respuesta = respuesta
+
+
+def _trabajo_ciudad(cola, parametros):
+    ciudad = parametros['ciudad']
+    url_busqueda = sup_act.url_busqueda_ciudad(ciudad)
+
+    guardado = sup_act._pagina_ciudad_en_cache(ciudad, cola.cache, cola.archivo)
+    if guardado is not None:
+        return guardado
+
+    with cola.pool.driver() as driver:
+        url, codigo_pagina = sup_act.obtener_pagina_ciudad(driver, ciudad)
+    if cola.cache is not None:
+        cola.cache.guardar(url_busqueda, codigo_pagina, fuente='tripadvisor', metadatos={'url': url})
+    return url, sup_act._archivar(url, codigo_pagina, cola.archivo)
+
+
+def _trabajo_url(cola, parametros):
+    url = parametros['url']
+    guardado = cola.cache.obtener(url) if cola.cache is not None else None
+    if guardado is not None:
+        sup_met.contar('peticiones_cache')
+        return sup_act._archivar(url, guardado, cola.archivo)
+
+    # Los reintentos los hace la cola, sin ocupar al trabajador durante la espera
+    cola.esperar_turno(url)
+    host = urlsplit(url).netloc
+    with sup_met.medir('fetch', host=host):
+        respuesta = cola.sesion(url).get(url, timeout=30)
+    sup_met.contar('peticiones', host=host, status=respuesta.status_code)
+    if respuesta.status_code != 200:
+        raise ErrorTrabajo(f"{url}: {respuesta.status_code}", respuesta)
+    if cola.cache is not None:
+        cola.cache.guardar(url, respuesta.content)
+    return sup_act._archivar(url, respuesta.content, cola.archivo)
+
+
+def _trabajo_ventana(cola, parametros):
+    checkin, checkout = parametros['checkin'], parametros['checkout']
+    with cola.pool.driver() as driver:
+        soup = sup_aloja.scrap_url(parametros['dest_id'], checkin, checkout, cola.parser, cola.cache, driver=driver)
+    return sup_aloja.soup_to_df(soup, cola.parser).assign(checkin=checkin, checkout=checkout)
+
+
+def _trabajo_ruta(cola, parametros):
+    # Solo las respuestas válidas van a la caché: al reintentar la ruta solo se repiten las búsquedas que fallaron.
+    # Las búsquedas van de una en una y por los turnos de la cola, que reparte `tasa_por_host` entre todas las rutas
+    df = sup_busq.buscar_vuelos([(parametros['origen'], parametros['destino'])], parametros['fecha_inicio'], parametros['fecha_fin'],
+                                parametros.get('noches', 3), cache=cola.cache, concurrencia=1, tasa=cola.tasa_por_host,
+                                turno=cola.esperar_turno)
+    if df.empty:
+        raise ErrorTrabajo(f"Ninguna búsqueda de {parametros['origen']}-{parametros['destino']} devolvió vuelos")
+    return df
+
+
+def _clave_ruta(parametros):
+    noches = parametros.get('noches', 3)
+    noches = ','.join(map(str, [noches] if isinstance(noches, int) else noches))
+    return f"ruta:{parametros['origen']}-{parametros['destino']}:{parametros['fecha_inicio']}/{parametros['fecha_fin']}:{noches}"
+
+
+# Tipo de trabajo -> recurso que consume, clave que identifica el trabajo y función que lo ejecuta
+TIPOS = {
+    'ciudad': {'recurso': 'navegador', 'clave': lambda p: sup_act.url_busqueda_ciudad(p['ciudad']), 'ejecutar': _trabajo_ciudad},
+    'url': {'recurso': 'http', 'clave': lambda p: p['url'], 'ejecutar': _trabajo_url},
+    'ventana': {'recurso': 'navegador', 'clave': lambda p: sup_aloja.url_busqueda_booking(p['dest_id'], p['checkin'], p['checkout']),
+                'ejecutar': _trabajo_ventana},
+    'ruta': {'recurso': 'http', 'clave': _clave_ruta, 'ejecutar': _trabajo_ruta},
+}
+
+
+class Trabajo:
+    """
+    Un trabajo de la cola. `estado` es 'pendiente', 'en_curso', 'hecho' o 'fallido'; cuando está hecho, `resultado`
+    es lo mismo que guardaría en su diario el scraper correspondiente.
+    """
+
+    __slots__ = ('tipo', 'parametros', 'clave', 'recurso', 'prioridad', 'frescura', 'estado', 'intentos', 'resultado',
+                 'error', 'del_diario', 'al_terminar', 'reintento')
+
+    def __init__(self, tipo, parametros, clave, recurso, prioridad, frescura, al_terminar):
+        self.tipo = tipo
+        self.parametros = parametros
+        self.clave = clave
+        self.recurso = recurso
+        self.prioridad = prioridad
+        self.frescura = frescura
+        self.estado = 'pendiente'
+        self.intentos = 0
+        self.resultado = None
+        self.error = None
+        self.del_diario = False
+        self.al_terminar = [al_terminar] if al_terminar is not None else []
+        # Momento (time.monotonic) a partir del cual se puede reintentar, mientras espera el backoff
+        self.reintento = None
+
+    def __repr__(self):
+        return f"Trabajo({self.tipo} {self.clave}, {self.estado}, prioridad={self.prioridad}, intentos={self.intentos})"
+
+
+class ColaTrabajos:
+    """
+    Cola de trabajos de scraping con prioridades, sin duplicados, con reintentos y con un presupuesto de
+    trabajadores por recurso.
+
+    Hay `navegadores` hilos que solo toman trabajos de navegador y `http` hilos que solo toman trabajos de HTTP,
+    de modo que los navegadores y la red trabajan a la vez y un tipo nunca deja sin hueco al otro. Cada hilo toma
+    el trabajo disponible de su recurso con menor `prioridad`; a igual prioridad, el que tiene el resultado más
+    antiguo en el diario (primero los que nunca se han hecho) y después por orden de llegada.
+
+    Un trabajo igual a otro pendiente o en curso (misma clave) no se añade: se devuelve el existente y, si la nueva
+    prioridad es más urgente, se le aplica. Si el diario ya tiene un resultado de la clave con menos de `vigencia`
+    segundos, el trabajo queda hecho al añadirlo. Un trabajo que falla se vuelve a poner en la cola hasta
+    `reintentos` veces, con un backoff exponencial durante el cual el trabajador atiende otros trabajos; si se
+    vuelve a añadir después de agotarlos, empieza de nuevo con los reintentos a cero.
+    """
+
+    def __init__(self, navegadores=2, http=8, reintentos=3, espera_base=5.0, tasa_por_host=0.5, vigencia=None,
+                 diario=None, cache=None, archivo=None, pool=None, parser=None, tipos=TIPOS):
+        """
+        Args:
+            navegadores (int): Trabajos de navegador simultáneos (también el tamaño del pool que crea la cola).
+            http (int): Trabajos de HTTP simultáneos.
+            reintentos (int): Reintentos de cada trabajo que falla.
+            espera_base (float): Segundos antes del primer reintento; se duplica en cada intento.
+            tasa_por_host (float): Peticiones por segundo a cada servidor de los trabajos 'url' y 'ruta', entre todos los trabajadores.
+            vigencia (float, optional): Segundos durante los que vale un resultado del diario. Por defecto siempre vale.
+            diario (Diario, optional): Diario de `support_diario` donde se registra cada trabajo hecho.
+            cache (CachePaginas, optional): Caché de páginas de `support_cache`.
+            archivo (ArchivoPaginas, optional): Archivo de páginas de `support_archivo` para el HTML de 'ciudad' y 'url'.
+            pool (PoolNavegadores, optional): Pool de navegadores para los trabajos 'ciudad' y 'ventana'. Por defecto se crea uno y se cierra al terminar.
+            parser (str, optional): Backend de parseo de los trabajos 'ventana'.
+            tipos (dict): Tipos de trabajo admitidos, con el formato de `TIPOS`.
+        """
+
+        self.presupuestos = {'navegador': navegadores, 'http': http}
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.tasa_por_host = tasa_por_host
+        self.vigencia = vigencia
+        self.diario = diario
+        self.cache = cache
+        self.archivo = archivo
+        self.parser = parser
+        self.tipos = tipos
+
+        self._pool = pool
+        self._pool_propio = False
+
+        self._trabajos = {}
+        self._listos = {recurso: [] for recurso in self.presupuestos}
+        # (momento en que se puede reintentar, secuencia, trabajo)
+        self._esperando = []
+        self._activos = 0
+        self._parar = False
+        self._secuencia = itertools.count()
+        self._condicion = threading.Condition()
+
+        self._turnos = {}
+        self._sesiones = {}
+        self._lock_turnos = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock_turnos:
+            if self._pool is None:
+                self._pool = sup_nav.PoolNavegadores(tamano=self.presupuestos['navegador'])
+                self._pool_propio = True
+        return self._pool
+
+    def agregar(self, tipo, prioridad=0, al_terminar=None, **parametros):
+        """
+        Añade un trabajo a la cola. Se puede llamar mientras la cola se ejecuta, por ejemplo desde `al_terminar`.
+
+        Args:
+            tipo (str): Tipo de trabajo ('ciudad', 'url', 'ventana' o 'ruta').
+            prioridad (int): Menor es más urgente.
+            al_terminar (callable, optional): Función que recibe el trabajo cuando termina bien, por ejemplo para
+                añadir los trabajos que dependen de su resultado.
+            **parametros: Los parámetros del tipo de trabajo, por ejemplo ciudad='Paris'.
+
+        Returns:
+            Trabajo: El trabajo añadido, o el igual que ya estaba en la cola.
+        """
+
+        if tipo not in self.tipos:
+            raise ValueError(f"Tipo de trabajo desconocido '{tipo}': {list(self.tipos)}")
+        definicion = self.tipos[tipo]
+        clave = definicion['clave'](parametros)
+
+        with self._condicion:
+            existente = self._trabajos.get(clave)
+            if existente is not None:
+                sup_met.contar('trabajos_duplicados', tipo=tipo)
+                if existente.estado == 'fallido':
+                    # Un trabajo que agotó sus reintentos vuelve a la cola desde cero con la nueva prioridad
+                    existente.estado = 'pendiente'
+                    existente.intentos = 0
+                    existente.prioridad = prioridad
+                    self._activos += 1
+                    self._encolar(existente)
+                if existente.estado in ('pendiente', 'en_curso') and al_terminar is not None:
+                    existente.al_terminar.append(al_terminar)
+                if existente.estado == 'pendiente' and prioridad < existente.prioridad:
+                    existente.prioridad = prioridad
+                    if existente.reintento is None:
+                        # La entrada antigua del heap queda obsoleta y se descarta al sacarla
+                        self._encolar(existente)
+                if existente.estado != 'hecho':
+                    return existente
+                trabajo = existente
+            else:
+                hora = self.diario.hora(clave) if self.diario is not None else None
+                trabajo = Trabajo(tipo, parametros, clave, definicion['recurso'], prioridad, hora or 0.0, al_terminar)
+                self._trabajos[clave] = trabajo
+
+                if hora is not None and (self.vigencia is None or time.time() - hora < self.vigencia):
+                    trabajo.estado = 'hecho'
+                    trabajo.resultado = self.diario.obtener(clave)
+                    trabajo.del_diario = True
+                    sup_met.contar('trabajos', tipo=tipo, estado='diario')
+                else:
+                    self._activos += 1
+                    self._encolar(trabajo)
+                    return trabajo
+
+        # El trabajo ya está hecho: la función se llama en el momento
+        if al_terminar is not None:
+            al_terminar(trabajo)
+        return trabajo
+
+    def _encolar(self, trabajo):
+        heapq.heappush(self._listos[trabajo.recurso], (trabajo.prioridad, trabajo.frescura, next(self._secuencia), trabajo))
+        self._condicion.notify_all()
+
+    def _siguiente(self, recurso):
+        """
+        Espera hasta que haya un trabajo disponible del recurso y lo devuelve, o devuelve None cuando hay que parar.
+        """
+
+        with self._condicion:
+            while True:
+                ahora = time.monotonic()
+                while self._esperando and self._esperando[0][0] <= ahora:
+                    trabajo = heapq.heappop(self._esperando)[2]
+                    trabajo.reintento = None
+                    self._encolar(trabajo)
+
+                listos = self._listos[recurso]
+                while listos:
+                    prioridad, _, _, trabajo = heapq.heappop(listos)
+                    if trabajo.estado == 'pendiente' and prioridad == trabajo.prioridad:
+                        trabajo.estado = 'en_curso'
+                        return trabajo
+
+                if self._parar:
+                    return None
+                espera = self._esperando[0][0] - ahora if self._esperando else None
+                self._condicion.wait(espera)
+
+    def _trabajador(self, recurso):
+        while True:
+            trabajo = self._siguiente(recurso)
+            if trabajo is None:
+                return
+
+            trabajo.intentos += 1
+            try:
+                resultado = self.tipos[trabajo.tipo]['ejecutar'](self, trabajo.parametros)
+                if self.diario is not None:
+                    self.diario.registrar(trabajo.clave, resultado)
+            except Exception as e:
+                self._fallo(trabajo, e)
+                continue
+
+            sup_met.contar('trabajos', tipo=trabajo.tipo, estado='hecho')
+            with self._condicion:
+                trabajo.resultado, trabajo.error = resultado, None
+                trabajo.estado = 'hecho'
+                funciones = list(trabajo.al_terminar)
+
+            # Los trabajos que añadan las funciones cuentan como activos antes de que este deje de contar
+            for funcion in funciones:
+                try:
+                    funcion(trabajo)
+                except Exception as e:
+                    print(f"Fallo en al_terminar de {trabajo.tipo} {trabajo.clave}: {e!r}")
+
+            with self._condicion:
+                self._terminar()
+
+    def _fallo(self, trabajo, error):
+        with self._condicion:
+            trabajo.error = error
+            if trabajo.intentos <= self.reintentos:
+                sup_met.contar('trabajos_reintentos', tipo=trabajo.tipo)
+                trabajo.estado = 'pendiente'
+                respuesta = getattr(error, 'respuesta', None)
+                trabajo.reintento = time.monotonic() + sup_fetch._espera_reintento(respuesta, trabajo.intentos - 1, self.espera_base)
+                heapq.heappush(self._esperando, (trabajo.reintento, next(self._secuencia), trabajo))
+                self._condicion.notify_all()
+                return
+
+            trabajo.estado = 'fallido'
+            sup_met.contar('trabajos', tipo=trabajo.tipo, estado='fallido')
+            print(f"Fallo en el trabajo {trabajo.tipo} {trabajo.clave} tras {trabajo.intentos} intentos: {error!r}")
+            self._terminar()
+
+    def _terminar(self):
+        self._activos -= 1
+        if not self._activos:
+            self._condicion.notify_all()
+
+    def esperar_turno(self, url):
+        """
+        Espera hasta que se pueda hacer otra petición al servidor de la URL sin superar `tasa_por_host`.
+        """
+
+        host = urlsplit(url).netloc
+        with self._lock_turnos:
+            ahora = time.monotonic()
+            turno = max(ahora, self._turnos.get(host, ahora))
+            self._turnos[host] = turno + 1 / self.tasa_por_host
+
+        if turno > ahora:
+            with sup_met.medir('wait', host=host):
+                time.sleep(turno - ahora)
+
+    def sesion(self, url):
+        """
+        Devuelve la sesión de requests del servidor de la URL, con conexiones keep-alive compartidas por todos los
+        trabajadores de HTTP. Se crea en la primera petición al servidor y se cierra al terminar `ejecutar`.
+        """
+
+        host = urlsplit(url).netloc
+        with self._lock_turnos:
+            if host not in self._sesiones:
+                self._sesiones[host] = sup_fetch._crear_sesion(self.presupuestos['http'], sup_fetch.CABECERAS)
+            return self._sesiones[host]
+
+    def ejecutar(self):
+        """
+        Ejecuta todos los trabajos de la cola, y los que se añadan mientras tanto, y espera a que terminen.
+
+        Returns:
+            list: Todos los trabajos de la cola, en el orden en que se añadieron.
+        """
+
+        self._parar = False
+        hilos = [threading.Thread(target=self._trabajador, args=(recurso,), daemon=True)
+                 for recurso, presupuesto in self.presupuestos.items() for _ in range(presupuesto)]
+        for hilo in hilos:
+            hilo.start()
+
+        try:
+            with self._condicion:
+                while self._activos:
+                    self._condicion.wait()
+        finally:
+            with self._condicion:
+                self._parar = True
+                self._condicion.notify_all()
+            for hilo in hilos:
+                hilo.join()
+            if self._pool_propio:
+                self._pool.cerrar()
+                self._pool, self._pool_propio = None, False
+            with self._lock_turnos:
+                for sesion in self._sesiones.values():
+                    sesion.close()
+                self._sesiones = {}
+
+        return self.trabajos()
+
+    def trabajos(self, tipo=None, estado=None):
+        """
+        Devuelve los trabajos de la cola, opcionalmente solo los de un tipo o un estado.
+        """
+
+        return [trabajo for trabajo in list(self._trabajos.values())
+                if (tipo is None or trabajo.tipo == tipo) and (estado is None or trabajo.estado == estado)]
+
+    def resultados(self, tipo):
+        """
+        Devuelve los resultados de los trabajos hechos de un tipo, por clave y en el orden en que se añadieron.
+        """
+
+        return {trabajo.clave: trabajo.resultado for trabajo in self.trabajos(tipo, 'hecho')}
+
+    def resumen(self):
+        """
+        Devuelve el número de trabajos por tipo y estado, y cuántos se han tomado del diario.
+        """
+
+        resumen = {}
+        for trabajo in self.trabajos():
+            estados = resumen.setdefault(trabajo.tipo, {'pendiente': 0, 'en_curso': 0, 'hecho': 0, 'fallido': 0, 'diario': 0})
+            estados[trabajo.estado] += 1
+            estados['diario'] += trabajo.del_diario
+        return resumen
+
+    def __len__(self):
+        return len(self._trabajos)
@@ -1,5 +1,14 @@
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from src import support_metricas as sup_met
+
+# matplotlib solo se importa en las funciones de gráficas, para que cargar los vuelos no dependa de él
 
 
 
@@ -17,12 +26,146 @@ def crear_nombre_vuelo(row, index):
         str: Una cadena formateada que representa el itinerario del vuelo.
     """
     
-    origin_1 = row['origin_1']
-    destination_1 = row['destination_1']
-    origin_2 = row['origin_2']
-    destination_2 = row['destination_2']
-    return f"{index} {origin_1} -> {destination_1} / {origin_2} -> {destination_2}"
+    tramos = []
+    i = 1
+    while f'origin_{i}' in row and not pd.isna(row[f'origin_{i}']):
+        tramos.append(f"{row[f'origin_{i}']} -> {row[f'destination_{i}']}")
+        i += 1
+    return f"{index} {' / '.join(tramos)}"
+
+
+def iterar_itinerarios(origen, tam_bloque=1 << 16):
+    """
+    Recorre uno a uno los itinerarios de una respuesta de búsqueda de vuelos.
+
+    Si `origen` es la ruta de un fichero JSON, se lee por bloques y cada itinerario se decodifica en cuanto está completo,
+    sin cargar la respuesta entera en memoria con `json.load`.
+
+    Args:
+        origen (str, Path, dict o pd.DataFrame): Ruta del fichero de respuesta, o los datos ya cargados (por ejemplo con `pd.read_json`).
+        tam_bloque (int): Número de caracteres que se leen del fichero en cada bloque.
+
+    Yields:
+        dict: Cada itinerario de 'data' -> 'itineraries'.
+
+    Raises:
+        ValueError: Si el fichero termina antes de cerrar la lista de itinerarios.
+    """
+
+    if not isinstance(origen, (str, Path)):
+        yield from origen['data']['itineraries']
+        return
+
+    clave = '"itineraries"'
+    decodificador = json.JSONDecoder()
+
+    with open(origen, encoding='utf-8') as fichero:
+        # Avanzamos hasta el corchete que abre la lista de itinerarios
+        buffer = ''
+        while True:
+            bloque = fichero.read(tam_bloque)
+            if not bloque:
+                return
+            buffer += bloque
+
+            posicion = buffer.find(clave)
+            if posicion == -1:
+                # Guardamos el final por si la clave ha quedado partida entre dos bloques
+                buffer = buffer[-len(clave):]
+                continue
+
+            corchete = buffer.find('[', posicion)
+            if corchete != -1:
+                buffer = buffer[corchete + 1:]
+                break
+
+        # Decodificamos cada itinerario en cuanto tenemos su objeto completo en el buffer
+        while True:
+            buffer = buffer.lstrip(' \t\r\n,')
+            if buffer.startswith(']'):
+                return
+
+            if buffer:
+                try:
+                    itinerario, fin = decodificador.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    pass
+                else:
+                    yield itinerario
+                    buffer = buffer[fin:]
+                    continue
+
+            bloque = fichero.read(tam_bloque)
+            if not bloque:
+                raise ValueError(f'Respuesta incompleta: {origen}')
+            buffer += bloque
+
+
+@sup_met.cronometrado('parse', modulo='vuelos')
+def _columnas_itinerarios(origenes):
+    """
+    Vuelca los itinerarios de una o varias respuestas en listas por columna, con un bloque de columnas por tramo.
+    """
+
+    columnas = {'busqueda': [], 'id': [], 'price': []}
+    tramos = []
+    n = 0
+
+    for busqueda, origen in origenes:
+        for itinerario in iterar_itinerarios(origen):
+            columnas['busqueda'].append(busqueda)
+            columnas['id'].append(itinerario['id'])
+            columnas['price'].append(itinerario['price']['raw'])
+
+            for i, leg in enumerate(itinerario['legs']):
+                # Primera vez que aparece un itinerario con tantos tramos: rellenamos hacia atrás
+                if i == len(tramos):
+                    tramos.append({campo: [None] * n for campo in ('departure', 'arrival', 'duration', 'origin', 'destination')})
+
+                tramos[i]['departure'].append(leg['departure'])
+                tramos[i]['arrival'].append(leg['arrival'])
+                tramos[i]['duration'].append(leg['durationInMinutes'])
+                tramos[i]['origin'].append(leg['origin']['name'])
+                tramos[i]['destination'].append(leg['destination']['name'])
+
+            # Los itinerarios con menos tramos dejan vacíos los que les faltan
+            for tramo in tramos[len(itinerario['legs']):]:
+                for valores in tramo.values():
+                    valores.append(None)
+            n += 1
+
+    return columnas, tramos
+
+
+@sup_met.cronometrado('build', modulo='vuelos')
+def _construir_dataframe(columnas, tramos):
+    """
+    Construye el DataFrame tipado de vuelos a partir de las columnas de `_columnas_itinerarios`.
+    """
+
+    aeropuertos = pd.CategoricalDtype(sorted({nombre for tramo in tramos for campo in ('origin', 'destination') for nombre in tramo[campo] if nombre is not None}))
+
+    datos = {'id': columnas['id'], 'price': np.array(columnas['price'], dtype=float)}
+    for i, tramo in enumerate(tramos, start=1):
+        datos[f'departure_{i}'] = pd.to_datetime(tramo['departure'], format='%Y-%m-%dT%H:%M:%S')
+        datos[f'arrival_{i}'] = pd.to_datetime(tramo['arrival'], format='%Y-%m-%dT%H:%M:%S')
+        datos[f'duration_{i}'] = pd.array(tramo['duration'], dtype='Int32')
+        datos[f'origin_{i}'] = pd.Categorical(tramo['origin'], dtype=aeropuertos)
+        datos[f'destination_{i}'] = pd.Categorical(tramo['destination'], dtype=aeropuertos)
 
+    df = pd.DataFrame(datos)
+
+    # Nombre del vuelo: '<índice> <origen_1> -> <destino_1> / <origen_2> -> <destino_2> ...', sin los tramos vacíos
+    flight_name = df.index.astype(str).to_series(index=df.index)
+    for i in range(1, len(tramos) + 1):
+        tramo = df[f'origin_{i}'].astype(object) + ' -> ' + df[f'destination_{i}'].astype(object)
+        separador = ' ' if i == 1 else ' / '
+        flight_name = flight_name.where(tramo.isna(), flight_name + separador + tramo)
+    df['flight_name'] = flight_name
+
+    df['total_duration'] = df[[f'duration_{i}' for i in range(1, len(tramos) + 1)]].sum(axis=1).astype('Int32')
+
+    return df
 
 
 def crear_dataframe(data):
@@ -32,51 +175,67 @@ def crear_dataframe(data):
     del itinerario. También calcula la duración total de los vuelos y genera un nombre de 
     vuelo para cada itinerario.
 
+    Admite itinerarios con cualquier número de tramos: se crea un bloque de columnas
+    ('departure_i', 'arrival_i', 'duration_i', 'origin_i', 'destination_i') por tramo, y los itinerarios
+    con menos tramos los dejan vacíos. Las horas son datetime64, las duraciones enteros y los
+    aeropuertos categóricos.
+
     Args:
-        data (dict): Los datos de los vuelos en formato de diccionario, normalmente 
-        obtenidos de una respuesta de API.
+        data (dict, pd.DataFrame o str): Los datos de los vuelos en formato de diccionario, normalmente 
+        obtenidos de una respuesta de API, o la ruta del fichero JSON de la respuesta (se lee por bloques).
 
     Returns:
         pd.DataFrame: Un DataFrame que contiene la información procesada de los vuelos, 
         incluyendo precio, tiempos de vuelo, duración total y nombres generados de los vuelos.
     """
 
-    # Extraemos los itinerarios
-    itineraries = data['data']['itineraries']
-
-    # Creamos una lista con los datos que nos interesan de la respuesta
-    flight_data = []
-    for itinerary in itineraries:
-        price = itinerary['price']['raw']
-        leg_1 = itinerary['legs'][0]
-        leg_2 = itinerary['legs'][1]
-        
-        flight_info = {
-            'id': itinerary['id'],
-            'price': price,
-            'departure_1': leg_1['departure'],
-            'arrival_1': leg_1['arrival'],
-            'duration_1': leg_1['durationInMinutes'],
-            'origin_1': leg_1['origin']['name'],
-            'destination_1': leg_1['destination']['name'],
-            'departure_2': leg_2['departure'],
-            'arrival_2': leg_2['arrival'],
-            'duration_2': leg_2['durationInMinutes'],
-            'origin_2': leg_2['origin']['name'],
-            'destination_2': leg_2['destination']['name']
-        }
-        
-        flight_data.append(flight_info)
-
-    df = pd.DataFrame(flight_data)
-
-    df['flight_name'] = df.apply(lambda row: crear_nombre_vuelo(row, row.name), axis=1)
-
-    df['total_duration'] = df['duration_1'] + df['duration_2']
+    columnas, tramos = _columnas_itinerarios([(None, data)])
+    return _construir_dataframe(columnas, tramos)
+
+
+def crear_dataframe_busquedas(respuestas):
+    """
+    Crea un único DataFrame con el formato de `crear_dataframe` a partir de varias respuestas de búsqueda de vuelos.
+
+    Los itinerarios de todas las respuestas se vuelcan directamente en las columnas del resultado, sin crear un
+    DataFrame intermedio por respuesta.
+
+    Args:
+        respuestas (iterable): Pares (busqueda, data), donde busqueda es una etiqueta que identifica la búsqueda y
+        data son los datos de la respuesta o la ruta de su fichero JSON (ver `crear_dataframe`).
+
+    Returns:
+        pd.DataFrame: Los vuelos de todas las respuestas, con una columna categórica 'busqueda' con la etiqueta
+        de la búsqueda de la que procede cada itinerario.
+    """
+
+    columnas, tramos = _columnas_itinerarios(respuestas)
+    df = _construir_dataframe(columnas, tramos)
+    df.insert(0, 'busqueda', pd.Categorical(columnas['busqueda']))
 
     return df
 
 
+def cargar_respuestas(rutas):
+    """
+    Carga varias respuestas de búsqueda de vuelos guardadas en disco en un único DataFrame con el formato de `crear_dataframe`.
+
+    Cada fichero se lee por bloques (ver `iterar_itinerarios`).
+
+    Args:
+        rutas (str o list): Un patrón glob (por ejemplo 'datos/jsons/respuestas/*.json') o una lista de rutas.
+
+    Returns:
+        pd.DataFrame: Los vuelos de todas las respuestas, con una columna categórica 'busqueda' con el nombre
+        del fichero del que procede cada itinerario.
+    """
+
+    if isinstance(rutas, (str, Path)):
+        rutas = sorted(glob.glob(str(rutas)))
+
+    return crear_dataframe_busquedas((Path(ruta).stem, ruta) for ruta in rutas)
+
+
 def mostrar_grafica_comparacion_precios(df, ciudad):
     """
     Muestra un gráfico de barras horizontal comparando los precios de los vuelos 
@@ -91,6 +250,8 @@ def mostrar_grafica_comparacion_precios(df, ciudad):
         None: Muestra la visualización del gráfico de barras.
     """
 
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 6))
     plt.barh(df['flight_name'], df['price'], color='blue')
     plt.xlabel('Precio (€)')
@@ -114,6 +275,8 @@ def mostrar_grafica_comparacion_duracion(df, ciudad):
         None: Muestra la visualización del gráfico de barras.
     """
 
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 6))
     
     plt.barh(df['flight_name'], df['total_duration'], color='green')
@@ -125,39 +288,188 @@ def mostrar_grafica_comparacion_duracion(df, ciudad):
 
 
 
-def mostrar_grafica_comparativa(df, ciudad):
+def seleccionar_vuelos_grafica(df, max_barras=30):
+    """
+    Elige los vuelos que se dibujan como barras cuando hay demasiados para una barra por vuelo.
+
+    Se conservan los más baratos, los más cortos y los del frente de Pareto de precio y duración (los que no tienen
+    otro vuelo más barato y más corto a la vez). Si aun así son más de `max_barras`, el frente se muestrea a lo largo
+    del rango de precios.
+
+    Args:
+        df (pd.DataFrame): Los vuelos, con las columnas 'price' y 'total_duration'.
+        max_barras (int): Número máximo de vuelos a dibujar.
+
+    Returns:
+        tuple: El DataFrame con los vuelos elegidos ordenados por precio y una máscara booleana de los que son del frente de Pareto.
+    """
+
+    df = df.dropna(subset=['price', 'total_duration']).sort_values(['price', 'total_duration'], kind='stable')
+
+    # Frente de Pareto: ordenados por precio, cada vuelo del frente es más corto que todos los anteriores
+    duraciones = df['total_duration'].to_numpy(dtype=float)
+    pareto = duraciones < np.minimum.accumulate(np.concatenate([[np.inf], duraciones[:-1]]))
+
+    if len(df) <= max_barras:
+        return df, pareto
+
+    n = max(1, max_barras // 3)
+    elegidos = set(df.index[:n]) | set(df.sort_values('total_duration', kind='stable').index[:n])
+    frente = df.index[pareto]
+    hueco = max_barras - len(elegidos)
+    if len(frente) > hueco:
+        frente = frente[np.unique(np.linspace(0, len(frente) - 1, max(hueco, 0)).round().astype(int))] if hueco > 0 else frente[:0]
+    elegidos |= set(frente)
+
+    mascara = df.index.isin(elegidos)
+    return df[mascara], pareto[mascara]
+
+
+def dibujar_grafica_comparativa(fig, df, ciudad, max_barras=30, bins=30):
     """
-    Muestra un gráfico comparativo con dos subgráficos: uno comparando la duración total de los vuelos 
-    y otro comparando los precios de los vuelos para una ciudad específica.
+    Dibuja en una figura la comparativa de precio y duración de los vuelos de una ciudad.
+
+    Arriba, un gráfico de barras de precio y otro de duración con los vuelos de `seleccionar_vuelos_grafica`
+    (los del frente de Pareto en otro color); abajo, la distribución de precios y de duraciones de todos los vuelos
+    por intervalos. El coste de dibujar no depende del número de vuelos. Si la figura ya tiene los cuatro ejes se
+    reutilizan, de modo que la misma figura sirve para varias ciudades.
+
+    Args:
+        fig (matplotlib.figure.Figure): La figura donde dibujar.
+        df (pd.DataFrame): Los vuelos, con las columnas 'price', 'total_duration' y, si existe, 'flight_name'.
+        ciudad (str): La ciudad o destino, para los títulos.
+        max_barras (int): Número máximo de vuelos con barra propia.
+        bins (int): Número de intervalos de los histogramas.
+
+    Returns:
+        matplotlib.figure.Figure: La figura.
+    """
+
+    if len(fig.axes) == 4:
+        ejes = fig.axes
+        for ax in ejes:
+            ax.cla()
+    else:
+        fig.clf()
+        ejes = list(fig.subplots(2, 2).flat)
+    ax_precio, ax_duracion, ax_hist_precio, ax_hist_duracion = ejes
+
+    seleccion, pareto = seleccionar_vuelos_grafica(df, max_barras)
+    nombres = seleccion['flight_name'].astype(str) if 'flight_name' in seleccion.columns else seleccion.index.astype(str)
+    posiciones = np.arange(len(seleccion))
+
+    for ax, columna, color, etiqueta in [(ax_precio, 'price', 'purple', 'Precio (€)'), (ax_duracion, 'total_duration', 'orange', 'Duración Total (minutos)')]:
+        ax.barh(posiciones, seleccion[columna], color=np.where(pareto, 'tab:red', color))
+        ax.set_yticks(posiciones, nombres, fontsize=7)
+        ax.invert_yaxis()
+        ax.set_xlabel(etiqueta)
+        ax.grid(True, axis='x')
+    ax_precio.set_title(f'Precio Vuelos {ciudad} ({len(seleccion)} de {len(df)}, en rojo el frente de Pareto)')
+    ax_duracion.set_title(f'Duración Total Vuelos {ciudad}')
+
+    for ax, columna, color, etiqueta in [(ax_hist_precio, 'price', 'purple', 'Precio (€)'), (ax_hist_duracion, 'total_duration', 'orange', 'Duración Total (minutos)')]:
+        valores = df[columna].dropna().to_numpy(dtype=float)
+        if len(valores):
+            conteos, bordes = np.histogram(valores, bins=bins)
+            ax.stairs(conteos, bordes, fill=True, color=color, alpha=0.7)
+            ax.axvline(np.median(valores), color='black', linestyle='--', label=f'Mediana: {np.median(valores):.0f}')
+            ax.legend()
+        ax.set_xlabel(etiqueta)
+        ax.set_ylabel('Vuelos')
+        ax.grid(True)
+    ax_hist_precio.set_title(f'Distribución de Precios {ciudad}')
+    ax_hist_duracion.set_title(f'Distribución de Duraciones {ciudad}')
+
+    fig.tight_layout()
+    return fig
+
+
+def mostrar_grafica_comparativa(df, ciudad, max_barras=30):
+    """
+    Muestra un gráfico comparativo de la duración total y el precio de los vuelos para una ciudad específica.
+
+    Con muchos vuelos solo se dibuja una barra para los más baratos, los más cortos y los del frente de Pareto,
+    junto con la distribución de precios y duraciones de todos ellos (ver `dibujar_grafica_comparativa`).
 
     Args:
         df (pd.DataFrame): El DataFrame que contiene los datos de los vuelos, 
         incluyendo nombres de vuelos, precios y duraciones.
         ciudad (str): La ciudad o destino para la cual se están comparando los vuelos.
+        max_barras (int): Número máximo de vuelos con barra propia.
 
     Returns:
         None: Muestra la visualización del gráfico comparativo.
     """
 
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(78, 66))
+    import matplotlib.pyplot as plt
+
+    dibujar_grafica_comparativa(plt.figure(figsize=(16, 12)), df, ciudad, max_barras)
+    plt.show()
+
+
+# Figura de cada proceso que dibuja gráficas en ficheros: se crea una vez y se reutiliza para todas las ciudades
+_FIGURA = None
+
+
+def guardar_grafica_comparativa(df, ciudad, ruta, max_barras=30, dpi=100):
+    """
+    Guarda en un fichero la comparativa de vuelos de una ciudad sin abrir ninguna ventana.
+
+    Se dibuja con el backend Agg sobre una figura propia del proceso, sin pasar por pyplot, así que funciona en
+    servidores sin pantalla y no cambia el backend de un notebook.
 
-    # Gráfico 1: Duración Total de los Vuelos
-    ax1.bar(df['flight_name'], df['total_duration'], color='orange')
-    ax1.set_ylabel('Duración Total (minutos)', fontsize=60)
-    ax1.set_xlabel('Vuelos (Ruta)', fontsize=60)
-    ax1.set_title(f'Duración Total Vuelos {ciudad}', fontsize=60)
-    ax1.tick_params(axis='x', rotation=80, labelsize=50)
-    ax1.tick_params(axis='y', labelsize=50)
-    ax1.grid(True)
+    Args:
+        df (pd.DataFrame): Los vuelos de la ciudad.
+        ciudad (str): La ciudad o destino, para los títulos.
+        ruta (str or Path): El fichero de salida; el formato se deduce de la extensión ('.png', '.svg', '.pdf'...).
+        max_barras (int): Número máximo de vuelos con barra propia.
+        dpi (int): Resolución de las imágenes rasterizadas.
+
+    Returns:
+        str: La ruta del fichero guardado.
+    """
 
-    # Gráfico 2: Precio de los Vuelos
-    ax2.bar(df['flight_name'], df['price'], color='purple')
-    ax2.set_ylabel('Precio (€)', fontsize=60)
-    ax2.set_xlabel('Vuelos (Ruta)', fontsize=60)
-    ax2.set_title(f'Precio Vuelos {ciudad}', fontsize=60)
-    ax2.tick_params(axis='x', rotation=80, labelsize=50)
-    ax2.tick_params(axis='y', labelsize=50) 
-    ax2.grid(True)
+    global _FIGURA
 
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    if _FIGURA is None:
+        _FIGURA = Figure(figsize=(16, 12))
+        FigureCanvasAgg(_FIGURA)
+
+    dibujar_grafica_comparativa(_FIGURA, df, ciudad, max_barras)
+    _FIGURA.savefig(ruta, dpi=dpi)
+    return str(ruta)
+
+
+def guardar_graficas_vuelos(vuelos_por_ciudad, directorio, procesos=1, formato='png', max_barras=30):
+    """
+    Guarda la comparativa de vuelos de varias ciudades, una imagen por ciudad, en uno o varios procesos.
+
+    Args:
+        vuelos_por_ciudad (dict): Ciudad -> DataFrame de vuelos.
+        directorio (str or Path): Directorio de salida; cada imagen se llama '<ciudad>_comparativa.<formato>'.
+        procesos (int): Número de procesos. Cada proceso reutiliza su figura para todas las ciudades que dibuja.
+        formato (str): Formato de las imágenes.
+        max_barras (int): Número máximo de vuelos con barra propia en cada gráfica.
+
+    Returns:
+        list: Las rutas de las imágenes, en el orden de las ciudades.
+    """
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    # A los procesos solo se envían las columnas que se dibujan
+    columnas = ['flight_name', 'price', 'total_duration']
+    ciudades = list(vuelos_por_ciudad)
+    tablas = [vuelos_por_ciudad[ciudad][[columna for columna in columnas if columna in vuelos_por_ciudad[ciudad].columns]] for ciudad in ciudades]
+    rutas = [directorio / f'{ciudad}_comparativa.{formato}' for ciudad in ciudades]
+    barras = [max_barras] * len(ciudades)
+
+    if procesos == 1:
+        return list(map(guardar_grafica_comparativa, tablas, ciudades, rutas, barras))
+
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        return list(ejecutor.map(guardar_grafica_comparativa, tablas, ciudades, rutas, barras))